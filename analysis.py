@@ -0,0 +1,423 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import cache
+import pcm
+import silence
+
+# --- 单次解码分析流水线 ---
+# 响度、波形峰值、首尾静音、削波、内容哈希都要用到解码后的 PCM。
+# 每个文件只经 ffmpeg 解码一遍，按固定大小的 NumPy 块依次喂给选中的各个分析器；
+# 结果按分析器分别存进同一个按文件的缓存（cache/analysis），参数或版本变了只重算那一项。
+# 只要静音检测这种不需要原始采样率的分析时，解码成 16kHz 单声道，快得多。
+# 批量分析用进程池，报告吞吐量（每分钟处理多少小时音频）。
+# 命令行: python analysis.py 文件... [--analyzers silence,loudness] [--workers N] [--force]
+
+BLOCK_FRAMES = 1 << 16
+MAX_CHANNELS = 2
+
+# 同一进程里同时解码的文件数，界面后台线程一次加载几十首时不至于把 CPU 占满
+_DECODE_SLOTS = threading.BoundedSemaphore(2)
+
+
+class Analyzer:
+    name = ""
+    version = 1
+    native = True  # False 表示低采样率单声道就够用
+
+    def params(self):
+        return [self.version]
+
+    def start(self, rate, channels):
+        self.rate = rate
+        self.channels = channels
+
+    def feed(self, block):
+        # block: float32 [帧, 声道]
+        raise NotImplementedError
+
+    def finish(self):
+        raise NotImplementedError
+
+
+class FramedAnalyzer(Analyzer):
+    # 把任意长度的块切成等长的帧，块之间的零头留到下一块
+    frame_ms = 10
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.frame_len = max(1, rate * self.frame_ms // 1000)
+        self.carry = np.zeros((0, channels), dtype=np.float32)
+        self.total = 0
+
+    def feed(self, block):
+        self.total += len(block)
+        if len(self.carry):
+            block = np.concatenate((self.carry, block))
+        n = len(block) // self.frame_len
+        if n:
+            self.feed_frames(
+                block[: n * self.frame_len].reshape(n, self.frame_len, self.channels)
+            )
+        self.carry = block[n * self.frame_len :]
+
+    def feed_frames(self, frames):
+        raise NotImplementedError
+
+
+class SilenceAnalyzer(FramedAnalyzer):
+    # 结果与 silence.py 的约定一致：{start_ms, end_ms, duration_ms}，整段静音为 None
+    name = "silence"
+    native = False
+    frame_ms = silence.FRAME_MS
+
+    def params(self):
+        return [
+            silence.VERSION,
+            silence.THRESHOLD_DB,
+            silence.HOLD_MS,
+            silence.PREROLL_MS,
+        ]
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.levels = []
+
+    def feed_frames(self, frames):
+        if self.channels > 1:
+            mono = frames.sum(axis=2) * np.float32(1.0 / self.channels)
+        else:
+            mono = frames[:, :, 0]
+        self.levels.append(silence.frame_rms_db(mono.reshape(-1), self.frame_len))
+
+    def finish(self):
+        levels = np.concatenate(self.levels) if self.levels else np.zeros(0)
+        duration_ms = self.total * 1000 // self.rate
+        bounds = silence.find_bounds(
+            levels, silence.THRESHOLD_DB, max(1, silence.HOLD_MS // silence.FRAME_MS)
+        )
+        if bounds is None:
+            return None
+        start, end = bounds
+        return {
+            "start_ms": max(0, start * silence.FRAME_MS - silence.PREROLL_MS),
+            "end_ms": min(duration_ms, end * silence.FRAME_MS + silence.PREROLL_MS),
+            "duration_ms": duration_ms,
+        }
+
+
+def _k_weighting_power(freqs):
+    # BS.1770 K 计权两级双二阶滤波器（48kHz 系数）在各频点的功率响应
+    z = np.exp(-2j * np.pi * freqs / 48000.0)
+    shelf = np.polyval([1.19839281085285, -2.69169618940638, 1.53512485958697], z)
+    shelf /= np.polyval([0.73248077421585, -1.69065929318241, 1.0], z)
+    hp = np.polyval([1.0, -2.0, 1.0], z) / np.polyval(
+        [0.99007225036621, -1.99004745483398, 1.0], z
+    )
+    return np.abs(shelf * hp) ** 2
+
+
+class LoudnessAnalyzer(FramedAnalyzer):
+    # BS.1770 门限积分响度（LUFS）。K 计权在频域做：每 100ms 一段求加权功率，
+    # 400ms 块 = 相邻 4 段的平均（75% 重叠），再按 -70 LUFS 绝对门限和 -10 LU 相对门限积分。
+    # 滤波器状态在段边界上不连续，和逐样本滤波相比误差在 0.1 LU 量级。
+    name = "loudness"
+    frame_ms = 100
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        freqs = np.fft.rfftfreq(self.frame_len, 1.0 / rate)
+        self.weights = _k_weighting_power(freqs)
+        # 单边谱：除直流和奈奎斯特外每个频点算两次
+        self.weights[1:] *= 2
+        if self.frame_len % 2 == 0:
+            self.weights[-1] /= 2
+        self.segments = []
+
+    def feed_frames(self, frames):
+        spec = np.fft.rfft(frames, axis=1)
+        power = spec.real**2 + spec.imag**2
+        # 各声道加权功率之和（L/R 权重都是 1）
+        self.segments.append(
+            np.einsum("ifc,f->i", power, self.weights) / self.frame_len**2
+        )
+
+    def finish(self):
+        seg = np.concatenate(self.segments) if self.segments else np.zeros(0)
+        if len(seg) < 4:
+            return {"integrated_lufs": None, "max_momentary_lufs": None}
+        blocks = np.convolve(seg, np.ones(4) / 4, "valid")
+        lufs = -0.691 + 10 * np.log10(blocks + 1e-12)
+        gated = blocks[lufs > -70.0]
+        if not len(gated):
+            return {"integrated_lufs": None, "max_momentary_lufs": float(lufs.max())}
+        relative = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+        gated = gated[-0.691 + 10 * np.log10(gated) > relative]
+        return {
+            "integrated_lufs": round(float(-0.691 + 10 * np.log10(gated.mean())), 2),
+            "max_momentary_lufs": round(float(lufs.max()), 2),
+        }
+
+
+class PeaksAnalyzer(FramedAnalyzer):
+    # 波形概览：每 100ms 一对 (最小, 最大)，量化成 -127..127，界面画波形用
+    name = "peaks"
+    native = False
+    frame_ms = 100
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.mins = []
+        self.maxs = []
+
+    def feed_frames(self, frames):
+        self.mins.append(frames.min(axis=(1, 2)))
+        self.maxs.append(frames.max(axis=(1, 2)))
+
+    def finish(self):
+        if not self.mins:
+            return {"frame_ms": self.frame_ms, "min": [], "max": []}
+
+        def q(x):
+            return np.clip(np.round(np.concatenate(x) * 127), -127, 127)
+
+        return {
+            "frame_ms": self.frame_ms,
+            "min": q(self.mins).astype(int).tolist(),
+            "max": q(self.maxs).astype(int).tolist(),
+        }
+
+
+class ClipAnalyzer(Analyzer):
+    # 峰值、贴顶采样数，以及连续 3 个以上贴顶采样的段数（真正削过波的迹象）
+    name = "clip"
+    threshold = 0.999
+    min_run = 3
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.peak = 0.0
+        self.clipped = 0
+        self.runs = 0
+        self.run_len = np.zeros(channels, dtype=np.int64)
+
+    def feed(self, block):
+        if not len(block):
+            return
+        mag = np.abs(block)
+        self.peak = max(self.peak, float(mag.max()))
+        hot = mag >= self.threshold
+        self.clipped += int(hot.sum())
+        for ch in range(self.channels):
+            h = hot[:, ch].astype(np.int8)
+            edges = np.diff(np.concatenate(([0], h, [0])))
+            starts = np.flatnonzero(edges == 1)
+            lengths = np.flatnonzero(edges == -1) - starts
+            carry = self.run_len[ch]
+            if len(lengths) and starts[0] == 0:
+                # 接上上一块末尾没结束的那段
+                lengths[0] += carry
+            elif carry >= self.min_run:
+                self.runs += 1
+            self.run_len[ch] = 0
+            if h[-1]:
+                # 块末尾的段可能还没结束，留到下一块再计
+                self.run_len[ch] = lengths[-1]
+                lengths = lengths[:-1]
+            self.runs += int(np.count_nonzero(lengths >= self.min_run))
+
+    def finish(self):
+        self.runs += int(np.count_nonzero(self.run_len >= self.min_run))
+        return {
+            "peak_db": round(float(20 * np.log10(max(self.peak, 1e-9))), 2),
+            "clipped_samples": self.clipped,
+            "clipped_runs": self.runs,
+        }
+
+
+class HashAnalyzer(Analyzer):
+    # 解码后 16 位 PCM 的 SHA-256：同一段音频换了容器、改了标签也能认出来
+    name = "hash"
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.h = hashlib.sha256()
+
+    def feed(self, block):
+        pcm16 = np.clip(np.round(block * 32767), -32768, 32767).astype("<i2")
+        self.h.update(pcm16.tobytes())
+
+    def finish(self):
+        return {"sha256": self.h.hexdigest(), "rate": self.rate}
+
+
+ANALYZERS = {
+    cls.name: cls
+    for cls in (
+        SilenceAnalyzer,
+        LoudnessAnalyzer,
+        PeaksAnalyzer,
+        ClipAnalyzer,
+        HashAnalyzer,
+    )
+}
+
+
+def _decode_format(analyzers, info):
+    if any(a.native for a in analyzers):
+        return info["sample_rate"], max(1, min(MAX_CHANNELS, info["channels"]))
+    return silence.ANALYSIS_RATE, 1
+
+
+def analyze_file(path, names=None, force=False, use_cache=True):
+    # 返回 {"decode": {...}, 分析器名: 结果, ...}；解码失败时 decode 里带 error，不写缓存
+    names = list(names or ANALYZERS)
+    key = cache.file_key(path)
+    entry = (cache.load_json("analysis", key) if use_cache else None) or {}
+    stored = entry.get("analyzers", {})
+    todo = [ANALYZERS[n]() for n in names]
+    if not force:
+        todo = [
+            a
+            for a in todo
+            if a.name not in stored or stored[a.name].get("params") != a.params()
+        ]
+    if not todo:
+        return dict({n: stored[n]["result"] for n in names}, decode=entry["decode"])
+
+    info = pcm.probe(path)
+    if not info["sample_rate"] or not info["channels"]:
+        raise RuntimeError("找不到音频流")
+    rate, channels = _decode_format(todo, info)
+    for a in todo:
+        a.start(rate, channels)
+    errors = []
+    frames = 0
+    failed = None
+    t0 = time.perf_counter()
+    with _DECODE_SLOTS:
+        try:
+            for block in pcm.iter_pcm(path, rate, channels, BLOCK_FRAMES, errors):
+                block = block.reshape(-1, channels)
+                frames += len(block)
+                for a in todo:
+                    a.feed(block)
+        except RuntimeError as e:
+            failed = str(e)
+    decode = {
+        "codec": info["codec"],
+        "declared_sec": info["duration"],
+        "sample_rate": info["sample_rate"],
+        "channels": info["channels"],
+        "decoded_sec": frames / rate,
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "error": failed,
+        "elapsed": time.perf_counter() - t0,
+    }
+    results = {a.name: a.finish() for a in todo}
+    if failed is None and use_cache:
+        for a in todo:
+            stored[a.name] = {"params": a.params(), "result": results[a.name]}
+        # 低采样率解码只知道时长，原始格式信息来自 probe，两种解码都能用
+        if "decode" not in entry or rate == info["sample_rate"]:
+            entry["decode"] = decode
+        entry["analyzers"] = stored
+        cache.save_json("analysis", key, entry)
+    out = {n: stored[n]["result"] for n in names if n in stored}
+    out.update(results)
+    out["decode"] = decode
+    return out
+
+
+def _analyze_job(path, names, force):
+    # 进程池入口：异常转成结果，不让一个坏文件拖垮整批
+    try:
+        return path, analyze_file(path, names, force), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def run_batch(paths, names=None, workers=None, force=False, progress=None):
+    # progress(done, total, path, result, error)；返回 ({路径: 结果}, {路径: 错误}, 统计)
+    paths = list(dict.fromkeys(paths))
+    results, failures = {}, {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_analyze_job, p, names, force) for p in paths]
+        for fut in as_completed(futures):
+            path, result, error = fut.result()
+            if error is None:
+                results[path] = result
+            else:
+                failures[path] = error
+            if progress is not None:
+                progress(len(results) + len(failures), len(paths), path, result, error)
+    wall = time.perf_counter() - t0
+    audio_sec = sum(r["decode"]["decoded_sec"] for r in results.values())
+    stats = {
+        "files": len(paths),
+        "wall_sec": wall,
+        "audio_hours": audio_sec / 3600,
+        "hours_per_minute": (audio_sec / 3600) / max(1e-9, wall / 60),
+    }
+    return results, failures, stats
+
+
+def _summary(result):
+    parts = []
+    d = result["decode"]
+    parts.append(f"{d['decoded_sec']:.1f}s")
+    if result.get("loudness"):
+        lufs = result["loudness"]["integrated_lufs"]
+        parts.append(f"{lufs:.1f} LUFS" if lufs is not None else "静音")
+    if result.get("clip"):
+        c = result["clip"]
+        parts.append(f"峰值 {c['peak_db']:.1f} dBFS，削波段 {c['clipped_runs']}")
+    if "silence" in result:
+        s = result["silence"]
+        parts.append(f"有声 {s['start_ms']}–{s['end_ms']} ms" if s else "全静音")
+    if result.get("hash"):
+        parts.append(result["hash"]["sha256"][:12])
+    return "  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单次解码批量分析")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument(
+        "--analyzers",
+        default=",".join(ANALYZERS),
+        help=f"逗号分隔，可选 {','.join(ANALYZERS)}",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="忽略缓存重新分析")
+    args = parser.parse_args()
+    names = [n for n in args.analyzers.split(",") if n]
+    unknown = [n for n in names if n not in ANALYZERS]
+    if unknown:
+        sys.exit(f"未知的分析器: {', '.join(unknown)}")
+
+    def progress(done, total, path, result, error):
+        text = _summary(result) if error is None else f"失败: {error}"
+        print(f"[{done}/{total}] {os.path.basename(path)}  {text}")
+
+    _, failures, stats = run_batch(
+        args.files, names, args.workers, args.force, progress
+    )
+    print(
+        f"{stats['files']} 个文件，{stats['audio_hours']:.2f} 小时音频，"
+        f"用时 {stats['wall_sec']:.1f}s，吞吐 {stats['hours_per_minute']:.1f} 小时/分钟"
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1432 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# --- 性能测量脚本 ---
+# 用法: python bench.py <子命令> [参数]，不需要声卡，界面部分走 offscreen 平台
+
+
+def _qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def _run_for(app, seconds):
+    from PyQt6.QtCore import QTimer
+
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    app.exec()
+    return time.perf_counter() - wall0, time.process_time() - cpu0
+
+
+def bench_meters(args):
+    import numpy as np
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QWidget, QVBoxLayout
+    from meters import LevelAccumulator, LevelMeter, MeterHub
+
+    app = _qt_app()
+    frames = args.frames
+    interval_ms = 1000.0 * frames / args.rate
+
+    # 预先生成几段不同电平的立体声缓冲，循环喂入，模拟解码器的节奏
+    rng = np.random.default_rng(0)
+    noise = rng.standard_normal(frames * 2).astype(np.float32)
+    buffers = [noise * g for g in (0.05, 0.2, 0.5, 0.9)]
+
+    def run(metered):
+        window = QWidget()
+        layout = QVBoxLayout(window)
+        master = LevelMeter()
+        layout.addWidget(master)
+        hub = MeterHub(master)
+        accs = []
+        for i in range(args.tracks):
+            acc = LevelAccumulator()
+            meter = LevelMeter()
+            layout.addWidget(meter)
+            if metered:
+                hub.add(i, acc, meter, lambda: 0.8)
+            accs.append(acc)
+        window.resize(800, 20 * args.tracks)
+        window.show()
+
+        state = {"n": 0}
+
+        def feed():
+            buf = buffers[state["n"] % len(buffers)]
+            state["n"] += 1
+            if metered:
+                for acc in accs:
+                    acc.feed(buf, 2)
+
+        feeder = QTimer()
+        feeder.setInterval(max(1, int(interval_ms)))
+        feeder.timeout.connect(feed)
+        feeder.start()
+        wall, cpu = _run_for(app, args.seconds)
+        feeder.stop()
+        hub.timer.stop()
+        window.close()
+        return wall, cpu, state["n"] * len(accs), hub.overhead_percent()
+
+    wall0, cpu0, _, _ = run(False)
+    wall1, cpu1, buffers_fed, hub_pct = run(True)
+    base_pct = 100.0 * cpu0 / wall0
+    metered_pct = 100.0 * cpu1 / wall1
+    print(
+        f"轨数: {args.tracks}  缓冲: {frames} 帧 @ {args.rate} Hz (每轨 {1000.0 / interval_ms:.1f} 个/秒)"
+    )
+    print(f"无电平表 进程 CPU: {base_pct:.2f}%")
+    print(
+        f"有电平表 进程 CPU: {metered_pct:.2f}%  (含重绘，增量 {metered_pct - base_pct:.2f}%)"
+    )
+    print(f"电平计算 + 共享定时器自计时: {hub_pct:.2f}%  共处理 {buffers_fed} 个缓冲")
+
+
+def _ffmpeg():
+    from pydub.utils import which
+
+    exe = which("ffmpeg")
+    if exe is None:
+        sys.exit("需要 ffmpeg")
+    return exe
+
+
+def _decode_mono(path, rate, start=None, seconds=None):
+    import subprocess
+    import numpy as np
+
+    cmd = [_ffmpeg(), "-v", "error"]
+    if start is not None:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", path]
+    if seconds is not None:
+        cmd += ["-t", f"{seconds:.3f}"]
+    cmd += ["-ac", "1", "-ar", str(rate), "-f", "f32le", "-"]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def _make_vbr_mp3(path, seconds):
+    import subprocess
+
+    # 响亮噪声与近乎静音交替，码率起伏很大；-write_xing 0 去掉 TOC
+    src = (
+        f"anoisesrc=d={seconds}:a=0.3:r=44100,"
+        "volume='if(lt(mod(t\\,60)\\,30)\\,1\\,0.01)':eval=frame"
+    )
+    subprocess.run(
+        [_ffmpeg(), "-v", "error", "-y", "-f", "lavfi", "-i", src, "-ac", "2"]
+        + ["-c:a", "libmp3lame", "-q:a", "4", "-write_xing", "0", path],
+        check=True,
+    )
+
+
+def _locate(ref, clip, rate, lo_sec, hi_sec):
+    import numpy as np
+
+    # 归一化互相关（FFT），返回 clip 在 ref 中的起点（秒）
+    lo = max(0, int(lo_sec * rate))
+    hi = min(len(ref), int(hi_sec * rate) + len(clip))
+    seg = ref[lo:hi].astype(np.float64)
+    clip = clip.astype(np.float64)
+    n = len(seg) + len(clip)
+    size = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(seg, size) * np.conj(np.fft.rfft(clip, size)), size)
+    corr = corr[: len(seg) - len(clip) + 1]
+    energy = np.convolve(seg * seg, np.ones(len(clip)), "valid")
+    return (lo + int(np.argmax(np.abs(corr) / np.sqrt(energy + 1e-12)))) / rate
+
+
+def bench_seek(args):
+    import subprocess
+    import numpy as np
+    import seek_index
+
+    path = args.file
+    if args.make:
+        print(f"生成 {args.make}s 的 VBR MP3 (无 TOC): {path}")
+        _make_vbr_mp3(path, args.make)
+
+    t0 = time.perf_counter()
+    index = seek_index.scan(path)
+    scan_sec = time.perf_counter() - t0
+    seek_index.load_or_build(path)
+    t0 = time.perf_counter()
+    index = seek_index.load_or_build(path)
+    load_sec = time.perf_counter() - t0
+    print(
+        f"帧数 {len(index.offsets)}  时长 {index.duration_ms / 60000:.1f} 分钟  "
+        f"VBR={index.vbr} TOC={index.has_toc}"
+    )
+    print(f"扫描建索引 {scan_sec * 1000:.0f} ms，读缓存 {load_sec * 1000:.1f} ms")
+
+    n = 100000
+    t0 = time.perf_counter()
+    for i in range(n):
+        index.time_at_byte(index.byte_at(i * 37 % index.duration_ms))
+    print(
+        f"索引查表 (时间->字节->时间) {1e6 * (time.perf_counter() - t0) / n:.2f} us/次"
+    )
+
+    # 真实误差：整段解码为参照，在寻址点解一小段，用互相关找出它真正落在哪里。
+    # 延迟 = 从发起到拿到第一段 PCM 的时间（含 ffmpeg 进程启动，三种方式相同）
+    rate = 8000
+    probe = 0.5
+    ref = _decode_mono(path, rate)
+    targets = np.linspace(0.05, 0.95, args.points) * index.duration_ms / 1000.0
+
+    def decode_clip(cmd, stdin=None):
+        cmd = [_ffmpeg(), "-v", "error"] + cmd
+        cmd += ["-t", f"{probe}", "-ac", "1", "-ar", str(rate), "-f", "f32le", "-"]
+        t0 = time.perf_counter()
+        out = subprocess.run(
+            cmd, stdin=stdin, stdout=subprocess.PIPE, check=True
+        ).stdout
+        return np.frombuffer(out, dtype=np.float32), time.perf_counter() - t0
+
+    def generic(t):
+        return decode_clip(["-ss", f"{t:.3f}", "-i", path]), t
+
+    def fast(t):
+        return decode_clip(["-fflags", "+fastseek", "-ss", f"{t:.3f}", "-i", path]), t
+
+    def indexed(t):
+        frame = index.frame_at(t * 1000)
+        with open(path, "rb") as f:
+            f.seek(index.offsets[frame])
+            return (
+                decode_clip(["-f", "mp3", "-i", "pipe:0"], stdin=f),
+                frame * index.frame_ms / 1000.0,
+            )
+
+    for label, seek in (
+        ("逐包寻址 (准确模式)", generic),
+        ("码率估算寻址 (快速模式)", fast),
+        ("帧索引", indexed),
+    ):
+        errors = []
+        latency = []
+        for t in targets:
+            (clip, sec), expect = seek(t)
+            latency.append(sec)
+            errors.append(abs(_locate(ref, clip, rate, t - 60, t + 60) - expect))
+        errors = np.array(errors) * 1000
+        print(
+            f"{label}: 误差 平均 {errors.mean():.1f} ms  最大 {errors.max():.1f} ms  "
+            f"延迟 平均 {1000 * np.mean(latency):.0f} ms  最大 {1000 * np.max(latency):.0f} ms"
+        )
+
+
+def _make_tone_wav(path, seconds, rate=48000):
+    import math
+    import struct
+    import wave
+
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        one_sec = b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate)))
+            for i in range(rate)
+        )
+        for _ in range(int(seconds)):
+            w.writeframes(one_sec)
+
+
+def _pump_until(app, cond, timeout):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    return cond()
+
+
+def _headless_engine_main(conn, shm_name, owner):
+    # engine-fade --headless 的引擎进程：轨道不出声，定时器、渐隐和共享内存都是真的
+    from PyQt6.QtCore import QObject
+    from PyQt6.QtMultimedia import QMediaPlayer
+    import engine
+
+    class Player:
+        def __init__(self):
+            self.state = QMediaPlayer.PlaybackState.StoppedState
+            self.started = 0.0
+
+        def play(self):
+            self.state = QMediaPlayer.PlaybackState.PlayingState
+            self.started = time.monotonic()
+
+        def pause(self):
+            self.state = QMediaPlayer.PlaybackState.PausedState
+
+        def stop(self):
+            self.state = QMediaPlayer.PlaybackState.StoppedState
+
+        def playbackState(self):
+            return self.state
+
+        def mediaStatus(self):
+            return QMediaPlayer.MediaStatus.LoadedMedia
+
+        def position(self):
+            if self.state != QMediaPlayer.PlaybackState.PlayingState:
+                return 0
+            return int((time.monotonic() - self.started) * 1000)
+
+        def duration(self):
+            return 600000
+
+    class Output:
+        def __init__(self, volume):
+            self.level = volume
+
+        def setVolume(self, volume):
+            self.level = volume
+
+        def volume(self):
+            return self.level
+
+    class HeadlessTrack(engine.EngineTrack):
+        def __init__(self, eng, slot, device_id, volume):
+            QObject.__init__(self)
+            self.engine = eng
+            self.slot = slot
+            self.player = Player()
+            self.output = Output(volume)
+            self.level_tap = None
+            self.volume = volume
+            self.slice_device = None
+            self.fade = None
+            self.level_seq = 0
+
+        def close(self):
+            self.player.stop()
+
+    engine.Engine.track_class = HeadlessTrack
+    engine.engine_main(conn, shm_name, owner)
+
+
+def _engine_fade_headless(args):
+    # 不要声卡：引擎进程里换成不出声的轨道，界面线程卡住期间渐隐照样按时结束
+    from types import SimpleNamespace
+    from PyQt6.QtMultimedia import QMediaPlayer
+    import engine
+
+    app = _qt_app()
+    client = engine.EngineClient(target=_headless_engine_main)
+    rp, ro = client.create_player(SimpleNamespace(id=lambda: b"headless"))
+    ro.setVolume(1.0)
+    rp.play()
+    playing = QMediaPlayer.PlaybackState.PlayingState
+    if not _pump_until(
+        app, lambda: rp.playbackState() == playing and rp.position() > 200, 10
+    ):
+        client.shutdown()
+        sys.exit("引擎进程没有启动")
+    rp.fade_out(args.fade)
+    time.sleep(args.fade / 2)
+    time.sleep(args.block)
+    _pump_until(app, lambda: not rp.fading, args.fade + 5)
+    row = client.state.read_slot(rp.slot)
+    client.shutdown()
+    start, end = row[engine.F_FADE_START], row[engine.F_FADE_END]
+    actual = end - start if start and end else float("nan")
+    ok = abs(actual - args.fade) <= args.tolerance
+    print(
+        f"渐隐 {args.fade:.1f}s，期间界面线程卡住 {args.block:.1f}s："
+        f"F_FADE_END - F_FADE_START = {actual:.3f}s（容差 ±{args.tolerance * 1000:.0f} ms）"
+    )
+    print("✔ 通过" if ok else "✘ 超出容差")
+    if not ok:
+        sys.exit(1)
+
+
+def bench_engine_fade(args):
+    if args.headless:
+        _engine_fade_headless(args)
+        return
+    import tempfile
+    from PyQt6.QtCore import QTimer, QUrl
+    from PyQt6.QtMultimedia import QAudioOutput, QMediaDevices, QMediaPlayer
+    import engine
+
+    app = _qt_app()
+    path = os.path.join(tempfile.gettempdir(), "easyplayer_fade_tone.wav")
+    _make_tone_wav(path, args.fade + args.block + 10)
+    device = QMediaDevices.defaultAudioOutput()
+
+    def block_gui():
+        # 模拟界面线程被文件对话框、同步 IO 之类卡住
+        time.sleep(args.block)
+
+    # 进程内：和轨道控件一样用 50ms 定时器一步步降音量
+    player = QMediaPlayer()
+    output = QAudioOutput()
+    output.setDevice(device)
+    player.setAudioOutput(output)
+    player.setSource(QUrl.fromLocalFile(path))
+    player.play()
+    if not _pump_until(app, lambda: player.position() > 200, 5):
+        print("进程内播放没有启动（没有可用的声卡？）")
+        return
+    steps = max(1, int(args.fade * 1000 / 50))
+    state = {"left": steps, "end": None}
+    vol_step = output.volume() / steps
+
+    def step():
+        if state["left"] > 0:
+            output.setVolume(max(0, output.volume() - vol_step))
+            state["left"] -= 1
+        else:
+            timer.stop()
+            player.stop()
+            state["end"] = time.monotonic()
+
+    timer = QTimer()
+    timer.setInterval(50)
+    timer.timeout.connect(step)
+    start = time.monotonic()
+    timer.start()
+    QTimer.singleShot(int(args.fade * 500), block_gui)
+    _pump_until(app, lambda: state["end"] is not None, args.fade + args.block + 5)
+    inprocess = state["end"] - start
+
+    # 独立进程：渐隐由引擎按单调时钟推进，界面线程同样卡住
+    client = engine.EngineClient()
+    rp, ro = client.create_player(device)
+    rp.setSource(QUrl.fromLocalFile(path))
+    ro.setVolume(1.0)
+    rp.play()
+    if not _pump_until(app, lambda: rp.position() > 200, 10):
+        print("引擎进程播放没有启动")
+        client.shutdown()
+        return
+    requested = time.monotonic()
+    rp.fade_out(args.fade)
+    time.sleep(args.fade / 2)
+    block_gui()
+    _pump_until(app, lambda: not rp.fading, args.fade + 5)
+    row = client.state.read_slot(rp.slot)
+    fade_start = row[engine.F_FADE_START]
+    fade_end = row[engine.F_FADE_END]
+    client.shutdown()
+
+    print(f"渐隐 {args.fade:.1f}s，期间界面线程卡住 {args.block:.1f}s")
+    print(f"进程内定时器: 实际 {inprocess:.3f}s  偏差 {inprocess - args.fade:+.3f}s")
+    print(
+        f"独立引擎进程: 实际 {fade_end - fade_start:.3f}s  "
+        f"偏差 {fade_end - fade_start - args.fade:+.3f}s  "
+        f"命令延迟 {1000 * (fade_start - requested):.1f} ms"
+    )
+
+
+def bench_silence(args):
+    import subprocess
+    import cache
+    import silence
+
+    if args.make:
+        # 片头 2.5 秒、片尾 4 秒近乎静音（带一点底噪），中间是响亮噪声
+        total = args.make
+        src = (
+            f"aevalsrc='if(between(t\\,2.5\\,{total - 4})\\,0.3\\,0.0005)*(2*random(0)-1)'"
+            f":d={total}:s=44100"
+        )
+        subprocess.run(
+            [_ffmpeg(), "-v", "error", "-y", "-f", "lavfi", "-i", src, "-ac", "2"]
+            + ["-c:a", "libmp3lame", "-q:a", "4", args.file],
+            check=True,
+        )
+    path = args.file
+
+    t0 = time.perf_counter()
+    info = silence.analyze(path)
+    full = time.perf_counter() - t0
+    seconds = info["duration_ms"] / 1000 if info else 0.0
+    print(f"文件时长 {seconds / 60:.1f} 分钟  检测结果 {info}")
+    print(f"解码 + 检测: {full:.2f}s  ({seconds / full:.0f}x 实时)")
+
+    samples = _decode_mono(path, silence.ANALYSIS_RATE)
+    frame_len = silence.ANALYSIS_RATE * silence.FRAME_MS // 1000
+    t0 = time.perf_counter()
+    levels = silence.frame_rms_db(samples, frame_len)
+    silence.find_bounds(levels)
+    numeric = time.perf_counter() - t0
+    print(
+        f"仅 RMS + 阈值/保持判定: {1000 * numeric:.1f} ms  "
+        f"({len(samples) / numeric / 1e6:.0f} M 样本/秒)"
+    )
+
+    silence.load_or_analyze(path)
+    t0 = time.perf_counter()
+    silence.load_or_analyze(path)
+    print(f"读缓存: {1000 * (time.perf_counter() - t0):.2f} ms")
+    print(f"缓存目录: {cache.cache_dir('analysis')}")
+
+
+def _track_card(name):
+    # 与 AudioTrackWidget 相同的子控件组合（不含播放器），用来单独测界面开销
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import (
+        QCheckBox,
+        QFrame,
+        QHBoxLayout,
+        QLabel,
+        QProgressBar,
+        QPushButton,
+        QSlider,
+        QVBoxLayout,
+    )
+
+    card = QFrame()
+    card.setObjectName("TrackCard")
+    layout = QVBoxLayout(card)
+    row1 = QHBoxLayout()
+    row2 = QHBoxLayout()
+    lbl_name = QLabel(name)
+    lbl_name.setObjectName("TrackName")
+    for w in (QPushButton("▶ 播放"), QPushButton("📉 渐隐"), lbl_name, QProgressBar()):
+        row1.addWidget(w)
+    row1.addWidget(QPushButton("🚀 200%"))
+    lbl_time = QLabel("00:00 / 00:00")
+    lbl_time.setObjectName("TrackTime")
+    seek = QSlider(Qt.Orientation.Horizontal)
+    seek.setObjectName("SeekSlider")
+    vol = QSlider(Qt.Orientation.Horizontal)
+    vol.setObjectName("VolumeSlider")
+    for w in (lbl_time, seek, QCheckBox("循环"), QCheckBox("跳过片头静音")):
+        row2.addWidget(w)
+    for w in (QLabel("音量"), vol, QLabel("100%")):
+        row2.addWidget(w)
+    layout.addLayout(row1)
+    layout.addLayout(row2)
+    return card
+
+
+def bench_widgets(args):
+    from PyQt6.QtWidgets import QScrollArea, QVBoxLayout, QWidget
+    import theme
+
+    app = _qt_app()
+    qss = theme.build_qss(theme.DARK)
+
+    def build(per_widget):
+        app.setStyleSheet("" if per_widget else qss)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        content = QWidget()
+        layout = QVBoxLayout(content)
+        scroll.setWidget(content)
+        scroll.resize(1200, 900)
+        scroll.show()
+        app.processEvents()
+        t0 = time.perf_counter()
+        for i in range(args.count):
+            card = _track_card(f"track {i}.mp3")
+            if per_widget:
+                card.setStyleSheet(qss)
+            layout.addWidget(card)
+            # 样式在第一次显示/polish 时才真正套上，算进创建时间
+            card.ensurePolished()
+            for child in card.findChildren(QWidget):
+                child.ensurePolished()
+        app.processEvents()
+        elapsed = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        app.setStyleSheet(theme.build_qss(theme.LIGHT) if not per_widget else "")
+        app.processEvents()
+        switch = time.perf_counter() - t0
+        scroll.close()
+        scroll.deleteLater()
+        app.processEvents()
+        return elapsed, switch
+
+    before, _ = build(True)
+    after, switch = build(False)
+    print(f"{args.count} 个轨道控件（样式表 {len(qss)} 字符）")
+    print(f"每个控件各自 setStyleSheet: {1000 * before / args.count:.2f} ms/个")
+    print(f"全局主题 + objectName:     {1000 * after / args.count:.2f} ms/个")
+    print(f"运行时切换主题（{args.count} 个控件）: {1000 * switch:.0f} ms")
+
+
+def _exec_until(app, cond, timeout):
+    # 真正跑事件循环（_pump_until 每轮会睡 5ms，量定时精度时不能用）
+    from PyQt6.QtCore import QTimer
+
+    check = QTimer()
+    check.setInterval(20)
+    check.timeout.connect(lambda: cond() and app.quit())
+    check.start()
+    QTimer.singleShot(int(timeout * 1000), app.quit)
+    app.exec()
+    check.stop()
+
+
+def _stats(xs):
+    xs = sorted(abs(x) for x in xs)
+    p95 = xs[min(len(xs) - 1, int(len(xs) * 0.95))]
+    return f"平均 {sum(xs) / len(xs):6.2f} ms  P95 {p95:6.2f} ms  最大 {xs[-1]:6.2f} ms"
+
+
+def bench_cues(args):
+    import random
+    from PyQt6.QtCore import QTimer
+    from cues import ClockThread
+
+    app = _qt_app()
+    rng = random.Random(1)
+    offsets = [rng.uniform(0.05, args.span) for _ in range(args.count)]
+    work = {"busy": 0}
+
+    def busy():
+        # 模拟界面线程上的零碎工作（重绘、电平表、信号处理）
+        time.sleep(args.load / 1000)
+        work["busy"] += 1
+
+    load = QTimer()
+    load.setInterval(16)
+    load.timeout.connect(busy)
+
+    # QTimer.singleShot（默认粗精度定时器）
+    timer_err = []
+    t0 = time.perf_counter()
+    for off in offsets:
+        deadline = t0 + off
+        QTimer.singleShot(
+            int(off * 1000),
+            lambda d=deadline: timer_err.append((time.perf_counter() - d) * 1000),
+        )
+    load.start()
+    _exec_until(app, lambda: len(timer_err) == len(offsets), args.span + 5)
+    load.stop()
+
+    # 提示点定时线程：睡到差 2ms 再忙等，信号排队到界面线程
+    clock = ClockThread()
+    clock_err, thread_err = [], []
+
+    def on_due(token, at, emitted):
+        clock_err.append((time.perf_counter() - at) * 1000)
+        thread_err.append((emitted - at) * 1000)
+
+    clock.due.connect(on_due)
+    clock.start()
+    t0 = time.perf_counter() + 2.5  # 预备信号在到点前 2s 发出，这里都排在 2s 之后
+    for i, off in enumerate(offsets):
+        clock.schedule(i, t0 + off)
+    load.start()
+    _exec_until(app, lambda: len(clock_err) == len(offsets), args.span + 8)
+    load.stop()
+    clock.stop()
+
+    print(f"{args.count} 个定时点，界面线程每 16ms 忙 {args.load:g} ms")
+    print(f"QTimer.singleShot      : {_stats(timer_err)}")
+    print(f"提示点定时线程（界面）  : {_stats(clock_err)}")
+    print(f"提示点定时线程（线程内）: {_stats(thread_err)}")
+
+
+def _make_chirp_wav(path, seconds, rate=48000):
+    # 200Hz→400Hz 的对数扫频：不是周期信号，回退重播不会碰巧严丝合缝
+    import wave
+    import numpy as np
+
+    t = np.arange(int(seconds * rate)) / rate
+    k = np.log(2.0) / seconds
+    x = 0.25 * np.sin(2 * np.pi * 200 * (np.exp(k * t) - 1) / k)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((x * 32767).astype("<i2").tobytes())
+
+
+def _click_db(data, frame, rate):
+    # 切换点 ±50ms 内高频能量（三阶差分）最大的 5ms 窗口，相对切换前后稳定段的比值：
+    # 拼接处的跳变会冒出宽带的尖峰，平滑的增益变化、低频的梳状效应不会
+    import numpy as np
+
+    d = np.diff(data.mean(axis=1).astype(np.float64), n=3)
+    win = rate * 5 // 1000
+
+    def energy(lo, hi):
+        seg = d[max(0, lo) : max(0, hi)]
+        seg = seg[: len(seg) // win * win].reshape(-1, win)
+        return (seg**2).mean(axis=1)
+
+    near = rate // 20
+    around = energy(frame - near, frame + near)
+    before = np.median(energy(frame - rate, frame - 2 * near))
+    after = np.median(energy(frame + 2 * near, frame + rate))
+    return 10 * np.log10(around.max() / max(before, after, 1e-20))
+
+
+def bench_crossfade(args):
+    import tempfile
+    import render
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "easyplayer_xfade_chirp.wav")
+        _make_chirp_wav(path, args.at + 10)
+    rate = render.DEFAULT_RATE
+    base = {
+        "sample_rate": rate,
+        "tracks": {"A": {"path": path, "trim_start": False}},
+        "cues": [
+            {"at": 0, "track": "A", "action": "play"},
+            {"at": args.at, "track": "A", "action": "boost", "value": True},
+            {"at": args.at + 3, "track": "A", "action": "boost", "value": False},
+        ],
+    }
+    cases = [("停下换源 + 回退 500ms", {"switch_model": render.SWITCH_REWIND})]
+    for offset in args.offsets:
+        cases.append(
+            (
+                f"交叉淡化，对齐误差 {offset:g} ms",
+                {"switch_model": render.SWITCH_CROSSFADE, "switch_offset_ms": offset},
+            )
+        )
+    print(f"切换点附近差分能量峰值（相对稳定段，dB，越低越平滑）: {path}")
+    for label, extra in cases:
+        spec_file = os.path.join(tempfile.gettempdir(), "easyplayer_xfade.json")
+        with open(spec_file, "w", encoding="utf-8") as f:
+            json.dump(dict(base, **extra), f)
+        spec = render.load_cues(spec_file)
+        data, _ = render.render(spec, tail=1.0)
+        on = _click_db(data, int(args.at * rate), rate)
+        off = _click_db(data, int((args.at + 3) * rate), rate)
+        repeat = extra.get("switch_offset_ms", render.SWITCH_REWIND_MS)
+        print(
+            f"{label:<24} 开增益 {on:+6.1f} dB   关增益 {off:+6.1f} dB   "
+            f"重复/跳过 {repeat:g} ms"
+        )
+    print("（现场的停下换源还有一段重新缓冲的空白，这里没有计入）")
+
+
+def bench_analysis(args):
+    import analysis
+
+    names = list(analysis.ANALYZERS)
+    # 每个分析器各自解码一遍 vs 一次解码喂给全部分析器
+    t0 = time.perf_counter()
+    for name in names:
+        for path in args.files:
+            analysis.analyze_file(path, [name], use_cache=False)
+    separate = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for path in args.files:
+        result = analysis.analyze_file(path, names, use_cache=False)
+    single = time.perf_counter() - t0
+    hours = (
+        sum(
+            analysis.analyze_file(p, ["clip"])["decode"]["decoded_sec"]
+            for p in args.files
+        )
+        / 3600
+    )
+    print(
+        f"{len(args.files)} 个文件，{hours * 60:.1f} 分钟音频，分析器 {', '.join(names)}"
+    )
+    print(f"逐项解码: {separate:.2f}s  ({hours / separate * 60:.1f} 小时/分钟)")
+    print(f"单次解码: {single:.2f}s  ({hours / single * 60:.1f} 小时/分钟)")
+    print(f"最后一个文件: {analysis._summary(result)}")
+
+    _, _, stats = analysis.run_batch(args.files, names, args.workers, force=True)
+    print(
+        f"进程池 ({args.workers or os.cpu_count()} 进程): {stats['wall_sec']:.2f}s  "
+        f"({stats['hours_per_minute']:.1f} 小时/分钟)"
+    )
+
+
+def bench_dsp(args):
+    import tempfile
+
+    import analysis
+    import dsp
+    from pydub import AudioSegment
+
+    out_dir = tempfile.gettempdir()
+    rows = []
+    for path in args.files:
+        name = os.path.basename(path)
+        # 原来的路径：pydub 整首读进内存，+6dB，导出 WAV（超过满刻度的直接削平）
+        old_path = os.path.join(out_dir, f"bench_pydub_{name}.wav")
+        t0 = time.perf_counter()
+        (AudioSegment.from_file(path) + 6).export(old_path, format="wav")
+        old_sec = time.perf_counter() - t0
+        new_path = os.path.join(out_dir, f"bench_dsp_{name}.wav")
+        report = dsp.render_file(path, new_path, dsp.DEFAULT_CHAIN)
+        # 两边的输出用同一套分析器量，口径一致
+        old = analysis.analyze_file(old_path, ["clip", "loudness"], use_cache=False)
+        new = analysis.analyze_file(new_path, ["clip", "loudness"], use_cache=False)
+        rows.append((name, report["seconds"], old_sec, report["elapsed"], old, new))
+        for p in (old_path, new_path):
+            os.remove(p)
+
+    print(
+        f"{'文件':<24}{'时长':>8}{'pydub':>9}{'渲染链':>9}  削波采样 pydub/链  峰值 dBFS  响度 LUFS"
+    )
+    for name, sec, old_sec, new_sec, old, new in rows:
+        print(
+            f"{name[:23]:<24}{sec:>7.0f}s{old_sec:>8.2f}s{new_sec:>8.2f}s"
+            f"  {old['clip']['clipped_samples']:>8}/{new['clip']['clipped_samples']:<8}"
+            f"  {old['clip']['peak_db']:+.1f}/{new['clip']['peak_db']:+.1f}"
+            f"  {old['loudness']['integrated_lufs']}/{new['loudness']['integrated_lufs']}"
+        )
+    total = sum(r[1] for r in rows)
+    old_total = sum(r[2] for r in rows)
+    new_total = sum(r[3] for r in rows)
+    print(
+        f"合计 {total / 60:.1f} 分钟音频：pydub {old_total:.2f}s（{total / old_total:.0f}x 实时），"
+        f"渲染链 {new_total:.2f}s（{total / new_total:.0f}x 实时）"
+    )
+
+
+def bench_journal(args):
+    import tempfile
+
+    import journal
+
+    app = _qt_app()
+    path = os.path.join(tempfile.gettempdir(), "easyplayer_bench_journal.json")
+    t0 = time.perf_counter()
+
+    def collect():
+        # 和主窗口的快照同样的结构；在播的轨道位置每次都在变，每次都要写
+        now = int((time.perf_counter() - t0) * 1000)
+        return {
+            "scene": "默认场景",
+            "device_name": "bench",
+            "tracks": [
+                {
+                    "settings": {
+                        "path": f"/music/track_{i:03d}.mp3",
+                        "volume": 80,
+                        "loop": True,
+                        "boost": i % 5 == 0,
+                        "trim_start": True,
+                        "trim_end": False,
+                        "cue": None,
+                        "duck": None,
+                    },
+                    "playing": i < args.playing,
+                    "position_ms": now if i < args.playing else 0,
+                }
+                for i in range(args.tracks)
+            ],
+            "temp_files": [],
+        }
+
+    writer = journal.JournalWriter(collect, path)
+    writer.timer.setInterval(args.interval)
+    writer.start()
+    wall, cpu = _run_for(app, args.seconds)
+    writer.close()
+    snap, write = writer.snap_ms, writer.write_ms
+    print(
+        f"{args.tracks} 轨（{args.playing} 轨在播），每 {args.interval} ms 一次，{args.seconds:g}s"
+    )
+    print(
+        f"界面线程快照: {len(snap)} 次，平均 {sum(snap) / len(snap):.3f} ms，最大 {max(snap):.3f} ms"
+    )
+    print(
+        f"后台写盘: {len(write)} 次，平均 {sum(write) / len(write):.3f} ms，最大 {max(write):.3f} ms"
+    )
+    print(f"进程 CPU 占用 {cpu / wall * 100:.2f}%")
+
+    # 启动时读日志、转成场景的耗时（恢复到出声的其余部分取决于媒体加载，见运行时的“崩溃恢复”输出）
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(collect(), v=journal.VERSION, time=time.time()), f)
+    t = time.perf_counter()
+    scene = journal.scene_of(journal.load(path))
+    print(
+        f"读取日志 + 转成场景: {(time.perf_counter() - t) * 1000:.2f} ms（{len(scene['tracks'])} 轨）"
+    )
+    os.remove(path)
+
+
+def bench_sfx(args):
+    import tempfile
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtMultimedia import QAudioOutput, QMediaDevices, QMediaPlayer
+    import sfx
+
+    app = _qt_app()
+    path = os.path.join(tempfile.gettempdir(), "easyplayer_sfx_tone.wav")
+    _make_tone_wav(path, 2)
+    device = QMediaDevices.defaultAudioOutput()
+
+    def stats(ms):
+        ms = sorted(ms)
+        return (
+            f"平均 {sum(ms) / len(ms):6.1f} ms  P95 "
+            f"{ms[min(len(ms) - 1, int(len(ms) * 0.95))]:6.1f} ms  最大 {ms[-1]:6.1f} ms"
+        )
+
+    # 音效垫：PCM 已在内存，触发 = 加一个声部，等混音取走 + 声卡缓冲里排着的
+    player = sfx.SfxPlayer()
+    rate = player.set_device(device)
+    data = sfx.decode(path, rate)
+    mixer = player.mixer
+    if not _pump_until(
+        app, lambda: player.sink.bytesFree() < player.sink.bufferSize(), 5
+    ):
+        print("音效输出没有启动（没有可用的声卡？）")
+        return
+    for _ in range(args.count):
+        mixer.start(0, data, 1.0, sfx.MODE_RETRIGGER, set())
+        n = len(mixer.latencies)
+        _pump_until(app, lambda: len(mixer.latencies) > n, 2)
+        _pump_until(app, lambda: False, args.gap / 1000)
+    mixer.stop()
+    pad = list(mixer.latencies)
+    player.sink.stop()
+
+    # 普通轨道：媒体已加载好，play() 到播放位置开始走动（不含声卡缓冲，是下限）
+    track = QMediaPlayer()
+    output = QAudioOutput()
+    output.setDevice(device)
+    track.setAudioOutput(output)
+    track.setSource(QUrl.fromLocalFile(path))
+    loaded = (
+        QMediaPlayer.MediaStatus.LoadedMedia,
+        QMediaPlayer.MediaStatus.BufferedMedia,
+    )
+    if not _pump_until(app, lambda: track.mediaStatus() in loaded, 5):
+        print("普通轨道加载失败")
+        return
+    warm = []
+    for _ in range(args.count):
+        track.stop()
+        track.setPosition(0)
+        t = time.perf_counter()
+        track.play()
+        if _pump_until(app, lambda: track.position() > 0, 2):
+            warm.append((time.perf_counter() - t) * 1000)
+        _pump_until(app, lambda: False, args.gap / 1000)
+    track.stop()
+
+    # 普通轨道冷启动：每次重新 setSource 再 play()，和刚加进来的轨道一样
+    cold = []
+    for _ in range(min(args.count, 10)):
+        track.setSource(QUrl())
+        t = time.perf_counter()
+        track.setSource(QUrl.fromLocalFile(path))
+        track.play()
+        if _pump_until(app, lambda: track.position() > 0, 5):
+            cold.append((time.perf_counter() - t) * 1000)
+    track.stop()
+
+    print(
+        f"触发 {args.count} 次，间隔 {args.gap} ms，音效缓冲 {sfx.BUFFER_MS} ms，{rate} Hz"
+    )
+    print(f"音效垫（预载 PCM）      : {stats(pad)}")
+    if warm:
+        print(f"普通轨道（已加载）      : {stats(warm)}  + 声卡缓冲")
+    if cold:
+        print(f"普通轨道（setSource 起）: {stats(cold)}  + 声卡缓冲")
+
+
+def bench_transcode(args):
+    import resource
+    import subprocess
+    import tempfile
+    import pcm
+    import transcode
+
+    exe = pcm.ffmpeg_path()
+    target = (args.rate, "pcm_s16le", 2)
+    tmp = tempfile.mkdtemp(prefix="easyplayer_transcode_")
+
+    def run_cpu(path, extra):
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        subprocess.run(
+            [exe, "-v", "error", "-nostdin", "-i", path, "-vn", "-ac", "2"]
+            + ["-ar", str(args.rate)]
+            + extra
+            + ["-f", "null", "-"],
+            check=True,
+        )
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    def decode_cpu(path):
+        # 解码 + 重采样到设备采样率，丢弃输出；只算 ffmpeg 子进程的 CPU，扣掉进程启动
+        return max(0.0, run_cpu(path, []) - run_cpu(path, ["-t", "0.01"]))
+
+    converted = []
+    print(f"目标: {args.rate} Hz 16 位立体声")
+    for path in args.files:
+        info = pcm.probe(path)
+        minutes = (info["duration"] or 0) / 60
+        out = os.path.join(tmp, f"{len(converted)}.wav")
+        t = time.perf_counter()
+        transcode.transcode_file(path, out, target, 2, info["duration"] or 0)
+        cost = time.perf_counter() - t
+        converted.append(out)
+        orig = decode_cpu(path)
+        cached = decode_cpu(out)
+        print(
+            f"{os.path.basename(path)} ({info['codec']}, {info['sample_rate']} Hz, {minutes:.1f} 分钟)"
+        )
+        print(
+            f"  每分钟音频的解码 CPU: 原文件 {orig / max(minutes, 1e-6) * 1000:7.1f} ms"
+            f"  转码缓存 {cached / max(minutes, 1e-6) * 1000:7.1f} ms"
+        )
+        print(f"  一次性转码 {cost:.1f}s，缓存 {os.path.getsize(out) / 1048576:.0f} MB")
+
+    if args.play:
+        # 真实播放：每个文件开 args.play 轨一起循环，比较进程 CPU 占用（需要声卡）
+        from PyQt6.QtCore import QUrl
+        from PyQt6.QtMultimedia import QAudioOutput, QMediaDevices, QMediaPlayer
+
+        app = _qt_app()
+        device = QMediaDevices.defaultAudioOutput()
+
+        def play(paths):
+            players = []
+            for path in paths:
+                for _ in range(args.play):
+                    player = QMediaPlayer()
+                    output = QAudioOutput()
+                    output.setDevice(device)
+                    output.setVolume(0.0)
+                    player.setAudioOutput(output)
+                    player.setLoops(QMediaPlayer.Loops.Infinite)
+                    player.setSource(QUrl.fromLocalFile(path))
+                    player.play()
+                    players.append((player, output))
+            _pump_until(app, lambda: all(p.position() > 0 for p, _ in players), 5)
+            wall, cpu = _run_for(app, args.seconds)
+            for p, _ in players:
+                p.stop()
+            return len(players), cpu / wall * 100
+
+        n, orig = play(args.files)
+        _, cached = play(converted)
+        print(
+            f"{n} 轨同时循环 {args.seconds:g}s，进程 CPU: 原文件 {orig:.1f}%  转码缓存 {cached:.1f}%"
+        )
+
+    for out in converted:
+        os.remove(out)
+    os.rmdir(tmp)
+
+
+def _sync_follower(args):
+    from cues import ClockThread
+    import sync
+
+    app = _qt_app()
+    follower = sync.SyncFollower(args.follow, args.port, args.skew)
+    clock = ClockThread()
+    fired = []
+
+    def on_message(msg, local_at):
+        if msg.get("t") == "cmd":
+            clock.schedule(msg["seq"], local_at)
+
+    def on_due(seq, deadline, emitted):
+        # 界面线程里真正能执行命令的时刻
+        fired.append({"seq": seq, "emitted": emitted, "gui": time.perf_counter()})
+
+    follower.message.connect(on_message)
+    clock.due.connect(on_due)
+    clock.start()
+    _run_for(app, args.seconds)
+    clock.stop()
+    follower.close()
+    print(
+        json.dumps(
+            {
+                "skew": args.skew,
+                "offset": follower.offset,
+                "rtt": follower.rtt,
+                "fired": fired,
+            }
+        )
+    )
+
+
+def bench_sync(args):
+    import random
+    import subprocess
+    import sync
+
+    if args.follow:
+        _sync_follower(args)
+        return
+    app = _qt_app()
+    leader = sync.SyncLeader(args.port)
+    script = os.path.abspath(sys.argv[0])
+    rng = random.Random(0)
+    total = 3 + args.commands * args.gap / 1000 + args.lead / 1000 + 2
+    procs = []
+    for _ in range(args.followers):
+        # 每个从机假装时钟差了几分钟，偏移估计要把它消掉
+        skew = rng.uniform(-300, 300)
+        cmd = [sys.executable, script, "sync", "--follow", "127.0.0.1"]
+        cmd += ["--port", str(args.port), "--skew", repr(skew)]
+        cmd += ["--seconds", str(total)]
+        procs.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True))
+    if not _pump_until(app, lambda: len(leader.followers) == args.followers, 10):
+        print("从机没有全部连上")
+    # 等几轮快速 ping，让偏移估计收敛
+    _pump_until(app, lambda: False, sync.BURST * sync.BURST_MS / 1000 + 0.5)
+    intended = {}
+    for _ in range(args.commands):
+        msg = leader.send(
+            {"t": "cmd", "action": "bench", "at": leader.now() + args.lead / 1000}
+        )
+        intended[msg["seq"]] = msg["at"]
+        _pump_until(app, lambda: False, args.gap / 1000)
+    results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    leader.close()
+
+    def stats(xs):
+        xs = sorted(abs(x) for x in xs)
+        if not xs:
+            return "无数据"
+        p95 = xs[min(len(xs) - 1, int(len(xs) * 0.95))]
+        return f"平均 {sum(xs) / len(xs):6.2f} ms  P95 {p95:6.2f} ms  最大 {xs[-1]:6.2f} ms"
+
+    print(
+        f"{args.followers} 个从机进程，{args.commands} 条命令，提前 {args.lead} ms 广播（本机回环）"
+    )
+    by_seq = {}
+    for i, r in enumerate(results):
+        errors = []
+        for f in r["fired"]:
+            at = intended.get(f["seq"])
+            if at is None:
+                continue
+            errors.append((f["gui"] - at) * 1000)
+            by_seq.setdefault(f["seq"], []).append(f["gui"])
+        residual = (r["offset"] + r["skew"]) * 1000 if r["offset"] is not None else 0.0
+        print(
+            f"从机 {i + 1}: 时钟差 {r['skew']:+8.1f}s，估计残差 {residual:+.3f} ms，"
+            f"往返 {(r['rtt'] or 0) * 1000:.3f} ms，收到 {len(errors)}/{args.commands}"
+        )
+        print(f"  执行时刻 - 约定时刻: {stats(errors)}")
+    spread = [(max(ts) - min(ts)) * 1000 for ts in by_seq.values() if len(ts) > 1]
+    if spread:
+        print(f"同一条命令在各从机之间的差: {stats(spread)}")
+
+
+def bench_relink(args):
+    import random
+    import shutil
+    import tempfile
+
+    import relink
+
+    # 造一个音乐库：艺人/专辑/NN 曲名.mp3，很多专辑里都有 "01 Intro.mp3" 这种重名
+    rng = random.Random(1)
+    base = tempfile.mkdtemp(prefix="easyplayer_relink_")
+    old_root = os.path.join(base, "OldDrive", "Music")
+    new_root = os.path.join(base, "NewDrive", "Backup", "Music")
+    common = ["Intro", "Outro", "Interlude", "Untitled", "Theme"]
+    paths = []
+    t0 = time.perf_counter()
+    for i in range(args.files):
+        artist, album = i // 200, i // 20
+        title = common[i % 5] if i % 7 == 0 else f"Song {i}"
+        d = os.path.join(old_root, f"Artist {artist}", f"Album {album}")
+        if i % 20 == 0:
+            os.makedirs(d, exist_ok=True)
+        p = os.path.join(d, f"{i % 20 + 1:02d} {title}.mp3")
+        with open(p, "wb") as f:
+            f.write(rng.randbytes(rng.randrange(512, 4096)))
+        paths.append(p)
+    print(f"生成 {args.files} 个文件用时 {time.perf_counter() - t0:.1f}s")
+
+    try:
+        picked = rng.sample(paths, args.tracks)
+        tracks = [
+            {"path": p, "fingerprint": relink.fingerprint(p) if n % 4 else None}
+            for n, p in enumerate(picked)
+        ]
+        # 整个库挪到别的盘，顺手改了几个文件名
+        shutil.move(old_root, new_root)
+        expected = {}
+        for n, p in enumerate(picked):
+            moved = new_root + p[len(old_root) :]
+            if n % 10 == 1:
+                head, tail = os.path.split(moved)
+                os.rename(moved, os.path.join(head, "renamed " + tail))
+                moved = os.path.join(head, "renamed " + tail)
+            elif n % 10 == 3:
+                # 同名但内容换了：有指纹的轨道不能接到它上面
+                with open(moved, "wb") as f:
+                    f.write(rng.randbytes(5000))
+                moved = None
+            expected[p] = moved
+
+        t0 = time.perf_counter()
+        index = relink.scan([os.path.join(base, "NewDrive")])
+        t1 = time.perf_counter()
+        results, reads = relink.resolve(tracks, index)
+        t2 = time.perf_counter()
+
+        right = sum(1 for old, new, _ in results if new == expected[old])
+        wrong = sum(1 for old, new, _ in results if new and new != expected[old])
+        hows = {}
+        for _, _, how in results:
+            hows[how] = hows.get(how, 0) + 1
+        print(
+            f"索引 {index['files']} 个文件 / {index['dirs']} 个文件夹: {(t1 - t0) * 1000:.0f} ms"
+        )
+        print(f"匹配 {len(tracks)} 轨: {(t2 - t1) * 1000:.1f} ms，读指纹 {reads} 次")
+        print(
+            f"找对 {right}（含内容被替换、应当找不到的 {sum(1 for v in expected.values() if v is None)} 轨），找错 {wrong}，方式 {hows}"
+        )
+
+        # 对照：每一轨各自在整棵树里按文件名找一遍
+        name = os.path.basename(picked[0]).lower()
+        t0 = time.perf_counter()
+        for top, _, files in os.walk(os.path.join(base, "NewDrive")):
+            for f in files:
+                if f.lower() == name:
+                    pass
+        walk = time.perf_counter() - t0
+        print(
+            f"逐轨 os.walk 查找: 单轨 {walk * 1000:.0f} ms，{len(tracks)} 轨约 {walk * len(tracks):.1f}s"
+        )
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def bench_fetch(args):
+    # 不是性能测量：在回环地址上起一个 http.server，检查 download_ffmpeg 的
+    # 断点续传、5xx 重试、4xx 不重试、SHA-256 校验失败和解压。有失败时退出码为 1
+    import io
+    import shutil
+    import tarfile
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import download_ffmpeg as dl
+
+    base = tempfile.mkdtemp(prefix="easyplayer_fetch_")
+    payload = {"ffmpeg": os.urandom(args.size * 1024), "ffprobe": os.urandom(4096)}
+    archive = os.path.join(base, "ffmpeg-test.tar.gz")
+    with tarfile.open(archive, "w:gz") as t:
+        for name, data in payload.items():
+            info = tarfile.TarInfo(f"ffmpeg-test/bin/{name}")
+            info.size = len(data)
+            t.addfile(info, io.BytesIO(data))
+    with open(archive, "rb") as f:
+        blob = f.read()
+    sums = f"{dl.sha256_file(archive)}  ffmpeg-test.tar.gz\n".encode()
+    files = {"/ffmpeg-test.tar.gz": blob, "/ffmpeg-test.tar.gz.sha256": sums}
+    # 依次对压缩包的请求注入的故障：传到一半断线、503，之后正常（支持 Range）
+    faults = ["drop", 503]
+    log = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            data = files.get(self.path)
+            rng = self.headers.get("Range")
+            start = int(rng[6:].split("-")[0]) if rng else 0
+            fault = faults.pop(0) if data is blob and faults else None
+            log.append((self.path, start, fault))
+            if data is None:
+                self.send_error(404)
+                return
+            if fault == 503:
+                self.send_error(503)
+                return
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206 if start else 200)
+            if start:
+                self.send_header(
+                    "Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}"
+                )
+            self.send_header("Content-Length", str(len(data) - start))
+            self.end_headers()
+            if fault == "drop":
+                self.wfile.write(data[start : start + len(data) // 3])
+                self.close_connection = True
+                return
+            self.wfile.write(data[start:])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/ffmpeg-test.tar.gz"
+    results = []
+
+    def check(label, ok):
+        results.append(ok)
+        print(f"{'✔' if ok else '✘'} {label}")
+
+    try:
+        out = os.path.join(base, "ok")
+        os.makedirs(out)
+        t0 = time.perf_counter()
+        ok = dl.download_ffmpeg(url, out)
+        print(f"（下载含两次退避，用时 {time.perf_counter() - t0:.1f}s）")
+        archive_log = [e for e in log if e[0] == "/ffmpeg-test.tar.gz"]
+        check("断线、503 之后下载成功", ok)
+        check("503 被重试", any(f == 503 for _, _, f in archive_log))
+        check(
+            "断线后从断点续传（Range 起点 > 0）",
+            any(start > 0 for _, start, _ in archive_log),
+        )
+        for name, data in payload.items():
+            path = os.path.join(out, name)
+            same = False
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    same = f.read() == data
+            check(f"解压出的 {name} 和原文件一致", same)
+        check(
+            "下载完删掉压缩包",
+            not os.path.exists(os.path.join(out, "ffmpeg-test.tar.gz")),
+        )
+
+        out = os.path.join(base, "bad_sum")
+        os.makedirs(out)
+        ok = dl.download_ffmpeg(url, out, sha256="0" * 64)
+        check("SHA-256 不符时失败", not ok)
+        check("校验失败不解压", not os.path.exists(os.path.join(out, "ffmpeg")))
+        check("校验失败删掉压缩包", not os.listdir(out))
+
+        out = os.path.join(base, "missing")
+        os.makedirs(out)
+        before = len(log)
+        ok = dl.download_ffmpeg(url.replace("test", "none"), out)
+        check("404 直接失败、不重试", not ok and len(log) - before == 1)
+    finally:
+        server.shutdown()
+        shutil.rmtree(base, ignore_errors=True)
+    print(f"{sum(results)}/{len(results)} 通过")
+    if not all(results):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EasyPlayer 性能测量")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("meters", help="多轨电平表的 CPU 开销")
+    p.add_argument("--tracks", type=int, default=20)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--rate", type=int, default=48000)
+    p.add_argument("--frames", type=int, default=1024)
+    p.set_defaults(func=bench_meters)
+
+    p = sub.add_parser("seek", help="VBR MP3 寻址误差与延迟（帧索引前后）")
+    p.add_argument("file")
+    p.add_argument("--make", type=int, metavar="SECONDS", help="先生成测试文件")
+    p.add_argument("--points", type=int, default=12)
+    p.set_defaults(func=bench_seek)
+
+    p = sub.add_parser("silence", help="首尾静音检测的吞吐量")
+    p.add_argument("file")
+    p.add_argument("--make", type=int, metavar="SECONDS", help="先生成测试文件")
+    p.set_defaults(func=bench_silence)
+
+    p = sub.add_parser("widgets", help="轨道控件创建耗时（逐个样式表 vs 全局主题）")
+    p.add_argument("--count", type=int, default=200)
+    p.set_defaults(func=bench_widgets)
+
+    p = sub.add_parser(
+        "engine-fade",
+        help="界面线程卡住时渐隐时长是否准确（需要声卡；--headless 不需要）",
+    )
+    p.add_argument("--fade", type=float, default=2.0)
+    p.add_argument("--block", type=float, default=1.5)
+    p.add_argument(
+        "--headless",
+        action="store_true",
+        help="引擎里换成不出声的轨道，检查渐隐时长是否在容差内（不需要声卡）",
+    )
+    p.add_argument("--tolerance", type=float, default=0.05, help="容差（秒）")
+    p.set_defaults(func=bench_engine_fade)
+
+    p = sub.add_parser("cues", help="提示点定时精度（QTimer vs 高精度定时线程）")
+    p.add_argument("--count", type=int, default=200)
+    p.add_argument("--span", type=float, default=3.0, help="定时点分布在几秒内")
+    p.add_argument("--load", type=float, default=4.0, help="界面线程每帧忙多少毫秒")
+    p.set_defaults(func=bench_cues)
+
+    p = sub.add_parser("crossfade", help="增益切换的断音：回退重播 vs 交叉淡化（离线）")
+    p.add_argument("file", nargs="?", help="不指定则用 200-400Hz 扫频")
+    p.add_argument("--at", type=float, default=3.0, help="第几秒开增益")
+    p.add_argument(
+        "--offsets", type=float, nargs="+", default=[0, 2, 8], help="对齐误差（毫秒）"
+    )
+    p.set_defaults(func=bench_crossfade)
+
+    p = sub.add_parser("analysis", help="单次解码分析流水线 vs 每项分析各解一遍")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--workers", type=int, default=None)
+    p.set_defaults(func=bench_analysis)
+
+    p = sub.add_parser("dsp", help="增益渲染：pydub +6dB vs 处理链的吞吐量和削波")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=bench_dsp)
+
+    p = sub.add_parser("journal", help="崩溃恢复日志的写入开销")
+    p.add_argument("--tracks", type=int, default=30)
+    p.add_argument("--playing", type=int, default=4)
+    p.add_argument("--interval", type=int, default=1000, help="快照间隔 ms")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.set_defaults(func=bench_journal)
+
+    p = sub.add_parser("sfx", help="音效垫触发延迟 vs 普通轨道 play()（需要声卡）")
+    p.add_argument("--count", type=int, default=50)
+    p.add_argument("--gap", type=int, default=150, help="两次触发间隔 ms")
+    p.set_defaults(func=bench_sfx)
+
+    p = sub.add_parser("transcode", help="解码/重采样 CPU：原文件 vs PCM 转码缓存")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--rate", type=int, default=48000, help="设备采样率")
+    p.add_argument(
+        "--play", type=int, default=0, help="每个文件开几轨实际播放（需要声卡）"
+    )
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.set_defaults(func=bench_transcode)
+
+    p = sub.add_parser("sync", help="多机同步：本机多个从机进程走回环的执行误差")
+    p.add_argument("--followers", type=int, default=3)
+    p.add_argument("--commands", type=int, default=40)
+    p.add_argument("--gap", type=int, default=100, help="两条命令间隔 ms")
+    p.add_argument("--lead", type=int, default=150, help="提前广播 ms")
+    p.add_argument("--port", type=int, default=47899)
+    p.add_argument("--follow", metavar="HOST", help=argparse.SUPPRESS)
+    p.add_argument("--skew", type=float, default=0.0, help=argparse.SUPPRESS)
+    p.add_argument("--seconds", type=float, default=10.0, help=argparse.SUPPRESS)
+    p.set_defaults(func=bench_sync)
+
+    p = sub.add_parser("relink", help="重新定位：十万个文件的索引和一次性匹配")
+    p.add_argument("--files", type=int, default=100000)
+    p.add_argument("--tracks", type=int, default=60)
+    p.set_defaults(func=bench_relink)
+
+    p = sub.add_parser(
+        "fetch", help="download_ffmpeg 对着本机 HTTP 服务器的续传/重试/校验检查"
+    )
+    p.add_argument("--size", type=int, default=2048, help="假 ffmpeg 的大小 KB")
+    p.set_defaults(func=bench_fetch)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
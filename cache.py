@@ -0,0 +1,58 @@
+import os
+import json
+import hashlib
+
+# --- 本地持久缓存 ---
+# 所有按文件计算一次就能复用的结果（寻址索引、分析结果等）都放在这里，
+# 键由 路径 + 大小 + 修改时间 组成，文件被替换后自动失效。
+
+
+def cache_root():
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "EasyPlayer", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "easyplayer")
+
+
+def cache_dir(name):
+    path = os.path.join(cache_root(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_key(path):
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cache_path(name, key, ext):
+    return os.path.join(cache_dir(name), key + ext)
+
+
+def atomic_write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    mode = "wb" if isinstance(data, bytes) else "w"
+    encoding = None if isinstance(data, bytes) else "utf-8"
+    with open(tmp, mode, encoding=encoding) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_json(name, key):
+    path = cache_path(name, key, ".json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(name, key, data):
+    try:
+        atomic_write(
+            cache_path(name, key, ".json"), json.dumps(data, ensure_ascii=False)
+        )
+    except OSError as e:
+        print(f"写入缓存失败: {e}")
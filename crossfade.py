@@ -0,0 +1,176 @@
+import math
+import time
+
+from PyQt6.QtCore import QObject, Qt, QTimer, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QAudioOutput, QMediaPlayer
+
+import hud
+import seek_index
+from tracer import TRACER
+
+# --- 换源交叉淡化 ---
+# 播放中切换 200% 增益时不再停下、换源、回退 500ms 重播，而是：
+# 1. 新建一个静音的备用播放器加载另一个源（同一输出设备）
+# 2. 定位到当前播放位置并开始播放，对比两个播放器的位置，差得多就再微调，直到对齐
+# 3. 两路做一次短的等功率交叉淡化（cos/sin），然后释放旧播放器，轨道接管新的
+# 对齐误差、准备耗时记进追踪；离线的断音量化见 bench.py crossfade。
+# 备用播放器迟迟就绪不了（坏文件、设备问题）就退回原来的直接换源。
+
+CROSSFADE_MS = 60
+TICK_MS = 5
+ALIGN_MS = 8  # 两个播放器位置差在这之内算对齐
+MAX_RESEEKS = 3
+MAX_OFFSET_MS = 250  # 微调几次还差这么多就放弃，直接换源
+PREPARE_TIMEOUT_MS = 2000
+
+LOADING = "loading"
+ALIGNING = "aligning"
+FADING = "fading"
+DONE = "done"
+
+
+def equal_power(t):
+    # 返回 (旧源增益, 新源增益)，t 从 0 到 1
+    t = min(1.0, max(0.0, t))
+    return math.cos(t * math.pi / 2), math.sin(t * math.pi / 2)
+
+
+class SourceCrossfader(QObject):
+    # 一轨一次换源；成功发 done(播放器, 输出, 切片设备, 切片偏移)，失败发 failed(原因)
+    done = pyqtSignal(object, object, object, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, w, path, is_boosted):
+        super().__init__(w)
+        self.w = w
+        self.path = path
+        self.is_boosted = is_boosted
+        self.state = LOADING
+        self.reseeks = 0
+        self.offset_ms = None
+        self.t_start = time.perf_counter()
+        self.t_fade = None
+
+        self.output = QAudioOutput()
+        self.output.setDevice(w.audio_output.device())
+        self.output.setVolume(0.0)
+        self.player = QMediaPlayer()
+        self.player.setAudioOutput(self.output)
+        hud.register("player", self.player)
+        hud.register("output", self.output)
+
+        # 切回原文件时，VBR MP3 同样用帧索引定位，和 seek_to 一样
+        self.slice_device = None
+        self.slice_offset = 0
+        index = w.seek_index_for(path) if not is_boosted else None
+        frame = index.frame_at(w.current_position()) if index is not None else 0
+        if frame > 0:
+            self.slice_device = seek_index.FrameSliceDevice(
+                path, index.offsets[frame], index.data_end, w
+            )
+            self.slice_offset = index.frame_time(frame)
+            self.player.setSourceDevice(self.slice_device, QUrl.fromLocalFile(path))
+        else:
+            self.player.setSource(QUrl.fromLocalFile(path))
+        self.player.mediaStatusChanged.connect(self._on_status)
+        self.player.positionChanged.connect(self._on_position)
+
+        self.timeout = QTimer(self)
+        self.timeout.setSingleShot(True)
+        self.timeout.timeout.connect(lambda: self._fail("备用播放器准备超时"))
+        self.timeout.start(PREPARE_TIMEOUT_MS)
+        self.ticker = QTimer(self)
+        self.ticker.setTimerType(Qt.TimerType.PreciseTimer)
+        self.ticker.setInterval(TICK_MS)
+        self.ticker.timeout.connect(self._tick)
+
+    def _offset(self):
+        # 备用播放器比当前播放器超前多少毫秒
+        return self.player.position() + self.slice_offset - self.w.current_position()
+
+    def _on_status(self, status):
+        if status == QMediaPlayer.MediaStatus.InvalidMedia:
+            self._fail(self.player.errorString() or "无法打开")
+            return
+        if self.state != LOADING or status not in (
+            QMediaPlayer.MediaStatus.LoadedMedia,
+            QMediaPlayer.MediaStatus.BufferedMedia,
+        ):
+            return
+        self.state = ALIGNING
+        self.player.setPosition(max(0, self.w.current_position() - self.slice_offset))
+        self.player.play()
+
+    def _on_position(self, _):
+        if self.state != ALIGNING:
+            return
+        if self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            return
+        offset = self._offset()
+        if abs(offset) > ALIGN_MS and self.reseeks < MAX_RESEEKS:
+            self.reseeks += 1
+            self.player.setPosition(max(0, self.player.position() - offset))
+            return
+        if abs(offset) > MAX_OFFSET_MS:
+            self._fail(f"对不齐（相差 {offset} ms）")
+            return
+        self.offset_ms = offset
+        self.timeout.stop()
+        self.state = FADING
+        self.t_fade = time.perf_counter()
+        self.ticker.start()
+
+    def _level(self):
+        return self.w.target_volume()
+
+    def _tick(self, t=None):
+        if t is None:
+            t = (time.perf_counter() - self.t_fade) * 1000 / CROSSFADE_MS
+        old, new = equal_power(t)
+        level = self._level()
+        self.w.audio_output.setVolume(old * level)
+        self.output.setVolume(new * level)
+        if t < 1.0:
+            return
+        self.ticker.stop()
+        self.state = DONE
+        TRACER.instant(
+            "crossfade",
+            "boost",
+            track=self.w.trace_name,
+            boosted=self.is_boosted,
+            offset_ms=self.offset_ms,
+            reseeks=self.reseeks,
+            prepare_ms=(self.t_fade - self.t_start) * 1000,
+        )
+        self.done.emit(self.player, self.output, self.slice_device, self.slice_offset)
+
+    def finish_now(self):
+        # 操作员在切换途中又按了别的：淡化已经开始就直接走完，返回 False 表示还没就绪
+        if self.state == FADING:
+            self._tick(1.0)
+            return True
+        return self.state == DONE
+
+    def cancel(self):
+        if self.state == FADING:
+            self.w.audio_output.setVolume(self._level())
+        self.state = DONE
+        self.timeout.stop()
+        self.ticker.stop()
+        self._release()
+
+    def _fail(self, reason):
+        if self.state == DONE:
+            return
+        self.cancel()
+        self.failed.emit(reason)
+
+    def _release(self):
+        self.player.blockSignals(True)
+        self.player.stop()
+        self.player.deleteLater()
+        self.output.deleteLater()
+        if self.slice_device is not None:
+            self.slice_device.close()
+            self.slice_device.deleteLater()
@@ -0,0 +1,380 @@
+import os
+import time
+import heapq
+import datetime
+import threading
+
+from PyQt6.QtCore import QObject, QThread, QTime, pyqtSignal
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QDoubleSpinBox,
+    QFormLayout,
+    QTimeEdit,
+)
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from tracer import TRACER
+
+# --- 提示点调度 ---
+# 轨道可以设一个自动启动的提示点：
+# - 定时：到某个钟点开始
+# - 跟随开始：另一轨开始播放后 N 秒
+# - 接续：另一轨（不循环）播完时紧接着开始，按它的播放位置预测结束时刻，不等 EndOfMedia
+# 到点前 ARM_AHEAD_SEC 先把目标轨定位到起点并暂停（预卷），到点只需 play()。
+# 计时在独立线程里按 perf_counter 走：先睡到差 SPIN_SEC，再忙等到点，不依赖 QTimer 的精度。
+# 每次触发记录“应触发 → 实际调用 play()”的偏差，超过 GAP_TARGET_MS 会在控制台提示。
+
+MODE_NONE = ""
+MODE_AT = "at"
+MODE_AFTER_START = "after_start"
+MODE_FOLLOW = "follow"
+
+ARM_AHEAD_SEC = 2.0
+SPIN_SEC = 0.002
+GAP_TARGET_MS = 20.0
+REPREDICT_MS = 5.0  # 预测的结束时刻变化超过这么多才重新排
+NATURAL_END_SEC = 0.5  # 离预测结尾这么近时停下，算作自然播完（去尾是靠位置检查停的）
+
+
+def normalize_cue(data):
+    if not data or data.get("mode") not in (MODE_AT, MODE_AFTER_START, MODE_FOLLOW):
+        return None
+    return {
+        "mode": data["mode"],
+        "time": data.get("time", "00:00:00"),
+        "source": data.get("source", ""),
+        "delay": float(data.get("delay", 0.0)),
+    }
+
+
+def describe(cue):
+    if cue is None:
+        return ""
+    if cue["mode"] == MODE_AT:
+        return f"⏱ {cue['time']}"
+    source = os.path.basename(cue["source"])
+    if cue["mode"] == MODE_AFTER_START:
+        return f"⏱ {source} 开始后 {cue['delay']:g}s"
+    return f"⏱ 接在 {source} 之后"
+
+
+def wall_deadline(hms, now=None):
+    # 今天的某个钟点换算成 perf_counter 时刻；已经过了返回 None
+    now = now or datetime.datetime.now()
+    h, m, s = (int(x) for x in hms.split(":"))
+    target = now.replace(hour=h, minute=m, second=s, microsecond=0)
+    left = (target - now).total_seconds()
+    if left < 0:
+        return None
+    return time.perf_counter() + left
+
+
+class ClockThread(QThread):
+    # 高精度定时：到点前 ARM_AHEAD_SEC 发 arm，到点发 due
+    arm = pyqtSignal(int)
+    due = pyqtSignal(int, float, float)  # 令牌, 应触发时刻, 实际发出时刻
+
+    def __init__(self):
+        super().__init__()
+        self.cond = threading.Condition()
+        self.heap = []  # (时刻, 令牌, 类型)
+        self.live = {}  # 令牌 -> 应触发时刻
+        self.running = True
+
+    def schedule(self, token, deadline):
+        with self.cond:
+            self.live[token] = deadline
+            heapq.heappush(self.heap, (deadline - ARM_AHEAD_SEC, token, "arm"))
+            heapq.heappush(self.heap, (deadline, token, "due"))
+            self.cond.notify()
+
+    def cancel(self, token):
+        with self.cond:
+            self.live.pop(token, None)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.wait(1000)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and not self._next_live():
+                    self.cond.wait()
+                if not self.running:
+                    return
+                at, token, kind = self.heap[0]
+                left = at - time.perf_counter()
+                if left > SPIN_SEC:
+                    self.cond.wait(left - SPIN_SEC)
+                    continue
+                heapq.heappop(self.heap)
+                if kind == "due":
+                    self.live.pop(token)
+            while time.perf_counter() < at:
+                pass
+            if kind == "arm":
+                self.arm.emit(token)
+            else:
+                self.due.emit(token, at, time.perf_counter())
+
+    def _next_live(self):
+        # 丢掉已取消或被重新排过的条目
+        while self.heap:
+            at, token, kind = self.heap[0]
+            deadline = self.live.get(token)
+            if deadline is not None and at == (
+                deadline - ARM_AHEAD_SEC if kind == "arm" else deadline
+            ):
+                return True
+            heapq.heappop(self.heap)
+        return False
+
+
+class CueScheduler(QObject):
+    def __init__(self, tracks, parent=None):
+        super().__init__(parent)
+        self.tracks = tracks  # 返回当前所有轨道控件
+        self.clock = ClockThread()
+        self.clock.arm.connect(self._on_arm)
+        self.clock.due.connect(self._on_due)
+        self.clock.start()
+        self.next_token = 0
+        self.tokens = {}  # 令牌 -> 目标轨道
+        self.by_target = {}  # 目标轨道 -> (令牌, 应触发时刻)
+        self.primed = set()
+        self.jitter = []
+
+    def attach(self, w):
+        w.cue_changed.connect(lambda w=w: self.rearm(w))
+        w.player_changed.connect(lambda w=w: self._hook_player(w))
+        self._hook_player(w)
+        self.rearm(w)
+
+    def _hook_player(self, w):
+        # 换源交叉淡化后播放器是新的，旧连接随旧播放器一起释放
+        w.player.playbackStateChanged.connect(
+            lambda state, w=w: self._on_source_state(w, state)
+        )
+        w.player.positionChanged.connect(lambda _, w=w: self._on_source_position(w))
+
+    def detach(self, w):
+        # 来源轨被移除：跟着它的接续和延时启动都不会再有人触发
+        self._cancel(w)
+        for mode in (MODE_AFTER_START, MODE_FOLLOW):
+            for t in self._followers(w, mode):
+                self._cancel(t)
+
+    def rearm(self, w):
+        self._cancel(w)
+        cue = w.cue
+        if cue is None:
+            return
+        if cue["mode"] == MODE_AT:
+            deadline = wall_deadline(cue["time"])
+            if deadline is not None:
+                self._schedule(w, deadline)
+            return
+        source = self._source_of(w)
+        if source is None or not self._is_playing(source):
+            return
+        if cue["mode"] == MODE_FOLLOW:
+            self._predict(w, source)
+
+    def _source_of(self, w):
+        for t in self.tracks():
+            if t is not w and t.original_path == w.cue["source"]:
+                return t
+        return None
+
+    def _followers(self, source, mode):
+        return [
+            t
+            for t in self.tracks()
+            if t is not source
+            and t.cue is not None
+            and t.cue["mode"] == mode
+            and t.cue["source"] == source.original_path
+        ]
+
+    def _is_playing(self, w):
+        return w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+
+    def _schedule(self, w, deadline):
+        self._cancel(w, unprime=False)
+        self.next_token += 1
+        token = self.next_token
+        self.tokens[token] = w
+        self.by_target[w] = (token, deadline)
+        self.clock.schedule(token, deadline)
+        if deadline - time.perf_counter() <= ARM_AHEAD_SEC:
+            self._on_arm(token)
+
+    def _cancel(self, w, unprime=True):
+        entry = self.by_target.pop(w, None)
+        if entry is not None:
+            self.clock.cancel(entry[0])
+            self.tokens.pop(entry[0], None)
+        if unprime and w in self.primed:
+            self.primed.discard(w)
+            w.unprime()
+
+    def _predict(self, target, source):
+        # 接续：按来源轨当前位置预测它播完的时刻
+        if source.chk_loop.isChecked():
+            return
+        end = source.play_end_ms()
+        if end is None:
+            end = source.player.duration() + source.slice_offset
+        if end <= 0:
+            return
+        deadline = time.perf_counter() + (end - source.current_position()) / 1000.0
+        entry = self.by_target.get(target)
+        if entry is not None and abs(entry[1] - deadline) * 1000 < REPREDICT_MS:
+            return
+        self._schedule(target, deadline)
+
+    def _on_source_state(self, source, state):
+        playing = state == QMediaPlayer.PlaybackState.PlayingState
+        if playing:
+            self.primed.discard(source)
+            started = time.perf_counter()
+            for t in self._followers(source, MODE_AFTER_START):
+                if not self._is_playing(t):
+                    self._schedule(t, started + t.cue["delay"])
+            for t in self._followers(source, MODE_FOLLOW):
+                self._predict(t, source)
+            return
+        ended = source.player.mediaStatus() == QMediaPlayer.MediaStatus.EndOfMedia
+        for t in self._followers(source, MODE_FOLLOW):
+            entry = self.by_target.get(t)
+            if entry is None:
+                continue
+            left = entry[1] - time.perf_counter()
+            if ended and left > 0:
+                # 预测偏晚，已经播到头了：立刻接上
+                self.clock.cancel(entry[0])
+                self._on_due(entry[0], entry[1], time.perf_counter())
+            elif not ended and left > NATURAL_END_SEC:
+                # 离结尾还远就停了/暂停了，是手动操作，不再接续
+                self._cancel(t)
+
+    def _on_source_position(self, source):
+        if not self._is_playing(source):
+            return
+        for t in self._followers(source, MODE_FOLLOW):
+            if t in self.by_target or not self._is_playing(t):
+                self._predict(t, source)
+
+    def _on_arm(self, token):
+        w = self.tokens.get(token)
+        if w is None or self._is_playing(w) or w in self.primed:
+            return
+        self.primed.add(w)
+        w.prime()
+
+    def _on_due(self, token, deadline, emitted):
+        w = self.tokens.pop(token, None)
+        if w is None:
+            return
+        self.by_target.pop(w, None)
+        self.primed.discard(w)
+        if not self._is_playing(w):
+            w.cue_start()
+        error_ms = (time.perf_counter() - deadline) * 1000
+        clock_ms = (emitted - deadline) * 1000
+        self.jitter.append(error_ms)
+        TRACER.instant(
+            "cue.fire", "cue", track=w.trace_name, error_ms=error_ms, clock_ms=clock_ms
+        )
+        note = (
+            ""
+            if abs(error_ms) <= GAP_TARGET_MS
+            else f"（超过 {GAP_TARGET_MS:g} ms 目标）"
+        )
+        print(
+            f"提示点: {os.path.basename(w.original_path)} 启动偏差 {error_ms:+.1f} ms"
+            f"（定时线程 {clock_ms:+.2f} ms）{note}"
+        )
+
+    def summary(self):
+        if not self.jitter:
+            return ""
+        xs = sorted(abs(x) for x in self.jitter)
+        p95 = xs[min(len(xs) - 1, int(len(xs) * 0.95))]
+        return (
+            f"提示点触发 {len(xs)} 次：平均 {sum(xs) / len(xs):.1f} ms，"
+            f"P95 {p95:.1f} ms，最大 {xs[-1]:.1f} ms"
+        )
+
+    def shutdown(self):
+        self.clock.stop()
+
+
+class CueDialog(QDialog):
+    def __init__(self, cue, sources, parent=None):
+        # sources: [(显示名, 路径)]，不含目标轨自己
+        super().__init__(parent)
+        self.setWindowTitle("自动启动")
+        form = QFormLayout(self)
+
+        self.combo_mode = QComboBox()
+        for text, mode in (
+            ("手动", MODE_NONE),
+            ("定时", MODE_AT),
+            ("另一轨开始后", MODE_AFTER_START),
+            ("接在另一轨之后", MODE_FOLLOW),
+        ):
+            self.combo_mode.addItem(text, mode)
+        self.time_edit = QTimeEdit()
+        self.time_edit.setDisplayFormat("HH:mm:ss")
+        self.combo_source = QComboBox()
+        for text, path in sources:
+            self.combo_source.addItem(text, path)
+        self.spin_delay = QDoubleSpinBox()
+        self.spin_delay.setRange(0.0, 3600.0)
+        self.spin_delay.setDecimals(2)
+        self.spin_delay.setSuffix(" 秒")
+
+        form.addRow("启动方式", self.combo_mode)
+        form.addRow("时间", self.time_edit)
+        form.addRow("参照轨道", self.combo_source)
+        form.addRow("延迟", self.spin_delay)
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+        self.combo_mode.currentIndexChanged.connect(self._update_fields)
+        if cue is not None:
+            self.combo_mode.setCurrentIndex(self.combo_mode.findData(cue["mode"]))
+            self.time_edit.setTime(QTime.fromString(cue["time"], "HH:mm:ss"))
+            i = self.combo_source.findData(cue["source"])
+            if i >= 0:
+                self.combo_source.setCurrentIndex(i)
+            self.spin_delay.setValue(cue["delay"])
+        else:
+            self.time_edit.setTime(QTime.currentTime().addSecs(60))
+        self._update_fields()
+
+    def _update_fields(self):
+        mode = self.combo_mode.currentData()
+        self.time_edit.setEnabled(mode == MODE_AT)
+        self.combo_source.setEnabled(mode in (MODE_AFTER_START, MODE_FOLLOW))
+        self.spin_delay.setEnabled(mode == MODE_AFTER_START)
+
+    def cue(self):
+        return normalize_cue(
+            {
+                "mode": self.combo_mode.currentData(),
+                "time": self.time_edit.time().toString("HH:mm:ss"),
+                "source": self.combo_source.currentData() or "",
+                "delay": self.spin_delay.value(),
+            }
+        )
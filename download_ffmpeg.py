@@ -1,50 +1,294 @@
 import os
-import io
+import sys
+import time
+import hashlib
+import shutil
+import tarfile
 import zipfile
+import argparse
+import urllib.error
+import urllib.parse
 import urllib.request
-import shutil
+import http.client
 
-def download_ffmpeg():
-    # Stable release URL
-    url = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
-    print(f"Downloading FFmpeg from {url}...\nThis may take a minute depending on your connection.")
+# Stable release URLs
+WINDOWS_URL = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+LINUX_URL = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-linux64-gpl.tar.xz"
 
-    try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req) as response:
-            content = response.read()
-    except Exception as e:
-        print(f"Download failed: {e}")
-        return
+# 本地镜像：可以是 http(s) 地址，也可以是本机/共享盘上的压缩包路径
+MIRROR_ENV = "EASYPLAYER_FFMPEG_MIRROR"
 
-    print("Download complete. Extracting binaries...")
+CHUNK_SIZE = 1024 * 1024
+MAX_RETRIES = 8
+HEADERS = {"User-Agent": "Mozilla/5.0"}
 
-    found_ffmpeg = False
-    found_ffprobe = False
 
-    try:
-        with zipfile.ZipFile(io.BytesIO(content)) as z:
-            for file in z.namelist():
-                # The zip structure usually has a root folder, look for bin/ffmpeg.exe anywhere
-                lower_name = file.lower()
-                if "bin/ffmpeg.exe" in lower_name:
-                    print(f"Extracting {file} -> ffmpeg.exe")
-                    with z.open(file) as source, open("ffmpeg.exe", "wb") as target:
-                        shutil.copyfileobj(source, target)
-                    found_ffmpeg = True
-                elif "bin/ffprobe.exe" in lower_name:
-                    print(f"Extracting {file} -> ffprobe.exe")
-                    with z.open(file) as source, open("ffprobe.exe", "wb") as target:
-                        shutil.copyfileobj(source, target)
-                    found_ffprobe = True
-        
-        if found_ffmpeg and found_ffprobe:
-            print("Successfully downloaded and extracted ffmpeg.exe and ffprobe.exe")
+def default_url(platform=None):
+    platform = platform or ("windows" if os.name == "nt" else "linux")
+    return WINDOWS_URL if platform == "windows" else LINUX_URL
+
+
+def local_path(url):
+    # 返回本地文件路径；如果是网络地址则返回 None
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == "file":
+        return urllib.request.url2pathname(parsed.path)
+    if parsed.scheme in ("http", "https"):
+        return None
+    return url
+
+
+def fetch_text(url, timeout=30):
+    req = urllib.request.Request(url, headers=HEADERS)
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.read().decode("utf-8", "replace")
+
+
+def expected_sha256(url):
+    # gyan.dev 在同目录提供 <文件名>.sha256，BtbN 提供 checksums.sha256 汇总
+    name = os.path.basename(urllib.parse.urlparse(url).path)
+    candidates = [url + ".sha256", url.rsplit("/", 1)[0] + "/checksums.sha256"]
+    for candidate in candidates:
+        try:
+            path = local_path(candidate)
+            if path is None:
+                text = fetch_text(candidate)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+        except (OSError, urllib.error.URLError):
+            continue
+        for line in text.splitlines():
+            parts = line.split()
+            if not parts or len(parts[0]) != 64:
+                continue
+            if len(parts) == 1 or parts[-1].lstrip("*") == name:
+                return parts[0].lower()
+    return None
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Progress:
+    def __init__(self, total, start_bytes):
+        self.total = total
+        self.done = start_bytes
+        self.start_bytes = start_bytes
+        self.t0 = time.monotonic()
+        self.last_print = 0.0
+
+    def update(self, n, force=False):
+        self.done += n
+        now = time.monotonic()
+        if not force and now - self.last_print < 0.5:
+            return
+        self.last_print = now
+        elapsed = max(1e-6, now - self.t0)
+        speed = (self.done - self.start_bytes) / elapsed
+        mb = self.done / 1e6
+        if self.total:
+            pct = 100.0 * self.done / self.total
+            eta = (self.total - self.done) / speed if speed > 0 else 0
+            line = f"  {pct:5.1f}%  {mb:.1f}/{self.total / 1e6:.1f} MB  {speed / 1e6:.2f} MB/s  剩余 {eta:.0f}s"
+        else:
+            line = f"  {mb:.1f} MB  {speed / 1e6:.2f} MB/s"
+        sys.stdout.write("\r" + line.ljust(60))
+        sys.stdout.flush()
+
+    def close(self):
+        self.update(0, force=True)
+        sys.stdout.write("\n")
+
+
+def download(url, dest, chunk_size=CHUNK_SIZE, max_retries=MAX_RETRIES):
+    # 分块写入 dest.part，断线后用 HTTP Range 续传；服务器不支持 Range 时从头下载
+    part = dest + ".part"
+    retries = 0
+    while True:
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = dict(HEADERS)
+        if have:
+            headers["Range"] = f"bytes={have}-"
+        req = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                if have and response.status == 206:
+                    mode = "ab"
+                    total = _content_range_total(response.headers.get("Content-Range"))
+                    print(f"Resuming at {have / 1e6:.1f} MB")
+                else:
+                    mode = "wb"
+                    have = 0
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length else None
+
+                progress = Progress(total, have)
+                with open(part, mode) as f:
+                    while True:
+                        chunk = response.read(chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        progress.update(len(chunk))
+                progress.close()
+                if total and progress.done < total:
+                    raise http.client.IncompleteRead(b"", total - progress.done)
+            os.replace(part, dest)
+            return dest
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+            if isinstance(e, urllib.error.HTTPError):
+                if e.code == 416 and have:
+                    # 已经下载完整（Range 超出文件末尾）
+                    os.replace(part, dest)
+                    return dest
+                # 4xx 重试也没用；5xx（镜像过载、网关超时）和断线一样退避重试
+                if e.code < 500:
+                    raise
+            retries += 1
+            if retries > max_retries:
+                raise
+            wait = min(30, 2**retries)
+            print(
+                f"\nDownload interrupted ({e}), retrying in {wait}s [{retries}/{max_retries}]..."
+            )
+            time.sleep(wait)
+
+
+def _content_range_total(value):
+    # "bytes 100-999/1000"
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def _wanted_name(member_name):
+    # 只要 bin/ffmpeg(.exe) 与 bin/ffprobe(.exe)
+    lower = member_name.replace("\\", "/").lower()
+    for name in ("ffmpeg", "ffprobe", "ffmpeg.exe", "ffprobe.exe"):
+        if lower.endswith("bin/" + name):
+            return name
+    return None
+
+
+def _write_binary(source, out_dir, name):
+    target = os.path.join(out_dir, name)
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        shutil.copyfileobj(source, f, CHUNK_SIZE)
+    if os.name != "nt":
+        os.chmod(tmp, 0o755)
+    os.replace(tmp, target)
+    print(f"Extracted -> {target}")
+    return name
+
+
+def extract_binaries(archive, out_dir):
+    # zip 只读中央目录再按需解压对应条目；tar 以流方式顺序读取，取到两个文件即停止
+    found = set()
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as z:
+            for info in z.infolist():
+                name = _wanted_name(info.filename)
+                if name and name not in found:
+                    with z.open(info) as source:
+                        found.add(_write_binary(source, out_dir, name))
+                if len(found) == 2:
+                    break
+    else:
+        with tarfile.open(archive, "r|*") as t:
+            for member in t:
+                name = _wanted_name(member.name)
+                if name and member.isfile() and name not in found:
+                    found.add(_write_binary(t.extractfile(member), out_dir, name))
+                if len(found) == 2:
+                    break
+    return found
+
+
+def download_ffmpeg(url=None, out_dir=None, sha256=None, verify=True, keep=False):
+    url = url or os.environ.get(MIRROR_ENV) or default_url()
+    out_dir = out_dir or os.path.dirname(os.path.abspath(__file__))
+
+    archive = local_path(url)
+    if archive is None:
+        print(
+            f"Downloading FFmpeg from {url}...\nThis may take a minute depending on your connection."
+        )
+        name = os.path.basename(urllib.parse.urlparse(url).path) or "ffmpeg-download"
+        archive = os.path.join(out_dir, name)
+        try:
+            download(url, archive)
+        except Exception as e:
+            print(f"Download failed: {e}")
+            print("Run the script again to resume.")
+            return False
+        downloaded = True
+    else:
+        print(f"Using local archive {archive}")
+        downloaded = False
+
+    if verify:
+        expected = sha256 or expected_sha256(url)
+        if expected is None:
+            print(
+                "Warning: no SHA-256 checksum published for this URL, skipping verification."
+            )
         else:
-            print(f"Warning: Extracted {found_ffmpeg=} {found_ffprobe=}. Check zip structure.")
+            print("Verifying SHA-256...")
+            actual = sha256_file(archive)
+            if actual != expected.lower():
+                print(f"Checksum mismatch!\n  expected {expected}\n  actual   {actual}")
+                if downloaded:
+                    os.remove(archive)
+                return False
+            print("Checksum OK.")
 
+    print("Extracting binaries...")
+    try:
+        found = extract_binaries(archive, out_dir)
     except Exception as e:
         print(f"Extraction failed: {e}")
+        return False
+
+    if downloaded and not keep:
+        os.remove(archive)
+
+    if len(found) == 2:
+        print(f"Successfully extracted {' and '.join(sorted(found))}")
+        return True
+    print(f"Warning: only extracted {sorted(found)}. Check archive structure.")
+    return False
+
 
 if __name__ == "__main__":
-    download_ffmpeg()
+    parser = argparse.ArgumentParser(
+        description="Download ffmpeg/ffprobe for EasyPlayer"
+    )
+    parser.add_argument(
+        "--url", help=f"archive URL or local path (or set {MIRROR_ENV})"
+    )
+    parser.add_argument(
+        "--platform", choices=["windows", "linux"], help="build to download"
+    )
+    parser.add_argument(
+        "--dest", help="output directory (default: next to this script)"
+    )
+    parser.add_argument("--sha256", help="expected archive checksum")
+    parser.add_argument(
+        "--no-verify", action="store_true", help="skip checksum verification"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the downloaded archive"
+    )
+    args = parser.parse_args()
+
+    url = args.url or (default_url(args.platform) if args.platform else None)
+    ok = download_ffmpeg(url, args.dest, args.sha256, not args.no_verify, args.keep)
+    sys.exit(0 if ok else 1)
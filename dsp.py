@@ -0,0 +1,535 @@
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+
+import numpy as np
+
+import analysis
+import pcm
+
+# --- 增益渲染链 ---
+# 200% 增益原来是 pydub 的 audio + 6：整首 +6dB，超过满刻度的直接削平，响的母带削得很难听。
+# 现在换成一条可配置的处理链，按 NumPy 块向量化处理流式解码的 PCM：
+#   gain 增益 → highpass 高通 / lowshelf 低架 EQ → limiter 前瞻真峰值限幅 → trim 输出微调
+# 配置里是 bgm_config.json 的 "boost_chain" 列表，例如：
+#   [{"type": "gain", "db": 6}, {"type": "highpass", "hz": 30},
+#    {"type": "limiter", "ceiling_db": -1, "lookahead_ms": 1.5, "release_ms": 80}]
+# 渲染完报告：不限幅会削波的采样数、输出削波数、峰值 / 真峰值、积分响度、最大压限量。
+# 和 pydub 路径的吞吐量、削波对比见 bench.py dsp。
+# 命令行: python dsp.py 输入 -o 输出.wav [--config bgm_config.json]
+
+DEFAULT_CHAIN = [
+    {"type": "gain", "db": 6.0},
+    {"type": "highpass", "hz": 30.0, "q": 0.707},
+    {"type": "limiter", "ceiling_db": -1.0, "lookahead_ms": 1.5, "release_ms": 80.0},
+]
+STAGE_DEFAULTS = {
+    "gain": {"db": 0.0},
+    "trim": {"db": 0.0},
+    "highpass": {"hz": 30.0, "q": 0.707},
+    "lowshelf": {"hz": 120.0, "db": 0.0},
+    "limiter": {"ceiling_db": -1.0, "lookahead_ms": 1.5, "release_ms": 80.0},
+}
+BLOCK_FRAMES = 1 << 16
+MAX_CHANNELS = 2
+IIR_BLOCK = 32  # 双二阶滤波按这么长的小段做矩阵乘
+TP_OVERSAMPLE = 4
+TP_TAPS = 16  # 真峰值插值滤波器长度（每相位）
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20)
+
+
+def _db(x):
+    return float(20 * np.log10(max(x, 1e-9)))
+
+
+def normalize_chain(chain):
+    # 配置里的链：未知类型丢掉，缺的参数补默认值；整个没配或不是列表就用默认链
+    if not isinstance(chain, list):
+        return [dict(s) for s in DEFAULT_CHAIN]
+    out = []
+    for stage in chain:
+        if not isinstance(stage, dict) or stage.get("type") not in STAGE_DEFAULTS:
+            continue
+        kind = stage["type"]
+        params = {k: float(stage.get(k, v)) for k, v in STAGE_DEFAULTS[kind].items()}
+        out.append(dict(params, type=kind))
+    return out
+
+
+def chain_gain_db(chain):
+    # 增益和微调的总和，预检按这个估算增益后的峰值
+    return sum(s["db"] for s in normalize_chain(chain) if s["type"] in ("gain", "trim"))
+
+
+def chain_ceiling_db(chain):
+    # 链里有限幅器时返回它的上限（之后的 trim 也算进去），没有返回 None
+    ceiling = None
+    for s in normalize_chain(chain):
+        if s["type"] == "limiter":
+            ceiling = s["ceiling_db"]
+        elif s["type"] == "trim" and ceiling is not None:
+            ceiling += s["db"]
+    return ceiling
+
+
+class Stage:
+    # 流式处理的一级：process 可以少吐（限幅器要攒前瞻），flush 把攒着的吐完
+    def start(self, rate, channels):
+        self.rate = rate
+        self.channels = channels
+
+    def process(self, block):
+        raise NotImplementedError
+
+    def flush(self):
+        return np.zeros((0, self.channels), dtype=np.float32)
+
+    def report(self):
+        return {}
+
+
+class Gain(Stage):
+    def __init__(self, db=0.0):
+        self.gain = np.float32(db_to_gain(db))
+
+    def process(self, block):
+        return block * self.gain if self.gain != 1.0 else block
+
+
+class Biquad(Stage):
+    # RBJ 双二阶（直接 II 型转置）。逐样本递推在 Python 里太慢，这里按 IIR_BLOCK 长的小段精确展开：
+    #   段内输出 = T·x + O·s（s 为进段时的 2 个状态），段末状态 = S·x + P·s
+    # 各段的 T·x、S·x 是一次矩阵乘；段间状态的递推是常系数仿射递推，用倍增前缀扫描并行算完。
+    def __init__(self, b, a):
+        self.b = [c / a[0] for c in b]
+        self.a = [c / a[0] for c in a]
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        L = IIR_BLOCK
+        b0, b1, b2 = self.b
+        _, a1, a2 = self.a
+        # 把每个量写成 (L 个输入, 2 个初始状态) 的线性组合，逐样本推一遍得到各矩阵
+        s1 = np.zeros(L + 2)
+        s2 = np.zeros(L + 2)
+        s1[L] = 1.0
+        s2[L + 1] = 1.0
+        rows = []
+        states = [np.stack((s1, s2))]
+        for n in range(L):
+            x = np.zeros(L + 2)
+            x[n] = 1.0
+            y = b0 * x + s1
+            s1, s2 = b1 * x - a1 * y + s2, b2 * x - a2 * y
+            rows.append(y)
+            states.append(np.stack((s1, s2)))
+        Y = np.array(rows)
+        self.T = Y[:, :L]
+        self.O = Y[:, L:]
+        # states[n]：处理了 n 个样本后的状态，末尾不足一段的零头也用它
+        self.states = np.array(states)
+        self.S = self.states[L][:, :L]
+        self.P = self.states[L][:, L:]
+        self.z = np.zeros((channels, 2))
+
+    def process(self, block):
+        n = len(block)
+        if not n:
+            return block
+        L = IIR_BLOCK
+        x = block.T.astype(np.float64)  # [声道, 帧]
+        y = np.empty_like(x)
+        nb = n // L
+        if nb:
+            X = x[:, : nb * L].reshape(self.channels, nb, L)
+            drive = X @ self.S.T  # [声道, 段, 2]
+            drive[:, 0] += self.z @ self.P.T
+            # 前缀扫描：acc[k] = Σ_j P^(k-j)·drive[j]，就是第 k 段结束时的状态
+            acc = drive
+            power = self.P
+            shift = 1
+            while shift < nb:
+                acc = acc.copy()
+                acc[:, shift:] += acc[:, :-shift] @ power.T
+                power = power @ power
+                shift *= 2
+            entry = np.concatenate((self.z[:, None], acc[:, :-1]), axis=1)
+            y[:, : nb * L] = (X @ self.T.T + entry @ self.O.T).reshape(
+                self.channels, nb * L
+            )
+            self.z = acc[:, -1]
+        r = n - nb * L
+        if r:
+            tail = x[:, nb * L :]
+            y[:, nb * L :] = tail @ self.T[:r, :r].T + self.z @ self.O[:r].T
+            st = self.states[r]
+            self.z = tail @ st[:, :r].T + self.z @ st[:, L:].T
+        return y.T.astype(np.float32)
+
+
+def highpass(rate, hz, q):
+    w0 = 2 * np.pi * min(hz, rate * 0.45) / rate
+    cos, alpha = np.cos(w0), np.sin(w0) / (2 * q)
+    b = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2]
+    a = [1 + alpha, -2 * cos, 1 - alpha]
+    return b, a
+
+
+def lowshelf(rate, hz, db):
+    # 坡度 S = 1
+    A = 10 ** (db / 40)
+    w0 = 2 * np.pi * min(hz, rate * 0.45) / rate
+    cos = np.cos(w0)
+    k = 2 * np.sqrt(A) * np.sin(w0) / 2 * np.sqrt(2)
+    b = [
+        A * ((A + 1) - (A - 1) * cos + k),
+        2 * A * ((A - 1) - (A + 1) * cos),
+        A * ((A + 1) - (A - 1) * cos - k),
+    ]
+    a = [
+        (A + 1) + (A - 1) * cos + k,
+        -2 * ((A - 1) + (A + 1) * cos),
+        (A + 1) + (A - 1) * cos - k,
+    ]
+    return b, a
+
+
+class Filter(Stage):
+    # 系数和采样率有关，start 时才能算
+    def __init__(self, design, *args):
+        self.design = design
+        self.args = args
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.biquad = Biquad(*self.design(rate, *self.args))
+        self.biquad.start(rate, channels)
+
+    def process(self, block):
+        return self.biquad.process(block)
+
+
+def _tp_taps():
+    # 4 倍过采样的插值相位（1/4、2/4、3/4 处），Hann 窗 sinc，每相位 TP_TAPS 抽头
+    half = TP_TAPS // 2
+    j = np.arange(-half + 1, half + 1)
+    taps = []
+    for k in range(1, TP_OVERSAMPLE):
+        t = k / TP_OVERSAMPLE - j
+        window = 0.5 + 0.5 * np.cos(np.pi * t / (half + 1))
+        taps.append(np.sinc(t) * window)
+    return np.array(taps).T.astype(np.float32)  # [抽头, 相位]
+
+
+TP_TAPS_MATRIX = _tp_taps()
+# 插值点不会超过窗口内最大绝对值 × 抽头绝对值之和
+TP_BOUND = float(np.abs(TP_TAPS_MATRIX).sum(axis=0).max())
+
+
+def true_peak(ext, floor=0.0):
+    # ext 比要估计的帧多 TP_TAPS - 1 帧上下文（前 TP_TAPS/2 - 1，后 TP_TAPS/2）；
+    # 返回每帧在它和下一帧之间（含本帧）的最大绝对值，各声道取最大。
+    # 只关心超过 floor 的帧：按上界判断够不着 floor 的帧不做插值，直接给采样值
+    n = len(ext) - TP_TAPS + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.float32)
+    mag = np.abs(ext).max(axis=1)
+    peak = mag[TP_TAPS // 2 - 1 : TP_TAPS // 2 - 1 + n].copy()
+    bound = -sliding_min(-mag, TP_TAPS) * TP_BOUND
+    cand = np.flatnonzero(bound > floor)
+    if len(cand) > n // 4:
+        # 候选多时整块卷积比按下标取窗口快
+        for ch in np.ascontiguousarray(ext.T):
+            for k in range(TP_OVERSAMPLE - 1):
+                inter = np.abs(np.convolve(ch, TP_TAPS_MATRIX[::-1, k], "valid"))
+                np.maximum(peak, inter, out=peak)
+    elif len(cand):
+        windows = ext[cand[:, None] + np.arange(TP_TAPS)]  # [帧, 抽头, 声道]
+        inter = np.abs(windows.transpose(0, 2, 1) @ TP_TAPS_MATRIX).max(axis=(1, 2))
+        peak[cand] = np.maximum(peak[cand], inter)
+    return peak
+
+
+def sliding_min(x, w):
+    # 长度 w 的前向滑动最小值（van Herk / Gil-Werman），每个样本只比较常数次
+    n = len(x) - w + 1
+    if n <= 0:
+        return x[:0]
+    nb = -(-len(x) // w)
+    padded = np.full(nb * w, np.inf)
+    padded[: len(x)] = x
+    blocks = padded.reshape(nb, w)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(suffix[:n], prefix[w - 1 : w - 1 + n])
+
+
+class Limiter(Stage):
+    # 前瞻真峰值限幅：
+    # 1. 4 倍过采样估计真峰值，算出每帧需要的增益 r（dB，≤ 0）
+    # 2. 向前看 W 帧取最小值，保证峰值到来之前增益已经压下去
+    # 3. 释放按 dB 线性回升：env[m] = min(a[m], env[m-1] + δ)，用累计最小值一次算完
+    # 4. 再做 W 帧滑动平均去掉折角；窗口里每一项都 ≤ 当前帧的 r，平均后仍不超过上限
+    # 各声道共用一个增益，立体声像不漂。总延迟 TP_TAPS/2 + W - 1 帧，flush 时补零推出来。
+    def __init__(self, ceiling_db=-1.0, lookahead_ms=1.5, release_ms=80.0):
+        self.ceiling_db = ceiling_db
+        self.lookahead_ms = lookahead_ms
+        self.release_ms = release_ms
+
+    def start(self, rate, channels):
+        super().start(rate, channels)
+        self.W = max(2, int(rate * self.lookahead_ms / 1000))
+        # release_ms：压限恢复 10dB 所需时间
+        self.delta = 10.0 / max(1e-3, rate * self.release_ms / 1000)
+        self.tp_hist = np.zeros((TP_TAPS - 1, channels), dtype=np.float32)
+        self.r_buf = np.zeros(0)
+        self.x_buf = np.zeros((0, channels), dtype=np.float32)
+        self.env_prev = 0.0
+        self.env_hist = None
+        self.delay = TP_TAPS // 2 + self.W - 1
+        self.to_skip = TP_TAPS // 2  # 真峰值检测前面垫的零
+        self.overs = 0
+        self.max_reduction = 0.0
+
+    def process(self, block):
+        if not len(block):
+            return block
+        self.overs += int(np.count_nonzero(np.abs(block) > 1.0))
+        # 真峰值检测落后 TP_TAPS/2 帧，输入也按同样的延迟对齐
+        ext = np.concatenate((self.tp_hist, block))
+        self.tp_hist = ext[-(TP_TAPS - 1) :]
+        peak = true_peak(ext, db_to_gain(self.ceiling_db))
+        xd = ext[TP_TAPS // 2 - 1 : TP_TAPS // 2 - 1 + len(peak)]
+        need = np.minimum(0.0, self.ceiling_db - 20 * np.log10(np.maximum(peak, 1e-9)))
+
+        R = np.concatenate((self.r_buf, need))
+        X = np.concatenate((self.x_buf, xd))
+        a = sliding_min(R, self.W)
+        self.r_buf = R[len(a) :]
+        self.x_buf = X[len(a) :]
+        if not len(a):
+            return X[:0]
+
+        m = np.arange(1, len(a) + 1) * self.delta
+        env = np.minimum(m + np.minimum.accumulate(a - m), self.env_prev + m)
+        env = np.minimum(env, 0.0)
+        self.env_prev = float(env[-1])
+        if self.env_hist is None:
+            # 开头之前没有增益历史，按第一帧的增益算（它不超过前 W 帧里任何一帧的 r）
+            self.env_hist = np.full(self.W - 1, env[0])
+        E = np.concatenate((self.env_hist, env))
+        self.env_hist = E[len(E) - (self.W - 1) :]
+        c = np.concatenate(([0.0], np.cumsum(E)))
+        smooth = (c[self.W :] - c[: -self.W]) / self.W
+        self.max_reduction = max(self.max_reduction, float(-smooth.min()))
+
+        out = X[: len(a)] * db_to_gain(smooth).astype(np.float32)[:, None]
+        if self.to_skip:
+            skip = min(self.to_skip, len(out))
+            self.to_skip -= skip
+            out = out[skip:]
+        return out
+
+    def flush(self):
+        return self.process(np.zeros((self.delay, self.channels), dtype=np.float32))
+
+    def report(self):
+        return {
+            "would_clip": self.overs,
+            "max_reduction_db": round(self.max_reduction, 2),
+        }
+
+
+def make_stage(spec):
+    kind = spec["type"]
+    if kind in ("gain", "trim"):
+        return Gain(spec["db"])
+    if kind == "highpass":
+        return Filter(highpass, spec["hz"], spec["q"])
+    if kind == "lowshelf":
+        return Filter(lowshelf, spec["hz"], spec["db"])
+    if kind == "limiter":
+        return Limiter(spec["ceiling_db"], spec["lookahead_ms"], spec["release_ms"])
+    raise ValueError(f"未知的处理级 {kind!r}")
+
+
+class Chain:
+    def __init__(self, chain=None):
+        self.spec = normalize_chain(chain)
+        self.stages = [make_stage(s) for s in self.spec]
+
+    def start(self, rate, channels):
+        self.channels = channels
+        for s in self.stages:
+            s.start(rate, channels)
+
+    def process(self, block):
+        for s in self.stages:
+            block = s.process(block)
+        return block
+
+    def flush(self):
+        # 前面各级吐出来的尾巴要经过后面的级
+        block = np.zeros((0, self.channels), dtype=np.float32)
+        for s in self.stages:
+            if len(block):
+                block = s.process(block)
+            block = np.concatenate((block, s.flush()))
+        return block
+
+    def report(self):
+        out = {}
+        for s in self.stages:
+            out.update(s.report())
+        return out
+
+
+class OutputMeter:
+    # 输出端的统计：削波（analysis 的 ClipAnalyzer）、积分响度（LoudnessAnalyzer）、真峰值
+    def __init__(self, rate, channels):
+        self.clip = analysis.ClipAnalyzer()
+        self.loudness = analysis.LoudnessAnalyzer()
+        self.clip.start(rate, channels)
+        self.loudness.start(rate, channels)
+        self.tp_hist = np.zeros((TP_TAPS - 1, channels), dtype=np.float32)
+        self.true_peak = 0.0
+
+    def feed(self, block):
+        if not len(block):
+            return
+        self.clip.feed(block)
+        self.loudness.feed(block)
+        ext = np.concatenate((self.tp_hist, block))
+        self.tp_hist = ext[-(TP_TAPS - 1) :]
+        self.true_peak = max(
+            self.true_peak, float(true_peak(ext, self.true_peak).max())
+        )
+
+    def finish(self):
+        clip = self.clip.finish()
+        return {
+            "peak_db": clip["peak_db"],
+            "true_peak_db": round(_db(self.true_peak), 2),
+            "clipped_samples": clip["clipped_samples"],
+            "clipped_runs": clip["clipped_runs"],
+            "integrated_lufs": self.loudness.finish()["integrated_lufs"],
+        }
+
+
+def process(data, rate, chain=None):
+    # 整段 PCM（float32 [帧, 声道]）过一遍链，长度不变；离线渲染用
+    c = Chain(chain)
+    c.start(rate, data.shape[1])
+    out = [
+        c.process(data[i : i + BLOCK_FRAMES]) for i in range(0, len(data), BLOCK_FRAMES)
+    ]
+    out.append(c.flush())
+    return np.concatenate(out)[: len(data)]
+
+
+def to_int16(block):
+    return (np.clip(block, -1.0, 32767 / 32768) * 32768).astype("<i2").tobytes()
+
+
+def render_file(src, dst, chain=None):
+    # 流式解码 → 处理链 → 16 位 WAV；先写临时文件再改名，播放器不会读到写了一半的文件
+    info = pcm.probe(src)
+    rate = info["sample_rate"]
+    channels = max(1, min(MAX_CHANNELS, info["channels"]))
+    if not rate or not info["channels"]:
+        raise RuntimeError("找不到音频流")
+    c = Chain(chain)
+    c.start(rate, channels)
+    source = analysis.ClipAnalyzer()
+    source.start(rate, channels)
+    meter = OutputMeter(rate, channels)
+    frames = 0
+    t0 = time.perf_counter()
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        with wave.open(tmp, "wb") as out:
+            out.setnchannels(channels)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            for block in pcm.iter_pcm(src, rate, channels, BLOCK_FRAMES):
+                block = block.reshape(-1, channels)
+                frames += len(block)
+                source.feed(block)
+                block = c.process(block)
+                meter.feed(block)
+                out.writeframes(to_int16(block))
+            block = c.flush()
+            meter.feed(block)
+            out.writeframes(to_int16(block))
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    elapsed = time.perf_counter() - t0
+    report = {
+        "seconds": frames / rate,
+        "elapsed": elapsed,
+        "realtime_x": frames / rate / max(1e-9, elapsed),
+        "source_peak_db": source.finish()["peak_db"],
+    }
+    report.update(c.report())
+    report.update(meter.finish())
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{report['seconds']:.1f}s 音频，用时 {report['elapsed']:.2f}s（{report['realtime_x']:.0f}x 实时）",
+        f"源峰值 {report['source_peak_db']:.1f} dBFS → 输出峰值 {report['peak_db']:.1f} dBFS，"
+        f"真峰值 {report['true_peak_db']:.1f} dBTP",
+    ]
+    if "would_clip" in report:
+        lines.append(
+            f"限幅器挡下 {report['would_clip']} 个会削波的采样，最大压限 {report['max_reduction_db']:.1f} dB"
+        )
+    lines.append(
+        f"输出削波采样 {report['clipped_samples']}（连续段 {report['clipped_runs']}）"
+    )
+    if report["integrated_lufs"] is not None:
+        lines.append(f"积分响度 {report['integrated_lufs']:.1f} LUFS")
+    return "\n".join(lines)
+
+
+def load_chain(config_file):
+    try:
+        with open(config_file, "r", encoding="utf-8") as f:
+            return normalize_chain(json.load(f).get("boost_chain"))
+    except (OSError, ValueError):
+        return normalize_chain(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按增益渲染链处理一个文件")
+    parser.add_argument("input")
+    parser.add_argument("-o", "--output", default="boosted.wav")
+    parser.add_argument(
+        "--config", default="bgm_config.json", help="读取其中的 boost_chain"
+    )
+    parser.add_argument("--chain", help="直接给 JSON 格式的链，覆盖配置")
+    args = parser.parse_args()
+
+    if args.chain:
+        try:
+            chain = normalize_chain(json.loads(args.chain))
+        except ValueError as e:
+            sys.exit(f"--chain 不是合法的 JSON: {e}")
+    else:
+        chain = load_chain(args.config)
+    print(" → ".join(s["type"] for s in chain))
+    print(format_report(render_file(args.input, args.output, chain)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import time
+
+from PyQt6.QtCore import QObject, Qt, QTimer
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from meters import HAS_METERS
+from tracer import TRACER
+
+# --- 自动闪避 ---
+# 轨道可以标成“压低别人”（主持口播、广播、VO）或“被压低”（背景音乐）。
+# 任一“压低别人”的轨道在响时，所有“被压低”的轨道一起降低若干 dB，停了再慢慢回来；
+# 触发方式二选一：按播放状态（在播就算），或按实测电平（超过阈值算，短暂停顿保持一会儿不回弹）。
+# 所有轨道的闪避增益在一个共享定时器里推进：起落按 dB 线性变化，
+# 最终音量 = 音量滑块 × 渐隐 × 闪避，由 AudioTrackWidget.apply_volume 合成。
+
+ROLE_DUCKER = "ducker"
+ROLE_DUCKABLE = "duckable"
+ROLES = (None, ROLE_DUCKABLE, ROLE_DUCKER)
+ROLE_TEXT = {None: "🔈", ROLE_DUCKABLE: "🎵", ROLE_DUCKER: "🎙"}
+ROLE_TIP = {
+    None: "自动闪避：不参与（点击切换）",
+    ROLE_DUCKABLE: "自动闪避：口播时自动压低这一轨（点击切换）",
+    ROLE_DUCKER: "自动闪避：这一轨在响时压低背景音乐（点击切换）",
+}
+
+KEY_STATE = "state"
+KEY_LEVEL = "level"
+
+TICK_MS = 20
+DEFAULT_DEPTH_DB = 12.0
+DEFAULT_ATTACK_MS = 150
+DEFAULT_RELEASE_MS = 800
+DEFAULT_THRESHOLD_DB = -45.0
+LEVEL_HOLD_MS = 400  # 按电平触发时，说话间的停顿不回弹
+
+
+def normalize_role(role):
+    return role if role in ROLES else None
+
+
+def next_role(role):
+    return ROLES[(ROLES.index(normalize_role(role)) + 1) % len(ROLES)]
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20)
+
+
+class DuckingBus(QObject):
+    def __init__(self, tracks, parent=None):
+        super().__init__(parent)
+        self.tracks = tracks  # 返回当前所有轨道控件
+        self.depth_db = DEFAULT_DEPTH_DB
+        self.attack_ms = DEFAULT_ATTACK_MS
+        self.release_ms = DEFAULT_RELEASE_MS
+        self.key = KEY_STATE
+        self.threshold_db = DEFAULT_THRESHOLD_DB
+        self.level_db = 0.0  # 当前闪避量（0 为不压低，负数为压低）
+        self.span_db = self.depth_db  # 这一段起落按多大的深度算速度
+        self.keyed = False
+        self.hot_until = {}  # 按电平触发：轨道 -> 保持到的时刻
+        self.last_tick = time.perf_counter()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(TICK_MS)
+        self.timer.timeout.connect(self._tick)
+
+    def configure(self, depth_db, attack_ms, release_ms, key, threshold_db):
+        self.depth_db = max(0.0, float(depth_db))
+        self.attack_ms = max(1, int(attack_ms))
+        self.release_ms = max(1, int(release_ms))
+        self.key = key if key in (KEY_STATE, KEY_LEVEL) else KEY_STATE
+        self.threshold_db = float(threshold_db)
+        self.refresh()
+
+    def settings(self):
+        return {
+            "duck_depth_db": self.depth_db,
+            "duck_attack_ms": self.attack_ms,
+            "duck_release_ms": self.release_ms,
+            "duck_key": self.key,
+            "duck_threshold_db": self.threshold_db,
+        }
+
+    def refresh(self):
+        # 轨道角色变了、加删轨道后调用：有“压低别人”的轨道或还没回到 0dB 才需要跑定时器
+        tracks = self.tracks()
+        for w in tracks:
+            if w.duck_role != ROLE_DUCKABLE and w.duck_gain != 1.0:
+                w.set_duck(1.0)
+        busy = self.level_db < 0 or any(w.duck_role == ROLE_DUCKER for w in tracks)
+        if busy and not self.timer.isActive():
+            self.last_tick = time.perf_counter()
+            self.timer.start()
+        elif not busy:
+            self.timer.stop()
+        self._apply()
+
+    def _is_keyed(self, w, now):
+        if w.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            self.hot_until.pop(w, None)
+            return False
+        if self.key == KEY_STATE or not HAS_METERS:
+            return True
+        if w.meter.rms_db > self.threshold_db:
+            self.hot_until[w] = now + LEVEL_HOLD_MS / 1000
+            return True
+        return self.hot_until.get(w, 0) > now
+
+    def _tick(self):
+        now = time.perf_counter()
+        dt_ms = (now - self.last_tick) * 1000
+        self.last_tick = now
+        tracks = self.tracks()
+        keyed = any(
+            self._is_keyed(w, now) for w in tracks if w.duck_role == ROLE_DUCKER
+        )
+        if keyed != self.keyed:
+            self.keyed = keyed
+            TRACER.instant("duck", "volume", on=keyed, depth_db=self.depth_db)
+        # 起落时间 = 从 0dB 到满深度（或反过来）所需的时间；
+        # 压低中把深度调浅时，升到新深度的这一段仍按调之前的深度算速度
+        if -self.level_db <= self.depth_db:
+            self.span_db = self.depth_db
+        else:
+            self.span_db = max(self.span_db, -self.level_db)
+        span = self.span_db
+        if keyed and self.level_db > -self.depth_db:
+            step = span * dt_ms / self.attack_ms
+            level = max(-self.depth_db, self.level_db - step)
+        else:
+            # 没有口播时回到 0dB；口播中调浅了深度也按回弹速度升到新深度，不跳变
+            target = -self.depth_db if keyed else 0.0
+            step = span * dt_ms / self.release_ms
+            level = min(target, self.level_db + step)
+        if level != self.level_db:
+            self.level_db = level
+            self._apply(tracks)
+        if level >= 0 and not any(w.duck_role == ROLE_DUCKER for w in tracks):
+            self.timer.stop()
+
+    def _apply(self, tracks=None):
+        gain = db_to_gain(self.level_db)
+        for w in tracks if tracks is not None else self.tracks():
+            if w.duck_role == ROLE_DUCKABLE and w.duck_gain != gain:
+                w.set_duck(gain)
+
+    def forget(self, w):
+        self.hot_until.pop(w, None)
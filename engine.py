@@ -0,0 +1,686 @@
+import os
+import sys
+import time
+import uuid
+import multiprocessing
+from multiprocessing import shared_memory
+
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, QTimer, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QAudioOutput, QMediaDevices, QMediaPlayer
+
+import cache
+from meters import HAS_METERS, PlayerLevelTap
+from seek_index import FrameSliceDevice
+
+# --- 独立进程音频引擎 ---
+# 播放器、渐隐和音量都在单独的进程里运行，界面线程卡住（弹出文件对话框、读大配置）
+# 或者界面崩溃都不会打断声音。
+# - 命令/事件：multiprocessing.Pipe，两端各有一个读线程，把消息转成 Qt 信号
+# - 位置/时长/电平：共享内存里的 float64 表，引擎 50Hz 写入，界面按需读取（seqlock 保证一致）
+# 界面一侧的 RemotePlayer / RemoteAudioOutput 模仿 QMediaPlayer / QAudioOutput 里
+# AudioTrackWidget 用到的那部分接口，所以轨道控件不需要关心自己跑在哪种模式下。
+# 界面崩溃后引擎继续放，但最多 ORPHAN_GRACE_SEC 秒；每次启动界面都在缓存目录写一个
+# 新的“属主”令牌（claim_owner），没人管的引擎看到令牌换了就立即退出，
+# 重新打开程序（以及崩溃恢复的“恢复并继续播放”）不会和旧引擎叠在一起放两遍。
+
+MAX_SLOTS = 256
+HEADER_FIELDS = 4
+(
+    F_SEQ,
+    F_STATE,
+    F_STATUS,
+    F_POSITION,
+    F_DURATION,
+    F_VOLUME,
+    F_PEAK,
+    F_RMS,
+    F_FADE_START,
+    F_FADE_END,
+    F_LEVEL_SEQ,
+) = range(11)
+SLOT_FIELDS = 11
+H_HEARTBEAT = 0
+
+PUBLISH_INTERVAL_MS = 20
+FADE_INTERVAL_MS = 10
+ORPHAN_GRACE_SEC = 300
+ORPHAN_FADE_SEC = 3.0
+OWNER_POLL_SEC = 0.5
+
+
+def claim_owner():
+    # 进程内播放模式也要调用：上次崩溃留下的引擎靠它知道该退出了
+    token = uuid.uuid4().hex
+    cache.save_json("engine", "owner", {"token": token, "pid": os.getpid()})
+    return token
+
+
+def current_owner():
+    data = cache.load_json("engine", "owner")
+    return data.get("token") if isinstance(data, dict) else None
+
+
+class SharedState:
+    def __init__(self, name=None):
+        size = 8 * (HEADER_FIELDS + MAX_SLOTS * SLOT_FIELDS)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.values = self.shm.buf.cast("d")
+        if name is None:
+            for i in range(len(self.values)):
+                self.values[i] = 0.0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _base(self, slot):
+        return HEADER_FIELDS + slot * SLOT_FIELDS
+
+    def write_slot(self, slot, **fields):
+        # 单写者 seqlock：写之前序号变奇数，写完变偶数
+        v = self.values
+        base = self._base(slot)
+        v[base + F_SEQ] += 1
+        for key, value in fields.items():
+            v[base + _FIELD_INDEX[key]] = value
+        v[base + F_SEQ] += 1
+
+    def read_slot(self, slot):
+        v = self.values
+        base = self._base(slot)
+        # 引擎若在写的中途退出，序号会停在奇数，重试有上限
+        for _ in range(1000):
+            seq = v[base + F_SEQ]
+            if seq % 2:
+                continue
+            row = v[base : base + SLOT_FIELDS].tolist()
+            if v[base + F_SEQ] == seq:
+                return row
+        return v[base : base + SLOT_FIELDS].tolist()
+
+    def set_header(self, index, value):
+        self.values[index] = value
+
+    def header(self, index):
+        return self.values[index]
+
+    def close(self, unlink=False):
+        self.values.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+_FIELD_INDEX = {
+    "state": F_STATE,
+    "status": F_STATUS,
+    "position": F_POSITION,
+    "duration": F_DURATION,
+    "volume": F_VOLUME,
+    "peak": F_PEAK,
+    "rms": F_RMS,
+    "fade_start": F_FADE_START,
+    "fade_end": F_FADE_END,
+    "level_seq": F_LEVEL_SEQ,
+}
+
+
+class PipeReader(QThread):
+    received = pyqtSignal(object)
+    closed = pyqtSignal()
+
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def run(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                self.closed.emit()
+                return
+            self.received.emit(msg)
+
+
+# ============================================================================
+# 引擎进程
+# ============================================================================
+
+
+def _find_device(device_id):
+    for d in QMediaDevices.audioOutputs():
+        if bytes(d.id()) == device_id:
+            return d
+    return QMediaDevices.defaultAudioOutput()
+
+
+class EngineTrack(QObject):
+    def __init__(self, engine, slot, device_id, volume):
+        super().__init__()
+        self.engine = engine
+        self.slot = slot
+        self.player = QMediaPlayer()
+        self.output = QAudioOutput()
+        self.output.setDevice(_find_device(device_id))
+        self.output.setVolume(volume)
+        self.player.setAudioOutput(self.output)
+        self.level_tap = PlayerLevelTap(self.player, self) if HAS_METERS else None
+        self.volume = volume
+        self.slice_device = None
+        self.fade = None
+        self.level_seq = 0
+        self.player.mediaStatusChanged.connect(
+            lambda s: engine.send(("status", slot, s.value))
+        )
+        self.player.playbackStateChanged.connect(
+            lambda s: engine.send(("state", slot, s.value))
+        )
+
+    def set_source(self, path):
+        self._drop_slice()
+        self.player.setSource(QUrl.fromLocalFile(path))
+
+    def set_source_slice(self, path, start, end):
+        old = self.slice_device
+        self.slice_device = FrameSliceDevice(path, start, end, self)
+        self.player.setSourceDevice(self.slice_device, QUrl.fromLocalFile(path))
+        if old is not None:
+            old.close()
+
+    def _drop_slice(self):
+        if self.slice_device is not None:
+            self.slice_device.close()
+            self.slice_device = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.fade is None:
+            self.output.setVolume(volume)
+
+    def start_fade(self, seconds):
+        if self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            self.engine.send(("fade_done", self.slot))
+            return
+        now = time.monotonic()
+        self.fade = (now, max(0.01, seconds), self.output.volume())
+        self.engine.state.write_slot(self.slot, fade_start=now, fade_end=0.0)
+
+    def cancel_fade(self):
+        self.fade = None
+        self.output.setVolume(self.volume)
+
+    def fade_tick(self, now):
+        # 按单调时钟计算音量，定时器晚到也不会拉长渐隐
+        start, duration, start_volume = self.fade
+        frac = (now - start) / duration
+        if frac < 1.0:
+            self.output.setVolume(start_volume * (1.0 - frac))
+            return
+        self.fade = None
+        self.player.stop()
+        self.output.setVolume(self.volume)
+        self.engine.state.write_slot(self.slot, fade_end=now)
+        self.engine.send(("fade_done", self.slot))
+
+    def recover(self, position, reopen_media):
+        device = self.output.device()
+        old = self.output
+        self.output = QAudioOutput()
+        self.output.setDevice(device)
+        self.output.setVolume(old.volume())
+        self.player.setAudioOutput(self.output)
+        old.deleteLater()
+        if reopen_media:
+            source = self.player.source()
+            self.player.stop()
+            self.player.setSource(source)
+        self.player.setPosition(position)
+        self.player.play()
+
+    def publish(self):
+        levels = self.level_tap.acc.take() if self.level_tap is not None else None
+        fields = {
+            "state": self.player.playbackState().value,
+            "status": self.player.mediaStatus().value,
+            "position": self.player.position(),
+            "duration": self.player.duration(),
+            "volume": self.output.volume(),
+        }
+        if levels is not None:
+            self.level_seq += 1
+            fields["peak"], fields["rms"] = levels
+            fields["level_seq"] = self.level_seq
+        self.engine.state.write_slot(self.slot, **fields)
+
+    def close(self):
+        self.player.stop()
+        self._drop_slice()
+        self.player.deleteLater()
+        self.output.deleteLater()
+
+
+class Engine(QObject):
+    # bench.py engine-fade --headless 换成不出声的轨道
+    track_class = EngineTrack
+
+    def __init__(self, conn, shm_name, owner=None):
+        super().__init__()
+        self.conn = conn
+        self.state = SharedState(shm_name)
+        self.tracks = {}
+        self.owner = owner
+        self.orphaned = False
+        self.orphaned_at = 0.0
+        self.owner_checked = 0.0
+        self.winding_down = False
+
+        self.reader = PipeReader(conn)
+        self.reader.received.connect(self.handle)
+        self.reader.closed.connect(self.on_gui_lost)
+        self.reader.start()
+
+        self.publish_timer = QTimer(self)
+        self.publish_timer.setInterval(PUBLISH_INTERVAL_MS)
+        self.publish_timer.timeout.connect(self.publish)
+        self.publish_timer.start()
+
+        self.fade_timer = QTimer(self)
+        self.fade_timer.setInterval(FADE_INTERVAL_MS)
+        self.fade_timer.timeout.connect(self.fade_tick)
+        self.fade_timer.start()
+
+    def send(self, msg):
+        if self.orphaned:
+            return
+        try:
+            self.conn.send(msg)
+        except (OSError, BrokenPipeError):
+            self.on_gui_lost()
+
+    def handle(self, msg):
+        cmd, args = msg[0], msg[1:]
+        if cmd == "quit":
+            self.shutdown()
+            return
+        if cmd == "add":
+            slot, device_id, volume = args
+            self.tracks[slot] = self.track_class(self, slot, device_id, volume)
+            return
+        t = self.tracks.get(args[0])
+        if t is None:
+            return
+        try:
+            if cmd == "remove":
+                self.tracks.pop(args[0]).close()
+            elif cmd == "source":
+                t.set_source(args[1])
+            elif cmd == "source_slice":
+                t.set_source_slice(*args[1:])
+            elif cmd == "play":
+                t.player.play()
+            elif cmd == "pause":
+                t.player.pause()
+            elif cmd == "stop":
+                t.fade = None
+                t.player.stop()
+                t.output.setVolume(t.volume)
+            elif cmd == "seek":
+                t.player.setPosition(args[1])
+            elif cmd == "loops":
+                t.player.setLoops(args[1])
+            elif cmd == "volume":
+                t.set_volume(args[1])
+            elif cmd == "device":
+                t.output.setDevice(_find_device(args[1]))
+            elif cmd == "fade":
+                t.start_fade(args[1])
+            elif cmd == "fade_cancel":
+                t.cancel_fade()
+            elif cmd == "recover":
+                t.recover(args[1], args[2])
+        except Exception as e:
+            self.send(("error", args[0], f"{cmd}: {e}"))
+
+    def publish(self):
+        self.state.set_header(H_HEARTBEAT, time.monotonic())
+        for t in self.tracks.values():
+            t.publish()
+        if self.orphaned:
+            self.check_orphan()
+
+    def check_orphan(self):
+        # 界面已经不在了：放完手上的曲子再退出；新界面启动或超过宽限时间也退出
+        now = time.monotonic()
+        if now - self.owner_checked >= OWNER_POLL_SEC:
+            self.owner_checked = now
+            if self.owner is not None and current_owner() != self.owner:
+                print("[引擎] 界面已重新启动，旧引擎停止播放并退出")
+                self.shutdown()
+                return
+        elapsed = now - self.orphaned_at
+        if elapsed > ORPHAN_GRACE_SEC + ORPHAN_FADE_SEC + 2:
+            self.shutdown()
+            return
+        if elapsed > ORPHAN_GRACE_SEC and not self.winding_down:
+            self.winding_down = True
+            print(f"[引擎] 界面断开已超过 {ORPHAN_GRACE_SEC} 秒，渐隐后退出")
+            for t in self.tracks.values():
+                t.start_fade(ORPHAN_FADE_SEC)
+        playing = QMediaPlayer.PlaybackState.PlayingState
+        if not any(t.player.playbackState() == playing for t in self.tracks.values()):
+            self.shutdown()
+
+    def fade_tick(self):
+        now = time.monotonic()
+        for t in self.tracks.values():
+            if t.fade is not None:
+                t.fade_tick(now)
+
+    def on_gui_lost(self):
+        if not self.orphaned:
+            self.orphaned = True
+            self.orphaned_at = time.monotonic()
+            print(
+                f"[引擎] 界面连接已断开，继续播放当前曲目（最多 {ORPHAN_GRACE_SEC} 秒）"
+            )
+
+    def shutdown(self):
+        self.publish_timer.stop()
+        self.fade_timer.stop()
+        for t in self.tracks.values():
+            t.close()
+        self.tracks = {}
+        self.state.close()
+        QCoreApplication.quit()
+
+
+def _raise_priority():
+    if os.name == "nt":
+        import ctypes
+
+        ABOVE_NORMAL_PRIORITY_CLASS = 0x8000
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(
+            kernel32.GetCurrentProcess(), ABOVE_NORMAL_PRIORITY_CLASS
+        )
+    else:
+        try:
+            os.nice(-5)
+        except OSError:
+            pass
+
+
+def engine_main(conn, shm_name, owner=None):
+    os.environ["QT_LOGGING_RULES"] = (
+        "qt.multimedia.ffmpeg.debug=false;qt.multimedia.ffmpeg.info=false"
+    )
+    _raise_priority()
+    app = QCoreApplication(sys.argv[:1])
+    engine = Engine(conn, shm_name, owner)
+    app.exec()
+    engine.reader.wait(100)
+
+
+# ============================================================================
+# 界面一侧
+# ============================================================================
+
+
+class EngineClient(QObject):
+    # 引擎进程意外退出（不是 shutdown 让它退的）
+    lost = pyqtSignal()
+
+    def __init__(self, parent=None, target=engine_main):
+        super().__init__(parent)
+        self.state = SharedState()
+        self.closing = False
+        self.is_lost = False
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=target,
+            args=(child_conn, self.state.name, claim_owner()),
+            name="EasyPlayerEngine",
+            daemon=False,
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.players = {}
+        self.free_slots = list(range(MAX_SLOTS - 1, -1, -1))
+
+        self.reader = PipeReader(self.conn)
+        self.reader.received.connect(self.on_event)
+        self.reader.closed.connect(self.on_engine_lost)
+        self.reader.start()
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(33)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start()
+
+    def send(self, *msg):
+        if self.is_lost:
+            return
+        try:
+            self.conn.send(msg)
+        except (OSError, BrokenPipeError) as e:
+            print(f"引擎通信失败: {e}")
+
+    def has_free_slot(self):
+        return bool(self.free_slots) and not self.is_lost
+
+    def create_player(self, device):
+        if not self.has_free_slot():
+            raise RuntimeError(f"独立引擎不可用或已满 {MAX_SLOTS} 轨")
+        slot = self.free_slots.pop()
+        output = RemoteAudioOutput(self, slot, device)
+        player = RemotePlayer(self, slot, output)
+        self.players[slot] = player
+        self.send("add", slot, bytes(device.id()), 1.0)
+        return player, output
+
+    def release(self, slot):
+        if self.players.pop(slot, None) is not None:
+            self.send("remove", slot)
+            self.free_slots.append(slot)
+
+    def on_event(self, msg):
+        kind, slot = msg[0], msg[1]
+        player = self.players.get(slot)
+        if kind == "error":
+            print(f"引擎错误 (slot {slot}): {msg[2]}")
+        if player is not None:
+            player.on_event(kind, msg[2:])
+
+    def poll(self):
+        for slot, player in self.players.items():
+            player.on_shared_state(self.state.read_slot(slot))
+
+    def heartbeat_age(self):
+        return time.monotonic() - self.state.header(H_HEARTBEAT)
+
+    def on_engine_lost(self):
+        if self.closing:
+            return
+        print("音频引擎进程意外退出")
+        self.is_lost = True
+        self.poll_timer.stop()
+        self.lost.emit()
+
+    def shutdown(self):
+        self.closing = True
+        self.poll_timer.stop()
+        self.send("quit")
+        self.process.join(2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.reader.wait(500)
+        self.state.close(unlink=True)
+
+
+class RemoteAudioOutput(QObject):
+    def __init__(self, client, slot, device):
+        super().__init__()
+        self.client = client
+        self.slot = slot
+        self._device = device
+        self._volume = 1.0
+        # 渐隐由引擎推进，期间报告引擎那边的实际音量（电平表按它换算）
+        self.live_volume = None
+
+    def setVolume(self, volume):
+        self._volume = volume
+        self.live_volume = None
+        self.client.send("volume", self.slot, volume)
+
+    def volume(self):
+        return self._volume if self.live_volume is None else self.live_volume
+
+    def setDevice(self, device):
+        self._device = device
+        self.client.send("device", self.slot, bytes(device.id()))
+
+    def device(self):
+        return self._device
+
+
+class RemotePlayer(QObject):
+    positionChanged = pyqtSignal("qint64")
+    durationChanged = pyqtSignal("qint64")
+    mediaStatusChanged = pyqtSignal(object)
+    playbackStateChanged = pyqtSignal(object)
+    fadeFinished = pyqtSignal()
+
+    def __init__(self, client, slot, output):
+        super().__init__()
+        self.client = client
+        self.slot = slot
+        self.output = output
+        self.fading = False
+        self._state = QMediaPlayer.PlaybackState.StoppedState
+        self._status = QMediaPlayer.MediaStatus.NoMedia
+        self._position = 0
+        self._duration = 0
+        self.peak = 0.0
+        self.rms = 0.0
+        self.level_seq = 0
+
+    # --- QMediaPlayer 接口 ---
+    def setSource(self, url):
+        self.client.send("source", self.slot, url.toLocalFile())
+
+    def setSourceDevice(self, device, url):
+        # 目前只有 VBR MP3 帧切片会用到设备源，引擎那边按同样的字节范围重建
+        self.client.send(
+            "source_slice", self.slot, url.toLocalFile(), device.start, device.end
+        )
+
+    def setAudioOutput(self, output):
+        self.output = output
+
+    def setAudioBufferOutput(self, output):
+        pass
+
+    def play(self):
+        self._state = QMediaPlayer.PlaybackState.PlayingState
+        self.client.send("play", self.slot)
+
+    def pause(self):
+        self._state = QMediaPlayer.PlaybackState.PausedState
+        self.client.send("pause", self.slot)
+
+    def stop(self):
+        self._state = QMediaPlayer.PlaybackState.StoppedState
+        self._position = 0
+        self.fading = False
+        self.output.live_volume = None
+        self.client.send("stop", self.slot)
+
+    def setPosition(self, ms):
+        self._position = ms
+        self.client.send("seek", self.slot, int(ms))
+
+    def setLoops(self, loops):
+        self.client.send("loops", self.slot, getattr(loops, "value", loops))
+
+    def position(self):
+        return self._position
+
+    def duration(self):
+        return self._duration
+
+    def playbackState(self):
+        return self._state
+
+    def mediaStatus(self):
+        return self._status
+
+    # --- 引擎扩展 ---
+    def fade_out(self, seconds):
+        self.fading = True
+        self.client.send("fade", self.slot, seconds)
+
+    def cancel_fade(self):
+        self.fading = False
+        self.output.live_volume = None
+        self.client.send("fade_cancel", self.slot)
+
+    def recover(self, position, reopen_media):
+        self.client.send("recover", self.slot, int(position), reopen_media)
+
+    def release(self):
+        self.client.release(self.slot)
+
+    def on_event(self, kind, args):
+        if kind == "state":
+            self._state = QMediaPlayer.PlaybackState(args[0])
+            self.playbackStateChanged.emit(self._state)
+        elif kind == "status":
+            self._status = QMediaPlayer.MediaStatus(args[0])
+            self.mediaStatusChanged.emit(self._status)
+        elif kind == "fade_done":
+            self.fading = False
+            self.output.live_volume = None
+            self._state = QMediaPlayer.PlaybackState.StoppedState
+            self.fadeFinished.emit()
+
+    def on_shared_state(self, row):
+        if self.fading:
+            self.output.live_volume = row[F_VOLUME]
+        position = int(row[F_POSITION])
+        duration = int(row[F_DURATION])
+        if duration != self._duration:
+            self._duration = duration
+            self.durationChanged.emit(duration)
+        if position != self._position:
+            self._position = position
+            self.positionChanged.emit(position)
+        if row[F_LEVEL_SEQ] != self.level_seq:
+            self.level_seq = row[F_LEVEL_SEQ]
+            self.peak = row[F_PEAK]
+            self.rms = row[F_RMS]
+
+
+class RemoteLevels:
+    # 与 meters.LevelAccumulator 相同的 take() 接口，数据来自引擎写入的共享内存
+    def __init__(self, player):
+        self.player = player
+        self.busy_sec = 0.0
+        self._seq = 0
+
+    def take(self):
+        if self.player.level_seq == self._seq:
+            return None
+        self._seq = self.player.level_seq
+        return self.player.peak, self.player.rms
+
+
+class RemoteLevelTap:
+    def __init__(self, player):
+        self.acc = RemoteLevels(player)
@@ -0,0 +1,300 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import weakref
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QLabel
+
+import cache
+from theme import THEMES, DARK
+from tracer import TRACER
+
+HAS_PSUTIL = False
+try:
+    import psutil
+
+    HAS_PSUTIL = True
+except ImportError:
+    pass
+
+# --- 性能浮窗 ---
+# 演出前看一眼机器是否健康：界面事件循环延迟、进程 CPU / 内存、
+# 活着的播放器和输出数量、正在跑的增益任务、临时文件和缓存占用。
+# 心跳定时器每 100ms 触发一次，实际间隔比预期多出来的就是事件循环延迟；
+# 只在浮窗显示时采样，磁盘占用在后台线程里统计、间隔更长。
+
+HEARTBEAT_MS = 100
+REFRESH_MS = 1000
+DISK_EVERY = 10  # 每隔几次刷新统计一次磁盘
+
+# (警告, 严重)
+LAG_MS = (30, 100)
+CPU_PCT = (60, 90)  # 占一个核的百分比
+RSS_MB = (1024, 2048)
+FREE_MB = (2048, 512)  # 剩余空间，越小越糟
+BOOST_TEMP_PREFIX = "boosted_"
+
+_REGISTRY = {}
+
+
+def register(kind, obj):
+    # 创建播放器/输出/后台任务的地方登记一下，浮窗按类别数活着的实例
+    _REGISTRY.setdefault(kind, weakref.WeakSet()).add(obj)
+
+
+def live_count(kind):
+    n = 0
+    for obj in list(_REGISTRY.get(kind, ())):
+        if sip.isdeleted(obj):
+            continue
+        if isinstance(obj, QThread) and not obj.isRunning():
+            continue
+        n += 1
+    return n
+
+
+def process_rss():
+    # 字节；拿不到返回 None
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            handle, ctypes.byref(counters), counters.cb
+        ):
+            return counters.WorkingSetSize
+    return None
+
+
+def _tree_size(path):
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for e in entries:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    else:
+                        total += e.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    return total
+
+
+def disk_usage():
+    temp_dir = tempfile.gettempdir()
+    temp = 0
+    try:
+        with os.scandir(temp_dir) as entries:
+            for e in entries:
+                if e.name.startswith(BOOST_TEMP_PREFIX):
+                    try:
+                        temp += e.stat().st_size
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+    root = cache.cache_root()
+    free = None
+    for path in (temp_dir, root if os.path.isdir(root) else None):
+        if path is None:
+            continue
+        try:
+            f = shutil.disk_usage(path).free
+        except OSError:
+            continue
+        free = f if free is None else min(free, f)
+    return {"temp": temp, "cache": _tree_size(root), "free": free}
+
+
+class DiskUsageThread(QThread):
+    finished = pyqtSignal(object)
+
+    def run(self):
+        self.finished.emit(disk_usage())
+
+
+def level(value, limits):
+    # 0 正常 / 1 警告 / 2 严重
+    warn, crit = limits
+    if value is None:
+        return 0
+    if warn > crit:  # 越小越糟
+        return 2 if value <= crit else 1 if value <= warn else 0
+    return 2 if value >= crit else 1 if value >= warn else 0
+
+
+class PerfHud(QLabel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setObjectName("PerfHud")
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.RichText)
+        self.theme = DARK
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self._beat)
+        self.refresher = QTimer(self)
+        self.refresher.setInterval(REFRESH_MS)
+        self.refresher.timeout.connect(self.refresh)
+
+        self.last_beat = None
+        self.lag_max = 0.0
+        self.lag_sum = 0.0
+        self.lag_n = 0
+        self.last_cpu = None
+        self.ticks = 0
+        self.disk = None
+        self.disk_thread = None
+        self.hide()
+
+    def toggle(self):
+        self.set_active(not self.isVisible())
+
+    def set_active(self, on):
+        if on:
+            self.last_beat = time.perf_counter()
+            self.last_cpu = (time.perf_counter(), time.process_time())
+            self.ticks = 0
+            self.heartbeat.start()
+            self.refresher.start()
+            self.refresh()
+            self.show()
+            self.raise_()
+        else:
+            self.heartbeat.stop()
+            self.refresher.stop()
+            self.hide()
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = max(0.0, (now - self.last_beat) * 1000 - HEARTBEAT_MS)
+        self.last_beat = now
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_sum += lag
+        self.lag_n += 1
+        if lag >= LAG_MS[1]:
+            TRACER.instant("hud.lag", "perf", ms=lag)
+
+    def _cpu_percent(self):
+        wall, cpu = time.perf_counter(), time.process_time()
+        last_wall, last_cpu = self.last_cpu
+        self.last_cpu = (wall, cpu)
+        if wall - last_wall <= 0:
+            return 0.0
+        return 100.0 * (cpu - last_cpu) / (wall - last_wall)
+
+    def _start_disk_scan(self):
+        if self.disk_thread is not None:
+            return
+        self.disk_thread = DiskUsageThread()
+        self.disk_thread.finished.connect(self._on_disk)
+        self.disk_thread.start()
+
+    def _on_disk(self, usage):
+        self.disk = usage
+        self.disk_thread.wait()
+        self.disk_thread = None
+
+    def _color(self, lvl):
+        c = THEMES.get(self.theme, THEMES[DARK])
+        return (c["ok"], c["warning"], c["error"])[lvl]
+
+    def _row(self, name, text, lvl=0):
+        return (
+            f"<tr><td>{name}</td>"
+            f"<td align='right' style='color:{self._color(lvl)}'>{text}</td></tr>"
+        )
+
+    def refresh(self):
+        if self.ticks % DISK_EVERY == 0:
+            self._start_disk_scan()
+        self.ticks += 1
+
+        lag_avg = self.lag_sum / self.lag_n if self.lag_n else 0.0
+        lag_max = self.lag_max
+        self.lag_max = self.lag_sum = 0.0
+        self.lag_n = 0
+        cpu = self._cpu_percent()
+        rss = process_rss()
+        rss_mb = rss / 1048576 if rss is not None else None
+
+        rows = [
+            self._row(
+                "事件循环延迟",
+                f"{lag_avg:.0f} / 峰值 {lag_max:.0f} ms",
+                level(lag_max, LAG_MS),
+            ),
+            self._row("CPU", f"{cpu:.0f}%", level(cpu, CPU_PCT)),
+            self._row(
+                "内存",
+                f"{rss_mb:.0f} MB" if rss_mb is not None else "—",
+                level(rss_mb, RSS_MB),
+            ),
+            self._row(
+                "播放器 / 输出",
+                f"{live_count('player')} / {live_count('output')}",
+            ),
+            self._row("增益任务", str(live_count("boost"))),
+        ]
+        if self.disk is not None:
+            d = self.disk
+            free_mb = d["free"] / 1048576 if d["free"] is not None else None
+            rows.append(self._row("临时文件", f"{d['temp'] / 1048576:.0f} MB"))
+            rows.append(self._row("缓存", f"{d['cache'] / 1048576:.0f} MB"))
+            rows.append(
+                self._row(
+                    "剩余空间",
+                    f"{free_mb / 1024:.1f} GB" if free_mb is not None else "—",
+                    level(free_mb, FREE_MB),
+                )
+            )
+        self.setText(f"<table cellspacing='4'>{''.join(rows)}</table>")
+        self.adjustSize()
+        self.reposition()
+
+    def reposition(self):
+        parent = self.parentWidget()
+        if parent is not None:
+            self.move(parent.width() - self.width() - 16, 16)
+
+    def shutdown(self):
+        self.set_active(False)
+        if self.disk_thread is not None:
+            self.disk_thread.wait(2000)
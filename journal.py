@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from cache import atomic_write
+from tracer import TRACER
+
+# --- 崩溃恢复日志 ---
+# 程序崩溃时 closeEvent 不会执行：配置没保存，增益临时文件也没人删。
+# 运行中每秒在界面线程上拍一次快照（当前场景、每轨设置、是否在播、播放位置），
+# 有变化才交给后台线程写成 crash_journal.json（先写临时文件再改名），界面线程不碰磁盘。
+# 正常退出时删掉日志；下次启动还看到它就说明上次没正常退出：
+# 先删掉日志里记下的增益临时文件，再询问是否恢复——重建轨道、定位到当时的位置，
+# 可选接着播放；等不到媒体就绪的轨道超过 RESUME_TIMEOUT_MS 就不再自动播放。
+# 写日志的开销、恢复到出声的耗时记进追踪，退出时打印统计；离线测量见 bench.py journal。
+
+VERSION = 1
+JOURNAL_FILE = "crash_journal.json"
+INTERVAL_MS = 1000
+RESUME_TIMEOUT_MS = 5000
+POLL_MS = 20
+
+READY = (
+    QMediaPlayer.MediaStatus.LoadedMedia,
+    QMediaPlayer.MediaStatus.BufferedMedia,
+    QMediaPlayer.MediaStatus.EndOfMedia,
+)
+
+
+def load(path=JOURNAL_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("v") != VERSION:
+        return None
+    return entry
+
+
+def remove_temp_files(entry):
+    # 崩溃前生成的增益文件没人会再用，恢复时按需重新渲染
+    removed = 0
+    for path in entry.get("temp_files", []):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def scene_of(entry):
+    # 日志里的轨道去掉运行状态，就是一个普通的场景
+    return {
+        "device_name": entry.get("device_name", ""),
+        "tracks": [t["settings"] for t in entry.get("tracks", [])],
+    }
+
+
+class JournalWriter(QObject):
+    # collect() 在界面线程上返回快照 dict；序列化和写盘在后台线程，只保留最新一份
+    def __init__(self, collect, path=JOURNAL_FILE, parent=None):
+        super().__init__(parent)
+        self.collect = collect
+        self.path = path
+        self.last = None
+        self.pending = None
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = None
+        self.snap_ms = []
+        self.write_ms = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(INTERVAL_MS)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        # 退出时 close() 之后排队的 start 不再生效，免得又写出一份日志
+        if self.thread is not None or self.closed:
+            return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.timer.start()
+        self._tick()
+
+    def _tick(self):
+        t0 = time.perf_counter()
+        snapshot = self.collect()
+        if snapshot == self.last:
+            return
+        self.last = snapshot
+        self.snap_ms.append((time.perf_counter() - t0) * 1000)
+        with self.cond:
+            self.pending = dict(snapshot, v=VERSION, time=time.time())
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                entry, self.pending = self.pending, None
+            t0 = time.perf_counter()
+            try:
+                atomic_write(self.path, json.dumps(entry, ensure_ascii=False))
+            except OSError as e:
+                print(f"写崩溃恢复日志失败: {e}")
+                continue
+            self.write_ms.append((time.perf_counter() - t0) * 1000)
+
+    def close(self):
+        # 正常退出：停掉写线程再删日志，下次启动就不会提示恢复
+        self.timer.stop()
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(2.0)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def summary(self):
+        if not self.write_ms:
+            return ""
+        snap = sorted(self.snap_ms)
+        write = sorted(self.write_ms)
+        return (
+            f"崩溃恢复日志: 写了 {len(write)} 次，界面线程快照 平均 {sum(snap) / len(snap):.2f} ms"
+            f"（最大 {snap[-1]:.2f}），后台写盘 平均 {sum(write) / len(write):.2f} ms"
+            f"（最大 {write[-1]:.2f}）"
+        )
+
+
+class Resumer(QObject):
+    # 轨道重建后逐个等媒体就绪，定位到记下的位置；resume 时在播的接着播
+    finished = pyqtSignal(float, int, int)  # 耗时 ms, 恢复的轨道数, 超时的轨道数
+
+    def __init__(self, pairs, resume, parent=None):
+        super().__init__(parent)
+        # [(轨道控件, 日志里的那一轨)]
+        self.pending = list(pairs)
+        self.resume = resume
+        self.done = 0
+        self.t0 = time.perf_counter()
+        self.trace_start = TRACER.now()
+        self.timer = QTimer(self)
+        self.timer.setInterval(POLL_MS)
+        self.timer.timeout.connect(self._poll)
+
+    def start(self):
+        self._poll()
+        if self.pending:
+            self.timer.start()
+
+    def _poll(self):
+        waiting = []
+        for w, t in self.pending:
+            if w.player.mediaStatus() not in READY:
+                waiting.append((w, t))
+                continue
+            w.resume_at(t["position_ms"], self.resume and t["playing"])
+            self.done += 1
+        self.pending = waiting
+        elapsed = (time.perf_counter() - self.t0) * 1000
+        if self.pending and elapsed < RESUME_TIMEOUT_MS:
+            return
+        self.timer.stop()
+        timed_out = len(self.pending)
+        for w, t in self.pending:
+            print(f"崩溃恢复: {w.trace_name} 等不到媒体就绪，没有自动恢复")
+        self.pending = []
+        TRACER.complete(
+            "crash_resume",
+            self.trace_start,
+            "settings",
+            tracks=self.done,
+            timed_out=timed_out,
+        )
+        self.finished.emit(elapsed, self.done, timed_out)
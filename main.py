@@ -28,6 +28,11 @@ if os.name == "nt":  # 仅在 Windows 下生效
 
 import tempfile
 import json
+import time
+import multiprocessing
+
+# 启动时刻，用于统计会话恢复的首屏可操作时间
+LAUNCH_TIME = time.perf_counter()
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -45,14 +50,42 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QProgressBar,
     QDoubleSpinBox,
+    QInputDialog,
+    QProgressDialog,
 )
 from PyQt6.QtCore import Qt, QUrl, QTimer, QThread, pyqtSignal
-from PyQt6.QtGui import QFont, QPalette, QColor
+from PyQt6.QtGui import QFont, QShortcut, QKeySequence
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QMediaDevices
 
+from crossfade import FADING, SourceCrossfader
+from engine import EngineClient, RemoteLevelTap, claim_owner
+import hud
+from meters import HAS_METERS, LevelMeter, MeterHub, PlayerLevelTap
+from cues import CueDialog, CueScheduler, describe, normalize_cue
+import ducking
+import journal
+from session_log import SessionRecorder
+import preflight
+import relink
+import seek_index
+import sfx
+import silence
+import sync
+import transcode
+from restore import PathCheckThread, SessionRestorer
+from staging import DEFAULT_BUDGET_MB, MODE_AUTO, StagingManager, format_eta
+from scenes import DEFAULT_SCENE, ScenePreloader, normalize_scene
+from theme import DARK, LIGHT, action_button, apply_theme, set_prop
+from tracer import TRACER
+from watchdog import DEFAULT_WINDOW_SEC, PlaybackWatchdog
+
 # --- 配置文件路径 ---
 CONFIG_FILE = "bgm_config.json"
 
+# --- 播放引擎模式 ---
+ENGINE_INPROCESS = "inprocess"
+ENGINE_PROCESS = "process"
+
 # --- Pydub 配置与 FFmpeg 检测 ---
 HAS_PYDUB = False
 try:
@@ -64,8 +97,9 @@ try:
     else:
         base_path = os.path.dirname(os.path.abspath(__file__))
 
-    local_ffmpeg = os.path.join(base_path, "ffmpeg.exe")
-    local_ffprobe = os.path.join(base_path, "ffprobe.exe")
+    exe = ".exe" if os.name == "nt" else ""
+    local_ffmpeg = os.path.join(base_path, "ffmpeg" + exe)
+    local_ffprobe = os.path.join(base_path, "ffprobe" + exe)
 
     if os.path.exists(local_ffmpeg):
         os.environ["PATH"] += os.pathsep + base_path
@@ -76,14 +110,61 @@ try:
 except ImportError:
     pass
 
+# 增益渲染链要 numpy，没有就退回 pydub 的 +6dB
+HAS_DSP = False
+try:
+    import dsp
+
+    HAS_DSP = True
+except ImportError:
+    pass
+
+
+# 轨道销毁时还没跑完的后台线程（增益渲染、寻址索引、静音检测、指纹）：
+# 断开和轨道的连接后先留在这里，跑完再释放。否则 Python 包装被回收时
+# Qt 报 "QThread: Destroyed while thread is still running" 直接退出
+_PARKED = set()
+
+
+def park_thread(thread, on_finished=None):
+    for t in list(_PARKED):
+        if t.isFinished():
+            _PARKED.discard(t)
+
+    def done(*result):
+        if on_finished is not None:
+            on_finished(*result)
+        thread.wait()
+        _PARKED.discard(thread)
+
+    _PARKED.add(thread)
+    thread.finished.connect(done)
+    if isinstance(thread, AudioBoosterThread):
+        thread.error.connect(lambda _: done())
+
+
+def wait_parked(timeout_ms):
+    deadline = time.monotonic() + timeout_ms / 1000
+    for t in list(_PARKED):
+        t.wait(max(0, int((deadline - time.monotonic()) * 1000)))
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 
 class AudioBoosterThread(QThread):
     finished = pyqtSignal(str, str)
     error = pyqtSignal(str)
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, chain=None):
         super().__init__()
         self.file_path = file_path
+        self.chain = chain
+        self.report = None
 
     def run(self):
         try:
@@ -92,112 +173,181 @@ class AudioBoosterThread(QThread):
             if not os.path.exists(self.file_path):
                 raise Exception("源文件不存在")
 
-            audio = AudioSegment.from_file(self.file_path)
-            boosted_audio = audio + 6
+            name = os.path.basename(self.file_path)
             temp_dir = tempfile.gettempdir()
-            filename = f"boosted_{os.path.basename(self.file_path)}.wav"
+            filename = f"boosted_{name}.wav"
             temp_path = os.path.join(temp_dir, filename)
-            boosted_audio.export(temp_path, format="wav")
+            with TRACER.span("boost.render", "boost", track=name):
+                if HAS_DSP:
+                    # 增益 + EQ + 真峰值限幅，流式处理，不会削波
+                    self.report = dsp.render_file(self.file_path, temp_path, self.chain)
+                else:
+                    audio = AudioSegment.from_file(self.file_path)
+                    boosted_audio = audio + 6
+                    boosted_audio.export(temp_path, format="wav")
+            if self.report is not None:
+                TRACER.instant("boost.report", "boost", track=name, **self.report)
             self.finished.emit(self.file_path, temp_path)
         except Exception as e:
             self.error.emit(str(e))
 
 
+class SeekIndexThread(QThread):
+    finished = pyqtSignal(str, object)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            index = seek_index.load_or_build(self.file_path)
+        except Exception as e:
+            print(f"建立寻址索引失败: {e}")
+            index = None
+        self.finished.emit(self.file_path, index)
+
+
+class SilenceThread(QThread):
+    finished = pyqtSignal(str, object)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            info = silence.load_or_analyze(self.file_path)
+        except Exception as e:
+            print(f"静音检测失败: {e}")
+            info = None
+        self.finished.emit(self.file_path, info)
+
+
+class FingerprintThread(QThread):
+    finished = pyqtSignal(str, object)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            fp = relink.fingerprint(self.file_path)
+        except OSError as e:
+            print(f"计算文件指纹失败: {e}")
+            fp = None
+        self.finished.emit(self.file_path, fp)
+
+
+class PreflightThread(QThread):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object, float)
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.cancelled = False
+
+    def run(self):
+        # 留一个核给播放，演出中途点了也不会卡音频
+        workers = max(1, (os.cpu_count() or 2) - 1)
+        t0 = time.perf_counter()
+        try:
+            results = preflight.run(
+                self.paths,
+                workers,
+                progress=lambda done, total, r: self.progress.emit(
+                    done, total, r["path"]
+                ),
+                cancelled=lambda: self.cancelled,
+                chain=AudioTrackWidget.boost_chain,
+            )
+        except Exception as e:
+            print(f"预检失败: {e}")
+            results = None
+        self.finished.emit(results, time.perf_counter() - t0)
+
+
 class AudioTrackWidget(QFrame):
-    def __init__(self, file_path, device_info, parent=None):
+    cue_requested = pyqtSignal(object)
+    cue_changed = pyqtSignal()
+    # 换源交叉淡化后轨道换了一个播放器对象，连在旧播放器上的要重新连
+    player_changed = pyqtSignal()
+    duck_changed = pyqtSignal()
+    # 200% 增益的处理链，主窗口读配置时设置
+    boost_chain = None
+    # 多机同步的主机上由主窗口设置（sync.SyncController.intercept）
+    sync_hook = None
+
+    def __init__(
+        self, file_path, device_info, engine=None, source_path=None, parent=None
+    ):
         super().__init__(parent)
         self.setFrameShape(QFrame.Shape.StyledPanel)
+        # 样式来自全局主题（theme.py），按 objectName 匹配
+        self.setObjectName("TrackCard")
 
-        self.setStyleSheet("""
-            QFrame { 
-                background-color: #2D3748; 
-                border: none; 
-                border-radius: 16px; 
-                margin-bottom: 20px;
-            }
-            QFrame:hover {
-                background-color: #374151;
-            }
-            QLabel { 
-                color: #E2E8F0; 
-                font-weight: 600;
-                border: none;
-                background-color: transparent;
-            }
-            QPushButton { 
-                background-color: #4299E1; 
-                color: #FFFFFF; 
-                border: none; 
-                border-radius: 10px; 
-                padding: 10px 18px; 
-                font-weight: 600;
-            }
-            QPushButton:hover { 
-                background-color: #3182CE;
-                transform: translateY(-1px);
-            }
-            QPushButton:pressed {
-                background-color: #2C5282;
-                transform: translateY(0px);
-            }
-            QCheckBox {
-                color: #E2E8F0;
-                font-weight: 600;
-                spacing: 10px;
-                font-size: 15px;
-                background-color: transparent;
-                border: none;
-            }
-            QCheckBox::indicator {
-                width: 22px;
-                height: 22px;
-                border-radius: 6px;
-                border: 2px solid #EF4444;
-                background-color: transparent;
-            }
-            QCheckBox::indicator:hover {
-                border-color: #DC2626;
-            }
-            QCheckBox::indicator:checked {
-                background-color: #22C55E;
-                border-color: #16A34A;
-                image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTgiIGhlaWdodD0iMTQiIHZpZXdCb3g9IjAgMCAxOCAxNCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHBhdGggZD0iTTEgN0w2IDEyTDE3IDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMyIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
-            }
-            QCheckBox::indicator:checked:hover {
-                background-color: #16A34A;
-                border-color: #15803D;
-            }
-            QProgressBar {
-                border: none;
-                border-radius: 12px;
-                background-color: #1A202C;
-                height: 12px;
-                text-align: center;
-                color: transparent;
-            }
-            QProgressBar::chunk {
-                border-radius: 12px;
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 #48BB78, stop:1 #38A169);
-            }
-        """)
-
+        # original_path 是用户选的文件（存进配置）；实际播放的可能是本地暂存副本
         self.original_path = file_path
-        self.current_source = file_path
+        self.current_source = source_path or file_path
+        self.staged_path = source_path
+        # 转码缓存里的 WAV（transcode.py），有的话优先于暂存副本
+        self.pcm_path = None
+        self.pending_staged = None
+        self.trace_name = os.path.basename(file_path)
         self.is_boosted = False
         self.is_dragging = False
-
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.audio_output.setDevice(device_info)
-        self.player.setAudioOutput(self.audio_output)
-        self.player.setSource(QUrl.fromLocalFile(file_path))
+        # cleanup() 之后为 True，排在队列里的后台线程结果不再处理
+        self.disposed = False
+        # 播放中切换增益时正在进行的交叉淡化（crossfade.SourceCrossfader）
+        self.crossfade = None
+
+        # VBR MP3 帧索引：寻址时从目标帧的字节位置开始喂给播放器
+        self.seek_index = None
+        self.slice_device = None
+        self.slice_offset = 0
+
+        # 首尾静音检测结果 {start_ms, end_ms, duration_ms}，未检测完为 None
+        self.silence = None
+        # 大小 + 首尾哈希，文件搬家后重新定位用（relink.py）
+        self.fingerprint = None
+        # 自动启动的提示点（cues.normalize_cue 的结果），None 为手动
+        self.cue = None
+        # 自动闪避：角色（ducking.ROLES）和闪避总线给的当前增益
+        self.duck_role = None
+        self.duck_gain = 1.0
+        # 进程内渐隐：开始时的滑块音量，剩余档数 / 总档数
+        self.fade_base = 1.0
+        self.fade_steps_total = 1
+
+        # engine 不为空时播放器在独立进程里，这里拿到的是同接口的代理对象
+        if engine is not None and not engine.has_free_slot():
+            print(f"独立引擎不可用或已满，{self.trace_name} 改用进程内播放")
+            engine = None
+        self.engine = engine
+        if engine is not None:
+            self.player, self.audio_output = engine.create_player(device_info)
+            self.player.fadeFinished.connect(self._on_fade_finished)
+        else:
+            self.player = QMediaPlayer()
+            self.audio_output = QAudioOutput()
+            self.audio_output.setDevice(device_info)
+            self.player.setAudioOutput(self.audio_output)
+        hud.register("player", self.player)
+        hud.register("output", self.audio_output)
+        self.player.setSource(QUrl.fromLocalFile(self.current_source))
         self.audio_output.setVolume(1.0)
 
         self.fade_timer = QTimer()
         self.fade_timer.setInterval(50)
         self.fade_timer.timeout.connect(self._process_fade_step)
 
+        if engine is not None:
+            self.level_tap = RemoteLevelTap(self.player) if HAS_METERS else None
+        else:
+            self.level_tap = PlayerLevelTap(self.player, self) if HAS_METERS else None
+
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(24, 24, 24, 24)
 
@@ -221,7 +371,7 @@ class AudioTrackWidget(QFrame):
         font.setWeight(QFont.Weight.DemiBold)
         font.setFamily("Segoe UI")
         self.lbl_name.setFont(font)
-        self.lbl_name.setStyleSheet("color: #E2E8F0;")
+        self.lbl_name.setObjectName("TrackName")
 
         self.btn_boost = QPushButton("🚀 200%")
         self.btn_boost.setCheckable(True)
@@ -237,14 +387,47 @@ class AudioTrackWidget(QFrame):
         self.progress_bar.setFixedWidth(100)
         self.progress_bar.setVisible(False)
 
+        self.lbl_health = QLabel()
+        self.lbl_health.setFont(QFont("Segoe UI", 11))
+        self.lbl_health.setObjectName("HealthLabel")
+        self.lbl_health.setVisible(False)
+
+        self.lbl_stage = QLabel()
+        self.lbl_stage.setFont(QFont("Segoe UI", 11))
+        self.lbl_stage.setObjectName("StageLabel")
+        self.lbl_stage.setVisible(False)
+
+        self.lbl_cue = QLabel()
+        self.lbl_cue.setFont(QFont("Segoe UI", 11))
+        self.lbl_cue.setObjectName("CueLabel")
+        self.lbl_cue.setVisible(False)
+
+        self.btn_cue = QPushButton("⏱")
+        self.btn_cue.setToolTip("自动启动：定时 / 另一轨开始后 / 接在另一轨之后")
+        self.btn_cue.setMinimumHeight(40)
+        self.btn_cue.clicked.connect(lambda: self.cue_requested.emit(self))
+
+        self.btn_duck = QPushButton()
+        self.btn_duck.setObjectName("DuckButton")
+        self.btn_duck.setMinimumHeight(40)
+        self.btn_duck.clicked.connect(
+            lambda: self.set_duck_role(ducking.next_role(self.duck_role))
+        )
+        self.set_duck_role(None)
+
         row1.addWidget(self.btn_play)
         row1.addSpacing(20)
         row1.addWidget(self.btn_fade_stop)
         row1.addSpacing(24)
         row1.addWidget(self.lbl_name, 1)
+        row1.addWidget(self.lbl_health)
+        row1.addWidget(self.lbl_stage)
+        row1.addWidget(self.lbl_cue)
         row1.addWidget(self.progress_bar)
         row1.addSpacing(20)
         row1.addWidget(self.btn_boost)
+        row1.addWidget(self.btn_cue)
+        row1.addWidget(self.btn_duck)
 
         # Row 2
         row2 = QHBoxLayout()
@@ -254,48 +437,11 @@ class AudioTrackWidget(QFrame):
         self.lbl_time.setMinimumWidth(180)
         self.lbl_time.setFixedHeight(40)
         self.lbl_time.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_time.setStyleSheet(
-            "color: #CBD5E0; font-weight: 600; background-color: transparent;"
-        )
+        self.lbl_time.setObjectName("TrackTime")
 
         self.slider = QSlider(Qt.Orientation.Horizontal)
         self.slider.setMinimumHeight(35)
-        self.slider.setStyleSheet("""
-            QSlider::groove:horizontal { 
-                background: transparent;
-                height: 6px; 
-                border-radius: 3px;
-                margin: 8px 0;
-            }
-            QSlider::sub-page:horizontal {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
-                stop:0 #48BB78, stop:0.5 #38A169, stop:1 #2F855A); 
-                border-radius: 3px;
-                height: 6px;
-            }
-            QSlider::add-page:horizontal {
-                background: rgba(74, 85, 104, 0.3);
-                border-radius: 3px;
-                height: 6px;
-            }
-            QSlider::handle:horizontal { 
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                stop:0 #63B3ED, stop:1 #4299E1);
-                border: 2px solid #2B6CB0; 
-                width: 18px; 
-                height: 18px; 
-                margin: -6px 0; 
-                border-radius: 9px;
-            }
-            QSlider::handle:horizontal:hover { 
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                stop:0 #4299E1, stop:1 #3182CE);
-                border: 2px solid #2C5282;
-                width: 20px;
-                height: 20px;
-                margin: -8px 0;
-            }
-        """)
+        self.slider.setObjectName("SeekSlider")
         self.slider.sliderPressed.connect(self.on_slider_pressed)
         self.slider.sliderReleased.connect(self.on_slider_released)
         self.slider.sliderMoved.connect(self.on_slider_moved)
@@ -308,6 +454,17 @@ class AudioTrackWidget(QFrame):
         self.chk_loop.setMinimumWidth(80)
         self.chk_loop.setFixedHeight(40)
 
+        self.chk_trim = QCheckBox("跳过片头静音")
+        self.chk_trim.setFont(QFont("Segoe UI", 12))
+        self.chk_trim.setChecked(True)
+        self.chk_trim.setFixedHeight(40)
+        self.chk_trim.toggled.connect(self.on_trim_changed)
+
+        self.chk_trim_end = QCheckBox("去尾")
+        self.chk_trim_end.setFont(QFont("Segoe UI", 12))
+        self.chk_trim_end.setFixedHeight(40)
+        self.chk_trim_end.toggled.connect(self.on_trim_changed)
+
         lbl_vol = QLabel("音量")
         lbl_vol.setFont(QFont("Segoe UI", 12))
         lbl_vol.setFixedHeight(40)
@@ -315,49 +472,13 @@ class AudioTrackWidget(QFrame):
         lbl_vol.setAlignment(
             Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter
         )
-        lbl_vol.setStyleSheet("color: #E2E8F0; font-weight: 600;")
 
         self.vol_slider = QSlider(Qt.Orientation.Horizontal)
         self.vol_slider.setRange(0, 100)
         self.vol_slider.setValue(100)
         self.vol_slider.setFixedWidth(120)
         self.vol_slider.setFixedHeight(30)
-        self.vol_slider.setStyleSheet("""
-            QSlider::groove:horizontal { 
-                background: transparent;
-                height: 4px; 
-                border-radius: 2px;
-                margin: 6px 0;
-            }
-            QSlider::sub-page:horizontal {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
-                stop:0 #4299E1, stop:0.5 #3182CE, stop:1 #2C5282); 
-                border-radius: 2px;
-                height: 4px;
-            }
-            QSlider::add-page:horizontal {
-                background: rgba(74, 85, 104, 0.3);
-                border-radius: 2px;
-                height: 4px;
-            }
-            QSlider::handle:horizontal { 
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                stop:0 #63B3ED, stop:1 #4299E1);
-                border: 2px solid #2B6CB0; 
-                width: 14px; 
-                height: 14px; 
-                margin: -5px 0; 
-                border-radius: 7px;
-            }
-            QSlider::handle:horizontal:hover { 
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                stop:0 #4299E1, stop:1 #3182CE);
-                border: 2px solid #2C5282;
-                width: 16px;
-                height: 16px;
-                margin: -6px 0;
-            }
-        """)
+        self.vol_slider.setObjectName("VolumeSlider")
         self.vol_slider.valueChanged.connect(self.set_volume)
 
         self.lbl_vol_val = QLabel("100%")
@@ -365,12 +486,13 @@ class AudioTrackWidget(QFrame):
         self.lbl_vol_val.setMinimumWidth(60)
         self.lbl_vol_val.setFixedHeight(40)
         self.lbl_vol_val.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_vol_val.setStyleSheet("color: #E2E8F0; font-weight: 600;")
 
         row2.addWidget(self.lbl_time, alignment=Qt.AlignmentFlag.AlignVCenter)
         row2.addWidget(self.slider, alignment=Qt.AlignmentFlag.AlignVCenter)
         row2.addSpacing(24)
         row2.addWidget(self.chk_loop, alignment=Qt.AlignmentFlag.AlignVCenter)
+        row2.addWidget(self.chk_trim, alignment=Qt.AlignmentFlag.AlignVCenter)
+        row2.addWidget(self.chk_trim_end, alignment=Qt.AlignmentFlag.AlignVCenter)
         row2.addSpacing(24)
         row2.addWidget(lbl_vol, alignment=Qt.AlignmentFlag.AlignVCenter)
         row2.addWidget(self.vol_slider, alignment=Qt.AlignmentFlag.AlignVCenter)
@@ -379,60 +501,291 @@ class AudioTrackWidget(QFrame):
         self.layout.addLayout(row1)
         self.layout.addLayout(row2)
 
+        self.meter = LevelMeter()
+        self.meter.setVisible(HAS_METERS)
+        self.layout.addWidget(self.meter)
+
+        self._connect_player()
+
+        if file_path.lower().endswith(".mp3"):
+            self.index_thread = SeekIndexThread(self.current_source)
+            self.index_thread.finished.connect(self.on_seek_index_ready)
+            self.index_thread.start()
+
+        if silence.HAS_NUMPY:
+            self.silence_thread = SilenceThread(self.current_source)
+            self.silence_thread.finished.connect(self.on_silence_ready)
+            self.silence_thread.start()
+
+        self.fingerprint_thread = FingerprintThread(self.current_source)
+        self.fingerprint_thread.finished.connect(self.on_fingerprint_ready)
+        self.fingerprint_thread.start()
+
+    def _connect_player(self):
         self.player.positionChanged.connect(self.update_position)
         self.player.durationChanged.connect(self.update_duration)
         self.player.mediaStatusChanged.connect(self.check_media_status)
+        self.player.playbackStateChanged.connect(self.on_playback_state)
+
+    def on_silence_ready(self, path, info):
+        if info is None or self.disposed:
+            return
+        self.silence = info
+        lead = info["start_ms"] / 1000
+        tail = (info["duration_ms"] - info["end_ms"]) / 1000
+        self.chk_trim.setToolTip(f"片头静音 {lead:.2f} 秒，播放时直接从有声处开始")
+        self.chk_trim_end.setToolTip(f"片尾静音 {tail:.2f} 秒，勾选后播到有声结尾即停")
+        self.set_loop_mode(self.chk_loop.isChecked())
+
+    def play_start_ms(self):
+        if self.silence is None or not self.chk_trim.isChecked():
+            return 0
+        return self.silence["start_ms"]
+
+    def play_end_ms(self):
+        if self.silence is None or not self.chk_trim_end.isChecked():
+            return None
+        return self.silence["end_ms"]
+
+    def manual_loop(self):
+        # 切片播放或跳过首尾静音时，循环要回到有声起点，不能交给播放器自己循环
+        return (
+            self.slice_device is not None
+            or self.play_start_ms() > 0
+            or self.play_end_ms() is not None
+        )
+
+    def on_trim_changed(self, checked):
+        self.set_loop_mode(self.chk_loop.isChecked())
+
+    def restart_from_top(self):
+        self.seek_to(self.play_start_ms())
+        self.player.play()
+
+    def on_seek_index_ready(self, path, index):
+        if index is None or not index.needs_correction or self.disposed:
+            return
+        self.seek_index = index
+        self.update_duration(self.player.duration())
+
+    def current_position(self):
+        return self.player.position() + self.slice_offset
+
+    def seek_to(self, ms):
+        TRACER.instant("seek", "transport", track=self.trace_name, ms=ms)
+        index = self.seek_index_for(self.current_source)
+        if index is None or self.is_boosted:
+            self.player.setPosition(ms)
+            return
+        frame = index.frame_at(ms)
+        if frame == 0:
+            self._reset_slice()
+            self.player.setPosition(0)
+            return
+        old = self.slice_device
+        self.slice_device = seek_index.FrameSliceDevice(
+            self.current_source, index.offsets[frame], index.data_end, self
+        )
+        self.slice_offset = index.frame_time(frame)
+        self.player.setSourceDevice(
+            self.slice_device, QUrl.fromLocalFile(self.current_source)
+        )
+        # 切片播完要回到完整文件再循环，所以切片期间由 check_media_status 接管循环
+        self.set_loop_mode(self.chk_loop.isChecked())
+        if old is not None:
+            old.close()
+            old.deleteLater()
+
+    def seek_index_for(self, path):
+        # 帧索引是按压缩文件算的，放转码后的 WAV 时不能用（WAV 本身寻址就准）
+        return None if path == self.pcm_path else self.seek_index
+
+    def resume_at(self, ms, play):
+        # 崩溃恢复：回到日志里记下的位置，play 为 False 时停在暂停状态
+        self.seek_to(ms)
+        if play:
+            self.player.play()
+            self.btn_play.setText("⏸ 暂停")
+        else:
+            self.player.pause()
+            self.btn_play.setText("▶ 继续")
+
+    def _reset_slice(self):
+        if self.slice_device is None:
+            return
+        self.player.setSource(QUrl.fromLocalFile(self.current_source))
+        self.slice_device.close()
+        self.slice_device.deleteLater()
+        self.slice_device = None
+        self.slice_offset = 0
+        self.set_loop_mode(self.chk_loop.isChecked())
+
+    def settings(self):
+        return {
+            "path": self.original_path,
+            "volume": self.vol_slider.value(),
+            "loop": self.chk_loop.isChecked(),
+            "boost": self.btn_boost.isChecked(),
+            "trim_start": self.chk_trim.isChecked(),
+            "trim_end": self.chk_trim_end.isChecked(),
+            "cue": self.cue,
+            "duck": self.duck_role,
+            "fingerprint": self.fingerprint,
+        }
+
+    def on_fingerprint_ready(self, path, fp):
+        if fp is not None:
+            self.fingerprint = fp
+
+    def apply_settings(self, data):
+        if self.fingerprint is None:
+            self.fingerprint = data.get("fingerprint")
+        self.vol_slider.setValue(data.get("volume", 100))
+        self.chk_loop.setChecked(data.get("loop", True))
+        self.chk_trim.setChecked(data.get("trim_start", True))
+        self.chk_trim_end.setChecked(data.get("trim_end", False))
+        self.set_cue(normalize_cue(data.get("cue")))
+        self.set_duck_role(ducking.normalize_role(data.get("duck")))
+        boost = data.get("boost", False) and HAS_PYDUB
+        if boost != self.btn_boost.isChecked():
+            self.btn_boost.setChecked(boost)
+            self.toggle_boost()
 
     def toggle_boost(self):
         if self.btn_boost.isChecked():
             self.start_boost_process()
         else:
-            self.switch_source(self.original_path, is_boosted=False)
+            self.switch_source(self.playback_path(), is_boosted=False)
 
     def start_boost_process(self):
         self.btn_boost.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.lbl_name.setText("正在处理增益...")
-        self.boost_thread = AudioBoosterThread(self.original_path)
+        TRACER.begin("boost", id(self), "boost", track=self.trace_name)
+        self.boost_thread = AudioBoosterThread(self.playback_path(), self.boost_chain)
         self.boost_thread.finished.connect(self.on_boost_finished)
         self.boost_thread.error.connect(self.on_boost_error)
+        hud.register("boost", self.boost_thread)
         self.boost_thread.start()
 
     def on_boost_finished(self, orig_path, temp_path):
+        if self.disposed:
+            # 渲染完成的信号已经排在队列里，轨道却已经销毁
+            _remove_quietly(temp_path)
+            return
+        TRACER.end("boost", id(self), "boost", track=self.trace_name)
         self.progress_bar.setVisible(False)
         self.btn_boost.setEnabled(True)
         self.lbl_name.setText(os.path.basename(orig_path) + " (MAX)")
-        self.lbl_name.setStyleSheet("color: #F56565;")
+        report = self.boost_thread.report
+        if report is not None:
+            self.btn_boost.setToolTip(dsp.format_report(report))
         self.switch_source(temp_path, is_boosted=True)
 
     def on_boost_error(self, err_msg):
+        if self.disposed:
+            return
+        TRACER.end("boost", id(self), "boost", track=self.trace_name, error=err_msg)
         self.progress_bar.setVisible(False)
         self.btn_boost.setEnabled(True)
         self.btn_boost.setChecked(False)
         self.lbl_name.setText(os.path.basename(self.original_path))
-        self.lbl_name.setStyleSheet("color: #E2E8F0;")
+        set_prop(self.lbl_name, "state", "")
         # 错误日志静默打印到控制台，避免弹窗打扰
         print(f"增益错误: {err_msg}")
 
     def switch_source(self, path, is_boosted):
-        was_playing = (
-            self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        if self.crossfade is not None:
+            # 上一次切换还没完成又切回来：放弃它，当前源还是原来的
+            self.crossfade.cancel()
+            self.crossfade.deleteLater()
+            self.crossfade = None
+        if path == self.current_source:
+            self._source_switched(path, is_boosted)
+            return
+        playing = self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        if not playing or self.engine is not None:
+            self._hard_switch(path, is_boosted)
+            return
+        # 正在播：备用播放器对齐后交叉淡化，不断音、不重播
+        self.crossfade = SourceCrossfader(self, path, is_boosted)
+        self.crossfade.done.connect(self._adopt_player)
+        self.crossfade.failed.connect(self._on_crossfade_failed)
+
+    def _hard_switch(self, path, is_boosted):
+        state = self.player.playbackState()
+        position = self.current_position()
+        TRACER.instant(
+            "switch_source", "boost", track=self.trace_name, boosted=is_boosted
         )
-        position = self.player.position()
         self.player.stop()
+        self._reset_slice()
         self.player.setSource(QUrl.fromLocalFile(path))
+        self._source_switched(path, is_boosted)
+        if state == QMediaPlayer.PlaybackState.PlayingState:
+            self.seek_to(max(0, position - 500))
+            self.player.play()
+        elif state == QMediaPlayer.PlaybackState.PausedState:
+            # 暂停中换源（比如崩溃恢复后增益才渲染好）留在原来的位置
+            self.seek_to(position)
+            self.player.pause()
+
+    def _source_switched(self, path, is_boosted):
         self.current_source = path
         self.is_boosted = is_boosted
-        if was_playing:
-            self.player.setPosition(max(0, position - 500))
-            self.player.play()
         if not is_boosted:
             self.lbl_name.setText(os.path.basename(self.original_path))
-        self.lbl_name.setStyleSheet("color: #E2E8F0;")
+        set_prop(self.lbl_name, "state", "boosted" if is_boosted else "")
+
+    def _adopt_player(self, player, output, slice_device, slice_offset):
+        xf = self.crossfade
+        self.crossfade = None
+        old_player, old_output, old_slice = (
+            self.player,
+            self.audio_output,
+            self.slice_device,
+        )
+        # 旧播放器停下时不能再触发轨道和提示点的状态处理
+        old_player.blockSignals(True)
+        old_player.stop()
+        self.player = player
+        self.audio_output = output
+        self.slice_device = slice_device
+        self.slice_offset = slice_offset
+        if self.level_tap is not None:
+            self.level_tap.attach(player)
+        self._connect_player()
+        self.set_loop_mode(self.chk_loop.isChecked())
+        self._source_switched(xf.path, xf.is_boosted)
+        old_player.deleteLater()
+        old_output.deleteLater()
+        if old_slice is not None:
+            old_slice.close()
+            old_slice.deleteLater()
+        xf.deleteLater()
+        self.player_changed.emit()
+
+    def _on_crossfade_failed(self, reason):
+        xf = self.crossfade
+        self.crossfade = None
+        print(f"交叉淡化失败，直接切换: {reason}")
+        self._hard_switch(xf.path, xf.is_boosted)
+        xf.deleteLater()
+
+    def _settle_crossfade(self):
+        # 切换途中操作员按了播放/渐隐/急停等：已经在淡化就立即完成，还没就绪就直接换源
+        xf = self.crossfade
+        if xf is None or xf.finish_now():
+            return
+        xf.cancel()
+        self._on_crossfade_failed("切换途中有新的操作")
 
     def fade_out_stop(self):
+        self._settle_crossfade()
         if self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
             return
+        if self._sync("fade"):
+            return
         self.btn_fade_stop.setEnabled(False)
         self.btn_play.setEnabled(False)
 
@@ -442,47 +795,114 @@ class AudioTrackWidget(QFrame):
         self.fade_steps_left = int(duration_ms / 50)
         if self.fade_steps_left < 1:
             self.fade_steps_left = 1
+        self.fade_steps_total = self.fade_steps_left
 
-        current_vol = self.audio_output.volume()
-        self.fade_vol_step = current_vol / self.fade_steps_left
+        TRACER.begin("fade", id(self), "fade", track=self.trace_name, sec=duration_sec)
+        if self.engine is not None:
+            # 引擎按单调时钟自己推进渐隐，界面卡住也不影响时长
+            self.player.fade_out(duration_sec)
+            return
+        # 渐隐期间调滑块不生效，闪避照常叠加
+        self.fade_base = self.vol_slider.value() / 100.0
         self.fade_timer.start()
 
     def _process_fade_step(self):
         if self.fade_steps_left > 0:
-            new_vol = self.audio_output.volume() - self.fade_vol_step
-            self.audio_output.setVolume(max(0, new_vol))
             self.fade_steps_left -= 1
+            self.apply_volume()
         else:
             self.fade_timer.stop()
             self.player.stop()
-            target_vol = self.vol_slider.value() / 100.0
-            self.audio_output.setVolume(target_vol)
-            self.btn_fade_stop.setEnabled(True)
-            self.btn_play.setEnabled(True)
-            self.btn_play.setText("▶ 播放")
+            self._on_fade_finished()
+
+    def _on_fade_finished(self):
+        TRACER.end("fade", id(self), "fade", track=self.trace_name)
+        self._reset_slice()
+        self.apply_volume()
+        self.btn_fade_stop.setEnabled(True)
+        self.btn_play.setEnabled(True)
+        self.btn_play.setText("▶ 播放")
+
+    def set_cue(self, cue):
+        self.cue = cue
+        self.lbl_cue.setText(describe(cue))
+        self.lbl_cue.setVisible(cue is not None)
+        self.cue_changed.emit()
+
+    def prime(self):
+        # 提示点快到了：先定位到起点并暂停，让解码和输出提前准备好
+        if self.player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+            return
+        start = self.play_start_ms()
+        if start > 0:
+            self.seek_to(start)
+        self.player.pause()
+
+    def unprime(self):
+        if self.player.playbackState() == QMediaPlayer.PlaybackState.PausedState:
+            self.player.stop()
+            self._reset_slice()
+
+    def cue_start(self):
+        TRACER.instant("cue.start", "transport", track=self.trace_name)
+        if self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            self.toggle_play()
+
+    def is_fading(self):
+        if self.engine is not None:
+            return self.player.fading
+        return self.fade_timer.isActive()
+
+    def _sync(self, action, pos=None):
+        # 多机同步的主机：操作交给同步层，到约定时刻各台机器一起执行
+        hook = AudioTrackWidget.sync_hook
+        return hook is not None and hook(self, action, pos)
 
     def toggle_play(self):
-        if self.fade_timer.isActive():
+        state = self.player.playbackState()
+        if state == QMediaPlayer.PlaybackState.PlayingState:
+            synced = self._sync("pause")
+        elif state == QMediaPlayer.PlaybackState.PausedState:
+            synced = self._sync("play", self.current_position())
+        else:
+            synced = self._sync("play", self.play_start_ms())
+        if synced:
+            return
+        self._settle_crossfade()
+        if self.is_fading():
             self.fade_timer.stop()
-            target_vol = self.vol_slider.value() / 100.0
-            self.audio_output.setVolume(target_vol)
+            if self.engine is not None:
+                self.player.cancel_fade()
+            TRACER.end("fade", id(self), "fade", track=self.trace_name, cancelled=True)
+            self.apply_volume()
             self.btn_fade_stop.setEnabled(True)
             self.btn_play.setEnabled(True)
         if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            TRACER.instant("pause", "transport", track=self.trace_name)
             self.player.pause()
             self.btn_play.setText("▶ 继续")
         else:
+            TRACER.instant("play", "transport", track=self.trace_name)
+            if self.player.playbackState() == QMediaPlayer.PlaybackState.StoppedState:
+                start = self.play_start_ms()
+                if start > 0:
+                    self.seek_to(start)
             self.player.play()
             self.btn_play.setText("⏸ 暂停")
 
     def stop_instant(self):
+        self._settle_crossfade()
+        if self.is_fading():
+            TRACER.end("fade", id(self), "fade", track=self.trace_name, cancelled=True)
+        TRACER.instant("stop", "transport", track=self.trace_name)
         self.fade_timer.stop()
         self.player.stop()
+        self._reset_slice()
         self.btn_play.setText("▶ 播放")
-        target_vol = self.vol_slider.value() / 100.0
-        self.audio_output.setVolume(target_vol)
+        self.apply_volume()
 
     def set_output_device(self, device_info):
+        self._settle_crossfade()
         was_playing = (
             self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
         )
@@ -493,12 +913,110 @@ class AudioTrackWidget(QFrame):
         else:
             self.player.setPosition(pos)
 
+    def local_path(self):
+        return self.pcm_path or self.staged_path
+
+    def playback_path(self):
+        return self.local_path() or self.original_path
+
+    def use_staged(self, path):
+        # 暂存副本校验通过：停着就马上换过去，正在播就等这次停下再换，避免断音
+        self.staged_path = path
+        self._use_local()
+
+    def use_pcm(self, path):
+        # 转码好的 WAV，换过去的时机和暂存副本一样
+        self.pcm_path = path
+        self._use_local()
+
+    def _use_local(self):
+        if self.is_boosted:
+            return
+        if self.player.playbackState() == QMediaPlayer.PlaybackState.StoppedState:
+            self._switch_to_staged()
+        else:
+            self.pending_staged = self.local_path()
+
+    def _switch_to_staged(self):
+        self.pending_staged = None
+        if self.current_source == self.local_path():
+            return
+        TRACER.instant(
+            "use_staged", "staging", track=self.trace_name, pcm=bool(self.pcm_path)
+        )
+        self._reset_slice()
+        self.current_source = self.local_path()
+        self.player.setSource(QUrl.fromLocalFile(self.current_source))
+
+    def on_playback_state(self, state):
+        if (
+            state == QMediaPlayer.PlaybackState.StoppedState
+            and self.pending_staged is not None
+            and not self.is_boosted
+        ):
+            self._switch_to_staged()
+
+    def show_staging(self, text, tone=""):
+        self.lbl_stage.setText(text)
+        set_prop(self.lbl_stage, "tone", tone)
+        self.lbl_stage.setVisible(bool(text))
+
+    def recover_output(self, position, reopen_media=False):
+        # 看门狗触发：重建音频输出（必要时重新打开媒体），回到最后正常的位置继续
+        self._settle_crossfade()
+        if reopen_media and self.local_path() and not self.is_boosted:
+            # 原文件所在的 U 盘/共享盘出问题时，重新打开本地副本
+            self.pending_staged = None
+            self.current_source = self.local_path()
+        if self.engine is not None:
+            if reopen_media:
+                self.player.stop()
+                self._reset_slice()
+                self.player.setSource(QUrl.fromLocalFile(self.current_source))
+                self.seek_to(position)
+                self.player.play()
+            else:
+                self.player.recover(position - self.slice_offset, False)
+            return
+        device = self.audio_output.device()
+        volume = self.audio_output.volume()
+        old_output = self.audio_output
+        self.audio_output = QAudioOutput()
+        hud.register("output", self.audio_output)
+        self.audio_output.setDevice(device)
+        self.audio_output.setVolume(volume)
+        self.player.setAudioOutput(self.audio_output)
+        old_output.deleteLater()
+        if reopen_media:
+            self.player.stop()
+            self._reset_slice()
+            self.player.setSource(QUrl.fromLocalFile(self.current_source))
+        self.seek_to(position)
+        self.player.play()
+
+    def show_health(self, text):
+        self.lbl_health.setText(text)
+        self.lbl_health.setVisible(True)
+
     def update_position(self, position):
+        position += self.slice_offset
+        end = self.play_end_ms()
+        if (
+            end is not None
+            and position >= end
+            and not self.is_dragging
+            and self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        ):
+            self.on_trimmed_end()
+            return
         if not self.is_dragging:
             self.slider.setValue(position)
             self.lbl_time.setText(f"{self.format_time(position)} / {self.duration_str}")
 
     def update_duration(self, duration):
+        if self.seek_index is not None:
+            # 无 TOC 的 VBR 文件，播放器按开头码率估出来的时长不准
+            duration = self.seek_index.duration_ms
         self.slider.setRange(0, duration)
         self.duration_str = self.format_time(duration)
         self.lbl_time.setText(f"00:00 / {self.duration_str}")
@@ -510,40 +1028,164 @@ class AudioTrackWidget(QFrame):
         self.lbl_time.setText(f"{self.format_time(pos)} / {self.duration_str}")
 
     def on_slider_released(self):
-        self.player.setPosition(self.slider.value())
+        if self._sync("play", self.slider.value()):
+            self.is_dragging = False
+            return
+        self._settle_crossfade()
+        self.seek_to(self.slider.value())
         self.is_dragging = False
         if self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
             self.player.play()
             self.btn_play.setText("⏸ 暂停")
 
     def set_loop_mode(self, checked):
+        if self.manual_loop():
+            checked = False
         self.player.setLoops(QMediaPlayer.Loops.Infinite if checked else 1)
 
     def set_volume(self, value):
         self.lbl_vol_val.setText(f"{value}%")
-        if not self.fade_timer.isActive():
-            self.audio_output.setVolume(value / 100.0)
+        if not self.is_fading():
+            self.apply_volume()
+
+    def target_volume(self):
+        return self.vol_slider.value() / 100.0 * self.duck_gain
+
+    def apply_volume(self):
+        # 输出音量 = 滑块 × 渐隐 × 闪避；交叉淡化和独立引擎的渐隐自己控制音量
+        if self.crossfade is not None and self.crossfade.state == FADING:
+            return
+        if self.engine is not None and self.player.fading:
+            return
+        if self.fade_timer.isActive():
+            fade = self.fade_steps_left / self.fade_steps_total
+            self.audio_output.setVolume(self.fade_base * fade * self.duck_gain)
+            return
+        self.audio_output.setVolume(self.target_volume())
+
+    def set_duck(self, gain):
+        self.duck_gain = gain
+        self.apply_volume()
+
+    def set_duck_role(self, role):
+        self.duck_role = role
+        self.btn_duck.setText(ducking.ROLE_TEXT[role])
+        self.btn_duck.setToolTip(ducking.ROLE_TIP[role])
+        self.duck_changed.emit()
 
     def check_media_status(self, status):
-        if (
-            status == QMediaPlayer.MediaStatus.EndOfMedia
-            and not self.chk_loop.isChecked()
-        ):
+        TRACER.instant(
+            "media_status", "media", track=self.trace_name, status=status.name
+        )
+        if status != QMediaPlayer.MediaStatus.EndOfMedia:
+            return
+        manual = self.manual_loop()
+        if self.slice_device is not None:
+            self._reset_slice()
+        if self.chk_loop.isChecked() and manual:
+            self.restart_from_top()
+            return
+        if not self.chk_loop.isChecked():
             self.btn_play.setText("▶ 播放")
 
+    def on_trimmed_end(self):
+        TRACER.instant("trimmed_end", "transport", track=self.trace_name)
+        if self.chk_loop.isChecked():
+            self.restart_from_top()
+            return
+        self.player.stop()
+        self._reset_slice()
+        self.btn_play.setText("▶ 播放")
+
     def format_time(self, ms):
         s = (ms // 1000) % 60
         m = ms // 60000
         return f"{m:02d}:{s:02d}"
 
     def cleanup(self):
+        self.disposed = True
+        self._release_workers()
+        if self.crossfade is not None:
+            self.crossfade.cancel()
+            self.crossfade = None
         self.player.stop()
+        if self.engine is not None:
+            self.player.release()
+        if self.slice_device is not None:
+            self.slice_device.close()
         if self.is_boosted and os.path.exists(self.current_source):
             try:
                 os.remove(self.current_source)
             except:
                 pass
 
+    def _release_workers(self):
+        # 没跑完的线程交给 park_thread；之后才出来的增益文件没人用，直接删掉
+        for name in (
+            "boost_thread",
+            "index_thread",
+            "silence_thread",
+            "fingerprint_thread",
+        ):
+            thread = getattr(self, name, None)
+            if thread is None or not thread.isRunning():
+                continue
+            thread.finished.disconnect()
+            if name == "boost_thread":
+                thread.error.disconnect()
+                park_thread(thread, lambda orig, temp: _remove_quietly(temp))
+            else:
+                park_thread(thread)
+            setattr(self, name, None)
+
+
+class MissingTrackWidget(QFrame):
+    # 文件暂时找不到（U 盘没插、共享盘没连上）的轨道占位，保留原有设置，
+    # 文件回来后由主窗口换成正常的轨道
+    retry_requested = pyqtSignal(object)
+    relink_requested = pyqtSignal(object)
+    remove_requested = pyqtSignal(object)
+
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self.data = dict(data)
+        self.original_path = data["path"]
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.setObjectName("MissingCard")
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(24, 16, 24, 16)
+
+        text = QVBoxLayout()
+        lbl_name = QLabel(f"⚠ {os.path.basename(self.original_path)}（文件暂时找不到）")
+        lbl_name.setFont(QFont("Segoe UI", 16))
+        lbl_path = QLabel(self.original_path)
+        lbl_path.setFont(QFont("Consolas", 11))
+        text.addWidget(lbl_name)
+        text.addWidget(lbl_path)
+
+        btn_retry = QPushButton("🔄 重试")
+        btn_retry.clicked.connect(lambda: self.retry_requested.emit(self))
+        btn_relink = QPushButton("🔍 重新定位")
+        btn_relink.setToolTip("在音乐文件夹里按文件名和内容找回所有丢失的曲目")
+        btn_relink.clicked.connect(lambda: self.relink_requested.emit(self))
+        btn_remove = QPushButton("✖ 移除")
+        btn_remove.clicked.connect(lambda: self.remove_requested.emit(self))
+
+        layout.addLayout(text, 1)
+        layout.addWidget(btn_retry)
+        layout.addWidget(btn_relink)
+        layout.addWidget(btn_remove)
+
+    def settings(self):
+        return dict(self.data)
+
+    def apply_settings(self, data):
+        self.data = dict(data)
+
+    def cleanup(self):
+        pass
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -551,18 +1193,49 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("接力年会 BGM 控制台 v11.0 by liqi")
         self.resize(1200, 900)
         self.tracks = []
+        self.missing = {}
+        self.missing_checker = None
+        # 重新定位丢失曲目时搜索的文件夹（relink.py）
+        self.relink_roots = []
+        self.relink_thread = None
+        self.watchdog_window = DEFAULT_WINDOW_SEC
+        self.theme = DARK
+        self.show_hud = False
+        # 操作记录（session_log.py），配置 record_sessions 为 false 时不记
+        self.record_sessions = True
+        self.recorder = None
+        # 自动闪避的共享增益（ducking.py）
+        self.ducking = ducking.DuckingBus(lambda: self.tracks, self)
+        # 崩溃恢复日志（journal.py）：上次没正常退出时留下的那份先读出来，恢复完会话再询问
+        self.crash_entry = journal.load()
+        if self.crash_entry is not None:
+            journal.remove_temp_files(self.crash_entry)
+        self.journal = journal.JournalWriter(self.journal_snapshot, parent=self)
+        self.resumer = None
+
+        # 播放引擎模式在建任何轨道之前就要确定，改了需要重启程序
+        self.engine_mode = self.read_engine_mode()
+        self.engine = None
+        if self.engine_mode == ENGINE_PROCESS:
+            try:
+                self.engine = EngineClient(self)
+                self.engine.lost.connect(self.on_engine_lost)
+            except Exception as e:
+                print(f"启动独立音频引擎失败，改用进程内播放: {e}")
+        if self.engine is None:
+            # 上次崩溃时留下的独立引擎看到新令牌就会退出
+            claim_owner()
 
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
+        # 性能浮窗盖在界面右上角，不参与布局
+        self.hud = hud.PerfHud(main_widget)
         main_layout = QVBoxLayout(main_widget)
 
         # --- Top Bar ---
         top_frame = QFrame()
         top_frame.setFixedHeight(80)
-        top_frame.setStyleSheet("""
-            QFrame { background-color: #1A202C; border-bottom: 2px solid #2D3748; }
-            QLabel { color: #E2E8F0; font-weight: 600; }
-        """)
+        top_frame.setObjectName("TopBar")
         top_layout = QHBoxLayout(top_frame)
 
         lbl_dev = QLabel("🔊 输出:")
@@ -572,18 +1245,14 @@ class MainWindow(QMainWindow):
         self.combo_devices.setMinimumWidth(300)
         self.combo_devices.setMinimumHeight(45)
         self.combo_devices.setFont(QFont("Segoe UI", 12))
-        self.combo_devices.setStyleSheet("""
-            QComboBox { background-color: #2D3748; color: #E2E8F0; border: 1px solid #4A5568; border-radius: 8px; padding: 8px 12px; }
-            QComboBox QAbstractItemView { background-color: #2D3748; color: #E2E8F0; selection-background-color: #4299E1; border: 1px solid #4A5568; }
-            QComboBox::drop-down { border: none; width: 30px; }
-            QComboBox::down-arrow { image: none; border-left: 5px solid transparent; border-right: 5px solid transparent; border-top: 5px solid #E2E8F0; }
-        """)
         self.refresh_devices()
         self.combo_devices.currentIndexChanged.connect(self.change_device_global)
+        self.combo_devices.activated.connect(
+            lambda _: self.record("device", None, self.combo_devices.currentText())
+        )
 
         lbl_fade = QLabel("渐隐(秒):")
         lbl_fade.setFont(QFont("Segoe UI", 14))
-        lbl_fade.setStyleSheet("color: #FFFFFF; margin-left: 10px;")
 
         self.fade_spin = QDoubleSpinBox()
         self.fade_spin.setRange(0.1, 10.0)
@@ -592,64 +1261,63 @@ class MainWindow(QMainWindow):
         self.fade_spin.setMinimumHeight(45)
         self.fade_spin.setMinimumWidth(80)
         self.fade_spin.setFont(QFont("Consolas", 13))
-        self.fade_spin.setStyleSheet("""
-            QDoubleSpinBox { 
-                background-color: #2D3748; 
-                color: #E2E8F0; 
-                border: 1px solid #4A5568; 
-                border-radius: 8px; 
-                padding: 8px 12px;
-            }
-            QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {
-                background-color: #4A5568;
-                border: none;
-                width: 20px;
-            }
-            QDoubleSpinBox::up-button:hover, QDoubleSpinBox::down-button:hover {
-                background-color: #718096;
-            }
-        """)
+        self.fade_spin.setObjectName("FadeSpin")
+
+        lbl_duck = QLabel("闪避(dB):")
+        lbl_duck.setFont(QFont("Segoe UI", 14))
+
+        # 🎙 轨道在响时 🎵 轨道压低多少
+        self.duck_spin = QDoubleSpinBox()
+        self.duck_spin.setRange(0.0, 40.0)
+        self.duck_spin.setValue(ducking.DEFAULT_DEPTH_DB)
+        self.duck_spin.setSingleStep(3.0)
+        self.duck_spin.setMinimumHeight(45)
+        self.duck_spin.setMinimumWidth(80)
+        self.duck_spin.setFont(QFont("Consolas", 13))
+        self.duck_spin.setObjectName("DuckSpin")
+        self.duck_spin.valueChanged.connect(self.set_duck_depth)
 
         top_layout.addWidget(lbl_dev)
         top_layout.addWidget(self.combo_devices)
         top_layout.addWidget(lbl_fade)
         top_layout.addWidget(self.fade_spin)
-
-        btn_qss = """
-            QPushButton { 
-                font-size: 14px; 
-                font-weight: 600; 
-                color: white; 
-                border-radius: 10px; 
-                padding: 12px 24px; 
-                border: 2px solid transparent;
-                min-height: 16px;
-            }
-            QPushButton:hover { 
-                border: 2px solid rgba(255, 255, 255, 0.3);
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                stop:0 rgba(255, 255, 255, 0.1), stop:1 rgba(255, 255, 255, 0.05));
-            }
-            QPushButton:pressed {
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                stop:0 rgba(0, 0, 0, 0.2), stop:1 rgba(0, 0, 0, 0.1));
-            }
-        """
+        top_layout.addWidget(lbl_duck)
+        top_layout.addWidget(self.duck_spin)
+
+        # 总线电平表（所有轨共享一个刷新定时器）
+        self.master_meter = LevelMeter()
+        self.master_meter.setFixedSize(160, 14)
+        self.master_meter.setVisible(HAS_METERS)
+        self.meter_hub = MeterHub(self.master_meter, parent=self)
+        self.meter_stats_timer = QTimer(self)
+        self.meter_stats_timer.setInterval(2000)
+        self.meter_stats_timer.timeout.connect(self.update_meter_stats)
+        if HAS_METERS:
+            self.meter_stats_timer.start()
+        top_layout.addSpacing(16)
+        top_layout.addWidget(self.master_meter)
 
         btn_add = QPushButton("➕ 加歌")
         btn_add.setMinimumHeight(45)
-        btn_add.setStyleSheet(btn_qss + "background-color: #48BB78;")
+        action_button(btn_add, "green")
         btn_add.clicked.connect(self.add_files)
 
         btn_fade_all = QPushButton("📉 全部渐隐")
         btn_fade_all.setMinimumHeight(45)
-        btn_fade_all.setStyleSheet(btn_qss + "background-color: #ED8936;")
+        action_button(btn_fade_all, "orange")
         btn_fade_all.clicked.connect(self.fade_stop_all)
+        btn_fade_all.clicked.connect(lambda: self.record("fade_all"))
 
         btn_kill_all = QPushButton("🛑 急停")
         btn_kill_all.setMinimumHeight(45)
-        btn_kill_all.setStyleSheet(btn_qss + "background-color: #F56565;")
+        action_button(btn_kill_all, "red")
         btn_kill_all.clicked.connect(self.kill_all)
+        btn_kill_all.clicked.connect(lambda: self.record("kill_all"))
+
+        btn_theme = QPushButton("🌓 主题")
+        btn_theme.setMinimumHeight(45)
+        action_button(btn_theme, "gray")
+        btn_theme.clicked.connect(self.toggle_theme)
 
         top_layout.addStretch()
         top_layout.addWidget(btn_add)
@@ -657,57 +1325,138 @@ class MainWindow(QMainWindow):
         top_layout.addWidget(btn_fade_all)
         top_layout.addSpacing(16)
         top_layout.addWidget(btn_kill_all)
+        top_layout.addSpacing(16)
+        top_layout.addWidget(btn_theme)
 
         main_layout.addWidget(top_frame)
 
+        # --- Scene Bar ---
+        self.scenes = {}
+        self.current_scene = DEFAULT_SCENE
+        self.preloader = ScenePreloader(self._create_track, self)
+        self.cues = CueScheduler(lambda: self.tracks, self)
+
+        scene_frame = QFrame()
+        scene_frame.setObjectName("SceneBar")
+        scene_layout = QHBoxLayout(scene_frame)
+
+        self.lbl_scene = QLabel()
+        self.lbl_scene.setFont(QFont("Segoe UI", 13))
+
+        lbl_next = QLabel("下一场景:")
+        lbl_next.setFont(QFont("Segoe UI", 13))
+
+        self.combo_scenes = QComboBox()
+        self.combo_scenes.setMinimumWidth(200)
+        self.combo_scenes.setFont(QFont("Segoe UI", 12))
+        self.combo_scenes.currentIndexChanged.connect(self.preload_selected_scene)
+
+        btn_switch = QPushButton("⏭ 切换场景")
+        action_button(btn_switch, "blue")
+        btn_switch.clicked.connect(self.switch_scene)
+
+        btn_save_scene = QPushButton("💾 另存场景")
+        action_button(btn_save_scene, "gray")
+        btn_save_scene.clicked.connect(self.save_scene_as)
+
+        btn_del_scene = QPushButton("🗑 删除场景")
+        action_button(btn_del_scene, "gray")
+        btn_del_scene.clicked.connect(self.delete_scene)
+
+        btn_preflight = QPushButton("🩺 预检")
+        action_button(btn_preflight, "gray")
+        btn_preflight.setToolTip("完整解码整场所有场景的曲目，检查损坏、截断和增益削波")
+        btn_preflight.clicked.connect(self.run_preflight)
+        self.preflight_thread = None
+        self.preflight_dialog = None
+
+        scene_layout.addWidget(self.lbl_scene)
+        scene_layout.addSpacing(24)
+        scene_layout.addWidget(lbl_next)
+        scene_layout.addWidget(self.combo_scenes)
+        scene_layout.addWidget(btn_switch)
+        scene_layout.addStretch()
+        self.lbl_sync = QLabel()
+        self.lbl_sync.setFont(QFont("Segoe UI", 12))
+        scene_layout.addWidget(self.lbl_sync)
+        scene_layout.addSpacing(16)
+        self.lbl_staging = QLabel()
+        self.lbl_staging.setFont(QFont("Segoe UI", 12))
+        scene_layout.addWidget(self.lbl_staging)
+        scene_layout.addSpacing(16)
+        scene_layout.addWidget(btn_preflight)
+        scene_layout.addSpacing(16)
+        scene_layout.addWidget(btn_save_scene)
+        scene_layout.addSpacing(16)
+        scene_layout.addWidget(btn_del_scene)
+
+        main_layout.addWidget(scene_frame)
+
+        # --- SFX Bar ---
+        self.sfx = sfx.SfxPanel(self)
+        self.sfx.set_device(self.current_device())
+        main_layout.addWidget(self.sfx)
+
         if not HAS_PYDUB:
             msg = QLabel("⚠️ 未检测到 FFmpeg 工具包！自动记忆的200%状态将无法恢复。")
-            msg.setStyleSheet(
-                "color: #FC8181; font-size: 16px; font-weight: 600; padding: 10px; background-color: #2D3748; border-radius: 8px;"
-            )
+            msg.setObjectName("WarningBanner")
             main_layout.addWidget(msg)
 
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
-        scroll.setStyleSheet("""
-            QScrollArea { 
-                border: none; 
-                background: #1A202C;
-                border-radius: 12px;
-            }
-            QScrollBar:vertical {
-                background: #2D3748;
-                width: 14px;
-                border-radius: 7px;
-                margin: 16px 2px 16px 2px;
-            }
-            QScrollBar::handle:vertical {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 #4A5568, stop:1 #718096);
-                border-radius: 7px;
-                min-height: 30px;
-                border: none;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 #718096, stop:1 #A0AEC0);
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        scroll.setObjectName("TrackScroll")
         self.scroll_content = QWidget()
-        self.scroll_content.setStyleSheet("background-color: #1A202C;")
+        self.scroll_content.setObjectName("TrackList")
         self.scroll_layout = QVBoxLayout(self.scroll_content)
         self.scroll_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.scroll_layout.setSpacing(20)
         scroll.setWidget(self.scroll_content)
         main_layout.addWidget(scroll)
 
+        self.staging = StagingManager(self)
+        self.staging.status.connect(self.on_staging_status)
+        self.staging.progress.connect(self.on_staging_progress)
+        self.staging.overall.connect(self.on_staging_overall)
+        self.staging.ready.connect(self.on_staged)
+
+        self.sync = sync.SyncController(self, lambda: self.tracks, self)
+        self.sync.status.connect(self.lbl_sync.setText)
+
+        self.transcoder = transcode.TranscodeManager(self)
+        self.transcoder.status.connect(self.on_transcode_status)
+        self.transcoder.progress.connect(self.on_transcode_progress)
+        self.transcoder.ready.connect(self.on_transcoded)
+
+        self.restorer = SessionRestorer(self._build_restored_track, LAUNCH_TIME, self)
+        self.restorer.first_screen_ready.connect(self.on_restore_first_screen)
+        self.restorer.finished.connect(self.on_restore_finished)
+
+        # 占位轨道定期在后台重新检查，U 盘插回来就自动恢复
+        self.missing_timer = QTimer(self)
+        self.missing_timer.setInterval(5000)
+        self.missing_timer.timeout.connect(self.check_missing_tracks)
+        self.missing_timer.start()
+
         self.load_settings()
+        self.refresh_scene_list()
+        self.sync.start()
+        if self.sync.leader is not None:
+            AudioTrackWidget.sync_hook = self.sync.intercept
+        self.start_recording()
+
+        self.watchdog = PlaybackWatchdog(
+            lambda: self.tracks, self.watchdog_window, parent=self
+        )
+        self.watchdog.stall_detected.connect(self.on_watchdog_event)
+        self.watchdog.recovered.connect(self.on_watchdog_event)
+
+        # Ctrl+Shift+T 导出最近的播放事件（Chrome trace 格式）
+        QShortcut(QKeySequence("Ctrl+Shift+T"), self, activated=self.export_trace)
+
+        # F12 / Ctrl+Shift+H 开关性能浮窗
+        for key in ("F12", "Ctrl+Shift+H"):
+            QShortcut(QKeySequence(key), self, activated=self.hud.toggle)
+        self.hud.set_active(self.show_hud)
 
     def refresh_devices(self):
         self.output_devices = QMediaDevices.audioOutputs()
@@ -725,8 +1474,26 @@ class MainWindow(QMainWindow):
         idx = self.combo_devices.currentIndex()
         if idx >= 0:
             dev = self.output_devices[idx]
+            with TRACER.span("device_switch", "device", device=dev.description()):
+                for t in self.tracks:
+                    t.set_output_device(dev)
+                self.sfx.set_device(dev)
+            # 新设备的首选采样率可能不同，转码缓存按新格式再对一遍
             for t in self.tracks:
-                t.set_output_device(dev)
+                self.request_transcode(t)
+
+    def current_device(self):
+        return (
+            self.output_devices[self.combo_devices.currentIndex()]
+            if self.output_devices
+            else QMediaDevices.defaultAudioOutput()
+        )
+
+    def device_by_name(self, name):
+        for d in self.output_devices:
+            if d.description() == name:
+                return d
+        return self.current_device()
 
     def add_files(self):
         fps, _ = QFileDialog.getOpenFileNames(
@@ -735,36 +1502,681 @@ class MainWindow(QMainWindow):
         self._add_files_internal(fps)
 
     def _add_files_internal(self, file_paths):
-        dev = (
-            self.output_devices[self.combo_devices.currentIndex()]
-            if self.output_devices
-            else QMediaDevices.defaultAudioOutput()
-        )
+        dev = self.current_device()
         new_widgets = []
         for fp in file_paths:
-            if any(t.original_path == fp for t in self.tracks):
+            if any(t.original_path == fp for t in self.tracks) or fp in self.missing:
                 continue
             if not os.path.exists(fp):
                 continue
 
-            w = AudioTrackWidget(fp, dev)
-            self.scroll_layout.addWidget(w)
-            self.tracks.append(w)
+            w = AudioTrackWidget(fp, dev, self.engine)
+            self._register_track(w)
             new_widgets.append(w)
         return new_widgets
 
+    def _create_track(self, path, device_name, source_path=None):
+        return AudioTrackWidget(
+            path, self.device_by_name(device_name), self.engine, source_path
+        )
+
+    def _register_track(self, w, index=-1):
+        self.scroll_layout.insertWidget(index, w)
+        self.tracks.append(w)
+        self._sync_track_order()
+        w.cue_requested.connect(self.edit_cue)
+        self.cues.attach(w)
+        w.duck_changed.connect(self.ducking.refresh)
+        self.ducking.refresh()
+        self._hook_recorder(w)
+        if w.staged_path is None and self.staging.wants(w.original_path):
+            # 要暂存的曲目等本地副本好了再转码，不和暂存抢着读 U 盘
+            self.staging.request(w.original_path)
+        else:
+            self.request_transcode(w)
+        if w.level_tap is not None:
+            self.meter_hub.add(
+                w, w.level_tap.acc, w.meter, lambda w=w: w.audio_output.volume()
+            )
+
+    def _hook_recorder(self, w):
+        w.btn_play.clicked.connect(lambda _=None, w=w: self.record("play", w))
+        w.btn_fade_stop.clicked.connect(lambda _=None, w=w: self.record("fade", w))
+        w.btn_boost.clicked.connect(
+            lambda _=None, w=w: self.record("boost", w, w.btn_boost.isChecked())
+        )
+        # actionTriggered 只在用户拖动/键盘/滚轮时发出，恢复设置时不会
+        w.vol_slider.actionTriggered.connect(
+            lambda _, w=w: self.record("volume", w, w.vol_slider.sliderPosition())
+        )
+        # 等调用方 apply_settings 之后再登记，记下的是恢复后的设置
+        QTimer.singleShot(0, lambda w=w: self.recorder and self.recorder.track(w))
+
+    def record(self, action, w=None, value=None):
+        if self.recorder is not None:
+            self.recorder.record(action, w, value)
+
+    def start_recording(self):
+        if not self.record_sessions:
+            return
+        try:
+            self.recorder = SessionRecorder(
+                {
+                    "fade_duration": self.fade_spin.value(),
+                    "device": self.combo_devices.currentText(),
+                }
+            )
+        except OSError as e:
+            print(f"无法创建操作记录: {e}")
+            return
+        for w in self.tracks:
+            self.recorder.track(w)
+
+    def retire_track(self, w):
+        # 正在播放的先渐隐，渐隐结束后再释放播放器
+        delay = 0
+        if w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            w.fade_out_stop()
+            delay = int(self.fade_spin.value() * 1000) + 200
+        self._unregister_track(w)
+        w.hide()
+        w.setParent(None)
+
+        def dispose():
+            w.cleanup()
+            w.deleteLater()
+
+        QTimer.singleShot(delay, dispose)
+
+    def _unregister_track(self, w):
+        self.cues.detach(w)
+        self.tracks.remove(w)
+        self.ducking.forget(w)
+        self.ducking.refresh()
+        self.meter_hub.remove(w)
+        self.scroll_layout.removeWidget(w)
+
+    def on_engine_lost(self):
+        # 独立引擎意外退出，声音已经停了：轨道全部换回进程内播放器，设置保留
+        client, self.engine = self.engine, None
+        self.preloader.discard()
+        playing = []
+        for w in list(self.tracks):
+            index = self.scroll_layout.indexOf(w)
+            data = w.settings()
+            if w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+                playing.append(w.trace_name)
+            self._unregister_track(w)
+            w.cleanup()
+            w.deleteLater()
+            new = self._create_track(
+                w.original_path, self.combo_devices.currentText(), w.staged_path
+            )
+            self._register_track(new, index)
+            new.apply_settings(data)
+        client.shutdown()
+        text = "独立音频引擎意外退出，已切换到进程内播放，所有轨道的设置都已保留。"
+        if playing:
+            text += "\n\n刚才在播的需要重新开始：\n" + "\n".join(playing)
+        QMessageBox.warning(self, "音频引擎", text)
+
+    def _track_widgets(self):
+        # 界面上的顺序，包括缺文件的占位
+        items = (
+            self.scroll_layout.itemAt(i) for i in range(self.scroll_layout.count())
+        )
+        return [
+            item.widget()
+            for item in items
+            if isinstance(item.widget(), (AudioTrackWidget, MissingTrackWidget))
+        ]
+
+    def _sync_track_order(self):
+        order = {w: i for i, w in enumerate(self._track_widgets())}
+        self.tracks.sort(key=lambda w: order.get(w, len(order)))
+
+    # --- 会话恢复 ---
+    def _build_restored_track(self, data, exists):
+        path = data["path"]
+        if any(t.original_path == path for t in self.tracks) or path in self.missing:
+            return
+        staged = None if exists else self.staging.lookup(path)
+        if not exists and staged is None:
+            self._add_missing(data)
+            return
+        w = self._create_track(path, self.combo_devices.currentText(), staged)
+        self._register_track(w)
+        w.apply_settings(data)
+
+    def on_restore_first_screen(self, ms):
+        print(f"会话恢复: 首屏可操作 {ms:.0f} ms")
+
+    def on_restore_finished(self, ms, built, missing):
+        if self.restorer.cancelled:
+            print(f"会话恢复: 切换场景中断，已建 {built} 轨用时 {ms:.0f} ms")
+        else:
+            print(f"会话恢复: 全部 {built} 轨用时 {ms:.0f} ms，缺失 {missing} 轨")
+        self.preload_selected_scene()
+        # 恢复被切换场景打断时这里是在 apply_scene 中途调用的：
+        # 询问和开始写日志都等场景切完再做，日志第一份快照不会拍到一半的轨道列表
+        if self.crash_entry is not None:
+            QTimer.singleShot(0, self.offer_crash_restore)
+        else:
+            QTimer.singleShot(0, self.journal.start)
+
+    # --- 崩溃恢复 ---
+    def journal_snapshot(self):
+        tracks = []
+        temp_files = []
+        for w in self._track_widgets():
+            t = {"settings": w.settings(), "playing": False, "position_ms": 0}
+            if isinstance(w, AudioTrackWidget):
+                state = w.player.playbackState()
+                t["playing"] = state == QMediaPlayer.PlaybackState.PlayingState
+                if state != QMediaPlayer.PlaybackState.StoppedState:
+                    t["position_ms"] = w.current_position()
+                if w.is_boosted:
+                    temp_files.append(w.current_source)
+            tracks.append(t)
+        return {
+            "scene": self.current_scene,
+            "device_name": self.combo_devices.currentText(),
+            "tracks": tracks,
+            "temp_files": temp_files,
+        }
+
+    def offer_crash_restore(self):
+        entry, self.crash_entry = self.crash_entry, None
+        tracks = entry.get("tracks", [])
+        playing = sum(t["playing"] for t in tracks)
+        when = time.strftime("%H:%M:%S", time.localtime(entry.get("time", 0)))
+        box = QMessageBox(self)
+        box.setWindowTitle("崩溃恢复")
+        box.setText(
+            f"程序上次没有正常退出（最后记录于 {when}）。\n"
+            f"要恢复当时的 {len(tracks)} 轨和播放位置吗？"
+            + (f"其中 {playing} 轨当时正在播放。" if playing else "")
+        )
+        btn_resume = None
+        if playing:
+            btn_resume = box.addButton(
+                "恢复并继续播放", QMessageBox.ButtonRole.AcceptRole
+            )
+        btn_restore = box.addButton("只恢复位置", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton("不恢复", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked in (btn_resume, btn_restore):
+            self.restore_crash(entry, resume=clicked is btn_resume)
+        self.journal.start()
+
+    def restore_crash(self, entry, resume):
+        name = entry.get("scene", self.current_scene)
+        self.scenes[name] = journal.scene_of(entry)
+        self.apply_scene(name, self.scenes[name])
+        # 同一路径的轨道按顺序一一对应
+        widgets = {}
+        for w in self.tracks:
+            widgets.setdefault(w.original_path, []).append(w)
+        pairs = []
+        for t in entry.get("tracks", []):
+            candidates = widgets.get(t["settings"]["path"])
+            if candidates and (t["playing"] or t["position_ms"] > 0):
+                pairs.append((candidates.pop(0), t))
+            elif candidates:
+                candidates.pop(0)
+        self.resumer = journal.Resumer(pairs, resume, self)
+        self.resumer.finished.connect(self.on_crash_resumed)
+        self.resumer.start()
+
+    def on_crash_resumed(self, ms, done, timed_out):
+        print(f"崩溃恢复: {done} 轨用时 {ms:.0f} ms 回到原位置，{timed_out} 轨超时")
+        self.resumer = None
+
+    def _add_missing(self, data, index=-1):
+        w = MissingTrackWidget(data)
+        w.retry_requested.connect(
+            lambda w: self.check_missing_tracks([w.original_path])
+        )
+        w.relink_requested.connect(lambda _: self.relink_missing())
+        w.remove_requested.connect(self.remove_missing)
+        self.missing[w.original_path] = w
+        self.scroll_layout.insertWidget(index, w)
+        return w
+
+    def remove_missing(self, w):
+        self.missing.pop(w.original_path, None)
+        self.scroll_layout.removeWidget(w)
+        w.deleteLater()
+
+    def check_missing_tracks(self, paths=None):
+        if self.missing_checker is not None and self.missing_checker.isRunning():
+            return
+        paths = list(self.missing) if paths is None else paths
+        if not paths:
+            return
+        self.missing_checker = PathCheckThread(paths)
+        self.missing_checker.checked.connect(self.on_missing_checked)
+        self.missing_checker.start()
+
+    def on_missing_checked(self, path, exists):
+        placeholder = self.missing.get(path)
+        if not exists or placeholder is None:
+            return
+        index = self.scroll_layout.indexOf(placeholder)
+        data = placeholder.settings()
+        self.remove_missing(placeholder)
+        w = self._create_track(path, self.combo_devices.currentText())
+        self._register_track(w, index)
+        w.apply_settings(data)
+        print(f"文件已恢复: {path}")
+
+    # --- 重新定位 ---
+    def relink_missing(self, ask=False):
+        if self.relink_thread is not None and self.relink_thread.isRunning():
+            return
+        roots = [r for r in self.relink_roots if os.path.isdir(r)]
+        if ask or not roots:
+            root = QFileDialog.getExistingDirectory(self, "选择音乐所在的文件夹")
+            if not root:
+                return
+            if root not in self.relink_roots:
+                self.relink_roots.append(root)
+            roots = [r for r in self.relink_roots if os.path.isdir(r)]
+        taken = [t.original_path for t in self.tracks]
+        tracks = [w.settings() for w in self.missing.values()]
+        self.relink_thread = relink.RelinkThread(tracks, roots, taken)
+        self.relink_thread.progress.connect(self.on_relink_progress)
+        self.relink_thread.finished.connect(self.on_relink_finished)
+        self.lbl_staging.setText("🔍 正在建立索引…")
+        self.relink_thread.start()
+
+    def on_relink_progress(self, files, dirs):
+        self.lbl_staging.setText(f"🔍 已索引 {files} 个音频文件（{dirs} 个文件夹）")
+
+    def on_relink_finished(self, results, stats):
+        found = ambiguous = mismatched = 0
+        for old, new, how in results:
+            placeholder = self.missing.get(old)
+            if placeholder is None:
+                continue
+            if new is None:
+                ambiguous += how == relink.HOW_AMBIGUOUS
+                mismatched += how == relink.HOW_MISMATCH
+                continue
+            index = self.scroll_layout.indexOf(placeholder)
+            data = dict(placeholder.settings(), path=new)
+            self.remove_missing(placeholder)
+            self._rename_path(old, new)
+            w = self._create_track(new, self.combo_devices.currentText())
+            self._register_track(w, index)
+            w.apply_settings(data)
+            found += 1
+            print(f"重新定位: {old} -> {new}（{how}）")
+        print(
+            f"重新定位: 索引 {stats['files']} 个文件用时 {stats['scan_ms']:.0f} ms，"
+            f"匹配 {stats['resolve_ms']:.0f} ms（读指纹 {stats['hash_reads']} 次）"
+        )
+        TRACER.instant("relink", "settings", found=found, **stats)
+        left = len(self.missing)
+        self.lbl_staging.setText(f"🔍 重新定位: 找回 {found} 轨")
+        text = f"找回 {found} 轨，还有 {left} 轨没找到。"
+        if ambiguous:
+            text += f"\n其中 {ambiguous} 轨有多个同名文件分不清，请手动重新添加。"
+        if mismatched:
+            text += (
+                f"\n其中 {mismatched} 轨找到了同名文件但内容和原来的不一样，"
+                "没有自动替换，请确认后手动重新添加。"
+            )
+        if not left:
+            QMessageBox.information(self, "重新定位", text)
+            return
+        box = QMessageBox(QMessageBox.Icon.Information, "重新定位", text, parent=self)
+        btn_more = box.addButton("添加文件夹再找…", QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() is btn_more:
+            self.relink_missing(ask=True)
+
+    def _rename_path(self, old, new):
+        # 场景里的曲目和提示点的来源轨道都按路径引用
+        for scene in self.scenes.values():
+            for t in scene["tracks"]:
+                if t["path"] == old:
+                    t["path"] = new
+                if t.get("cue") and t["cue"].get("source") == old:
+                    t["cue"] = dict(t["cue"], source=new)
+        for w in self.tracks:
+            if w.cue is not None and w.cue["source"] == old:
+                w.set_cue(dict(w.cue, source=new))
+        for w in self.missing.values():
+            cue = w.data.get("cue")
+            if cue and cue.get("source") == old:
+                w.data["cue"] = dict(cue, source=new)
+
+    # --- 本地暂存 ---
+    def _tracks_for(self, path):
+        return [w for w in self.tracks if w.original_path == path]
+
+    def on_staging_status(self, path, state, detail):
+        text, tone = {
+            "queued": ("📥 等待缓存", ""),
+            "copying": ("📥 缓存中", "info"),
+            "verifying": ("🔍 校验中", "info"),
+            "ready": ("💾 已缓存到本机", "ok"),
+            "failed": (f"⚠ 缓存失败: {detail}", "error"),
+            "skipped": (f"缓存跳过: {detail}", ""),
+        }[state]
+        for w in self._tracks_for(path):
+            w.show_staging(text, tone)
+
+    def on_staging_progress(self, path, fraction, rate, eta):
+        text = (
+            f"📥 {fraction * 100:.0f}% · {rate / 1e6:.1f} MB/s · 剩余 {format_eta(eta)}"
+        )
+        for w in self._tracks_for(path):
+            w.show_staging(text, "info")
+
+    def on_staging_overall(self, done, total, rate, eta):
+        if done >= total:
+            self.lbl_staging.setText(f"💾 本机缓存 {done}/{total} 完成")
+            return
+        self.lbl_staging.setText(
+            f"📥 本机缓存 {done}/{total} · {rate / 1e6:.1f} MB/s · 剩余 {format_eta(eta)}"
+        )
+
+    def on_staged(self, path, staged):
+        for w in self._tracks_for(path):
+            w.use_staged(staged)
+        if self.transcoder.enabled:
+            self.transcoder.request(path, staged, self.current_device())
+
+    # --- 转码缓存 ---
+    def request_transcode(self, w):
+        self.transcoder.request(
+            w.original_path, w.staged_path or w.original_path, self.current_device()
+        )
+
+    def on_transcode_status(self, path, state, detail):
+        text, tone = {
+            "queued": ("🎛 等待转码", ""),
+            "transcoding": ("🎛 转码中", "info"),
+            "ready": ("🎛 已转为 PCM", "ok"),
+            "failed": (f"⚠ 转码失败: {detail}", "error"),
+            "skipped": (f"转码跳过: {detail}", ""),
+        }[state]
+        for w in self._tracks_for(path):
+            w.show_staging(text, tone)
+
+    def on_transcode_progress(self, path, fraction, speed):
+        for w in self._tracks_for(path):
+            w.show_staging(f"🎛 转码 {fraction * 100:.0f}% · {speed:.0f}x", "info")
+
+    def on_transcoded(self, path, pcm_path):
+        for w in self._tracks_for(path):
+            w.use_pcm(pcm_path)
+
+    # --- 场景 ---
+    def snapshot_scene(self):
+        tracks = [w.settings() for w in self._track_widgets()]
+        return {
+            "device_name": self.combo_devices.currentText(),
+            "tracks": tracks + self.restorer.pending_settings(),
+        }
+
+    def refresh_scene_list(self):
+        self.scenes.setdefault(self.current_scene, self.snapshot_scene())
+        self.lbl_scene.setText(f"🎬 当前场景: {self.current_scene}")
+        self.combo_scenes.blockSignals(True)
+        self.combo_scenes.clear()
+        for name in self.scenes:
+            if name != self.current_scene:
+                self.combo_scenes.addItem(name)
+        self.combo_scenes.blockSignals(False)
+        self.preload_selected_scene()
+
+    def preload_selected_scene(self):
+        name = self.combo_scenes.currentText()
+        if not name:
+            self.preloader.discard()
+            return
+        if self.restorer.is_running():
+            # 恢复完成后会再调一次
+            return
+        existing = {t.original_path for t in self.tracks}
+        self.preloader.preload(name, self.scenes[name], existing)
+
+    def switch_scene(self):
+        name = self.combo_scenes.currentText()
+        if not name or name == self.current_scene:
+            return
+        self.scenes[self.current_scene] = self.snapshot_scene()
+        self.apply_scene(name, self.scenes[name])
+
+    def apply_scene(self, name, scene):
+        t0 = time.perf_counter()
+        trace_start = TRACER.now()
+        self.restorer.cancel()
+
+        wanted_paths = {t["path"] for t in scene["tracks"]}
+        for w in list(self.tracks):
+            if w.original_path not in wanted_paths:
+                self.retire_track(w)
+        for path, w in list(self.missing.items()):
+            if path not in wanted_paths:
+                self.remove_missing(w)
+
+        dev_name = scene["device_name"]
+        if dev_name and dev_name != self.combo_devices.currentText():
+            idx = self.combo_devices.findText(dev_name)
+            if idx >= 0:
+                self.combo_devices.setCurrentIndex(idx)
+
+        # 两个场景共有的轨道保留原播放器，只更新音量/循环/增益
+        existing = {w.original_path: w for w in self.tracks}
+        ordered = []
+        for t in scene["tracks"]:
+            w = existing.get(t["path"]) or self.missing.get(t["path"])
+            if w is None:
+                w = self.preloader.take(t["path"])
+                if w is None:
+                    if not os.path.exists(t["path"]):
+                        ordered.append(self._add_missing(t))
+                        continue
+                    w = self._create_track(t["path"], dev_name)
+                self._register_track(w)
+                w.set_output_device(self.current_device())
+            w.apply_settings(t)
+            ordered.append(w)
+
+        for w in ordered:
+            self.scroll_layout.removeWidget(w)
+            self.scroll_layout.addWidget(w)
+        self._sync_track_order()
+
+        self.preloader.discard()
+        self.current_scene = name
+        self.refresh_scene_list()
+        TRACER.complete("scene_switch", trace_start, "scene", scene=name)
+        print(f"切换场景 {name}: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    def save_scene_as(self):
+        name, ok = QInputDialog.getText(self, "另存场景", "场景名称:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        self.scenes[self.current_scene] = self.snapshot_scene()
+        self.scenes[name] = self.snapshot_scene()
+        self.current_scene = name
+        self.refresh_scene_list()
+
+    def delete_scene(self):
+        name = self.combo_scenes.currentText()
+        if not name:
+            return
+        if (
+            QMessageBox.question(self, "删除场景", f"确定删除场景「{name}」？")
+            != QMessageBox.StandardButton.Yes
+        ):
+            return
+        del self.scenes[name]
+        self.refresh_scene_list()
+
+    def on_watchdog_event(self, track, *args):
+        health = self.watchdog.health.get(track)
+        if health is not None:
+            track.show_health(health.summary())
+
+    def export_trace(self):
+        default = time.strftime("easyplayer_trace_%Y%m%d_%H%M%S.json")
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出事件追踪", default, "Chrome Trace (*.json)"
+        )
+        if not path:
+            return
+        try:
+            n = TRACER.dump_chrome(path)
+            print(
+                f"已导出 {n} 条事件到 {path}，可在 chrome://tracing 或 ui.perfetto.dev 打开"
+            )
+        except Exception as e:
+            print(f"导出事件追踪失败: {e}")
+
+    def update_meter_stats(self):
+        pct = self.meter_hub.overhead_percent()
+        self.master_meter.setToolTip(
+            f"总线电平 · {len(self.meter_hub.sources)} 轨计量 CPU 占用 {pct:.2f}%"
+        )
+
+    def set_theme(self, name):
+        self.theme = name if name in (DARK, LIGHT) else DARK
+        apply_theme(QApplication.instance(), self.theme)
+        self.hud.theme = self.theme
+
+    # --- 提示点 ---
+    def edit_cue(self, w):
+        sources = [
+            (os.path.basename(t.original_path), t.original_path)
+            for t in self.tracks
+            if t is not w
+        ]
+        dialog = CueDialog(w.cue, sources, self)
+        if dialog.exec():
+            w.set_cue(dialog.cue())
+
+    # --- 演出前预检 ---
+    def session_paths(self):
+        paths = [t["path"] for t in self.snapshot_scene()["tracks"]]
+        for scene in self.scenes.values():
+            paths += [t["path"] for t in scene.get("tracks", [])]
+        return list(dict.fromkeys(paths))
+
+    def run_preflight(self):
+        if self.preflight_thread is not None:
+            return
+        paths = self.session_paths()
+        if not paths:
+            QMessageBox.information(self, "预检", "当前没有任何曲目。")
+            return
+        dialog = QProgressDialog("正在完整解码所有曲目…", "取消", 0, len(paths), self)
+        dialog.setWindowTitle("演出前预检")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        self.preflight_dialog = dialog
+        self.preflight_thread = PreflightThread(paths)
+        self.preflight_thread.progress.connect(self.on_preflight_progress)
+        self.preflight_thread.finished.connect(self.on_preflight_finished)
+        dialog.canceled.connect(self.cancel_preflight)
+        self.preflight_thread.start()
+
+    def cancel_preflight(self):
+        if self.preflight_thread is not None:
+            self.preflight_thread.cancelled = True
+            self.preflight_dialog.setLabelText("正在停止…")
+
+    def on_preflight_progress(self, done, total, path):
+        if self.preflight_dialog is None:
+            return
+        self.preflight_dialog.setValue(done)
+        self.preflight_dialog.setLabelText(f"[{done}/{total}] {os.path.basename(path)}")
+
+    def on_preflight_finished(self, results, elapsed):
+        cancelled = self.preflight_thread.cancelled
+        self.preflight_thread.wait()
+        self.preflight_thread = None
+        self.preflight_dialog.close()
+        self.preflight_dialog = None
+        if results is None:
+            QMessageBox.warning(self, "演出前预检", "预检失败，详情见控制台输出。")
+            return
+
+        report = preflight.default_report_path()
+        try:
+            preflight.write_report(results, elapsed, report)
+        except OSError as e:
+            print(f"预检报告写入失败: {e}")
+            report = None
+
+        for r in results:
+            if r["severity"] not in ("warning", "error"):
+                continue
+            problems = [
+                i["message"]
+                for i in r["issues"]
+                if i["severity"] in ("warning", "error")
+            ]
+            for w in self._tracks_for(r["path"]):
+                w.show_health("🩺 " + "；".join(problems))
+
+        counts = preflight.summarize(results)
+        text = (
+            f"检查了 {len(results)} 个文件（{elapsed:.1f}s）\n"
+            f"错误 {counts['error']}，警告 {counts['warning']}，正常 {counts['ok'] + counts['info']}"
+        )
+        if cancelled:
+            text = "已取消，只检查了部分文件。\n" + text
+        if report:
+            text += f"\n\n报告: {os.path.abspath(report)}"
+        if counts["error"]:
+            QMessageBox.warning(self, "演出前预检", text)
+        else:
+            QMessageBox.information(self, "演出前预检", text)
+
+    def set_duck_depth(self, value):
+        self.ducking.depth_db = value
+        self.ducking.refresh()
+
+    def toggle_theme(self):
+        self.set_theme(LIGHT if self.theme == DARK else DARK)
+
     def fade_stop_all(self):
         for t in self.tracks:
             if t.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
                 t.fade_out_stop()
 
     def kill_all(self):
+        TRACER.instant("kill_all", "transport")
         for t in self.tracks:
             t.stop_instant()
+        self.sfx.stop_all()
+        self.sync.broadcast_now("kill")
+
+    def read_engine_mode(self):
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                mode = json.load(f).get("engine_mode", ENGINE_INPROCESS)
+        except (OSError, ValueError):
+            return ENGINE_INPROCESS
+        return mode if mode in (ENGINE_INPROCESS, ENGINE_PROCESS) else ENGINE_INPROCESS
 
     def load_settings(self):
         if not os.path.exists(CONFIG_FILE):
+            # 没有配置也走一遍恢复流程，崩溃恢复日志的询问挂在它结束之后
+            self.restorer.start([])
             return
+        trace_start = TRACER.now()
         try:
             with open(CONFIG_FILE, "r", encoding="utf-8") as f:
                 settings = json.load(f)
@@ -776,55 +2188,140 @@ class MainWindow(QMainWindow):
                     self.combo_devices.setCurrentIndex(idx)
 
             self.fade_spin.setValue(settings.get("fade_duration", 1.0))
+            self.set_theme(settings.get("theme", DARK))
+            self.show_hud = settings.get("show_hud", False)
+            self.record_sessions = settings.get("record_sessions", True)
+            self.ducking.configure(
+                settings.get("duck_depth_db", ducking.DEFAULT_DEPTH_DB),
+                settings.get("duck_attack_ms", ducking.DEFAULT_ATTACK_MS),
+                settings.get("duck_release_ms", ducking.DEFAULT_RELEASE_MS),
+                settings.get("duck_key", ducking.KEY_STATE),
+                settings.get("duck_threshold_db", ducking.DEFAULT_THRESHOLD_DB),
+            )
+            self.duck_spin.setValue(self.ducking.depth_db)
+            self.watchdog_window = settings.get("watchdog_window", DEFAULT_WINDOW_SEC)
+            if HAS_DSP:
+                AudioTrackWidget.boost_chain = dsp.normalize_chain(
+                    settings.get("boost_chain")
+                )
+            self.staging.configure(
+                settings.get("staging_mode", MODE_AUTO),
+                settings.get("staging_budget_mb", DEFAULT_BUDGET_MB),
+            )
+            self.relink_roots = list(settings.get("relink_roots", []))
+            self.sync.configure(
+                settings.get("sync_role", sync.ROLE_OFF),
+                settings.get("sync_leader", ""),
+                settings.get("sync_port", sync.PORT),
+                settings.get("sync_lead_ms", sync.LEAD_MS),
+            )
+            self.transcoder.configure(
+                settings.get("transcode_cache", False),
+                settings.get("transcode_budget_mb", transcode.DEFAULT_BUDGET_MB),
+            )
+            self.sfx.configure(
+                settings.get("sfx_pads", []),
+                settings.get("sfx_budget_mb", sfx.DEFAULT_BUDGET_MB),
+            )
 
-            saved_tracks = settings.get("tracks", [])
-            paths = [t["path"] for t in saved_tracks]
-            created_widgets = self._add_files_internal(paths)
-
-            widget_map = {w.original_path: w for w in created_widgets}
+            self.scenes = {
+                name: normalize_scene(data)
+                for name, data in settings.get("scenes", {}).items()
+            }
+            self.current_scene = settings.get("current_scene", DEFAULT_SCENE)
 
-            for t_data in saved_tracks:
-                path = t_data["path"]
-                if path in widget_map:
-                    w = widget_map[path]
-                    w.vol_slider.setValue(t_data.get("volume", 100))
-                    w.chk_loop.setChecked(t_data.get("loop", True))
-                    if t_data.get("boost", False) and HAS_PYDUB:
-                        w.btn_boost.setChecked(True)
-                        w.start_boost_process()
+            # 轨道在窗口显示之后分批创建，见 SessionRestorer
+            self.restorer.start(settings.get("tracks", []))
 
         except Exception as e:
             print(f"加载配置失败: {e}")
+            TRACER.instant("settings_load_error", "settings", error=str(e))
+            self.restorer.start([])
+        TRACER.complete(
+            "settings_load", trace_start, "settings", tracks=len(self.tracks)
+        )
 
     def save_settings(self):
+        trace_start = TRACER.now()
+        current = self.snapshot_scene()
+        self.scenes[self.current_scene] = current
         settings = {
-            "device_name": self.combo_devices.currentText(),
+            "device_name": current["device_name"],
             "fade_duration": self.fade_spin.value(),
-            "tracks": [],
+            "theme": self.theme,
+            "show_hud": self.hud.isVisible(),
+            "record_sessions": self.record_sessions,
+            **self.ducking.settings(),
+            "watchdog_window": self.watchdog_window,
+            "boost_chain": AudioTrackWidget.boost_chain,
+            "engine_mode": self.engine_mode,
+            "staging_mode": self.staging.mode,
+            "staging_budget_mb": self.staging.budget_mb,
+            "transcode_cache": self.transcoder.enabled,
+            **self.sync.settings(),
+            "relink_roots": self.relink_roots,
+            "transcode_budget_mb": self.transcoder.budget_mb,
+            **self.sfx.settings(),
+            "tracks": current["tracks"],
+            "current_scene": self.current_scene,
+            "scenes": self.scenes,
         }
-        for t in self.tracks:
-            settings["tracks"].append(
-                {
-                    "path": t.original_path,
-                    "volume": t.vol_slider.value(),
-                    "loop": t.chk_loop.isChecked(),
-                    "boost": t.btn_boost.isChecked(),
-                }
-            )
         try:
             with open(CONFIG_FILE, "w", encoding="utf-8") as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存配置失败: {e}")
+            TRACER.instant("settings_save_error", "settings", error=str(e))
+        TRACER.complete("settings_save", trace_start, "settings")
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.hud.reposition()
 
     def closeEvent(self, e):
         self.save_settings()
+        self.journal.close()
+        summary = self.journal.summary()
+        if summary:
+            print(summary)
+        self.hud.shutdown()
+        self.cues.shutdown()
+        self.sfx.shutdown()
+        summary = self.sfx.summary()
+        if summary:
+            print(summary)
+        self.sync.shutdown()
+        summary = self.sync.summary()
+        if summary:
+            print(summary)
+        if self.recorder is not None:
+            self.recorder.close()
+        summary = self.cues.summary()
+        if summary:
+            print(summary)
+        # 退出时打断的恢复不再触发恢复之后的事
+        self.restorer.finished.disconnect(self.on_restore_finished)
+        self.restorer.cancel()
+        self.staging.shutdown()
+        self.transcoder.shutdown()
+        if self.relink_thread is not None:
+            self.relink_thread.cancelled = True
+            self.relink_thread.wait(3000)
+        if self.preflight_thread is not None:
+            self.preflight_thread.cancelled = True
+            self.preflight_thread.wait(3000)
+        self.preloader.discard()
         for t in self.tracks:
             t.cleanup()
+        wait_parked(5000)
+        if self.engine is not None:
+            self.engine.shutdown()
         e.accept()
 
 
 if __name__ == "__main__":
+    # 打包后的 exe 里 spawn 出来的引擎进程也会从这里进入
+    multiprocessing.freeze_support()
     if hasattr(Qt.ApplicationAttribute, "AA_EnableHighDpiScaling"):
         QApplication.setAttribute(Qt.ApplicationAttribute.AA_EnableHighDpiScaling, True)
     if hasattr(Qt.ApplicationAttribute, "AA_UseHighDpiPixmaps"):
@@ -833,14 +2330,8 @@ if __name__ == "__main__":
 
     app = QApplication(sys.argv)
 
-    palette = QPalette()
-    palette.setColor(QPalette.ColorRole.Window, QColor(26, 32, 44))
-    palette.setColor(QPalette.ColorRole.WindowText, QColor(226, 232, 240))
-    palette.setColor(QPalette.ColorRole.Base, QColor(45, 55, 72))
-    palette.setColor(QPalette.ColorRole.Text, QColor(226, 232, 240))
-    palette.setColor(QPalette.ColorRole.Button, QColor(45, 55, 72))
-    palette.setColor(QPalette.ColorRole.ButtonText, QColor(226, 232, 240))
-    app.setPalette(palette)
+    # 全局样式表，配置里存的主题在 load_settings 里再切换
+    apply_theme(app, DARK)
 
     font = app.font()
     font.setPointSize(12)
@@ -0,0 +1,253 @@
+import math
+import time
+
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import QObject, QTimer, QRectF
+from PyQt6.QtGui import QPainter, QColor, QLinearGradient, QPalette
+
+# --- 电平表 ---
+# 每轨一个 PlayerLevelTap 从 QAudioBufferOutput 拿解码后的 PCM，
+# 用 NumPy 按块求峰值/平方和，只做累加；真正的抽取与重绘由一个共享的 MeterHub 定时器完成。
+
+HAS_NUMPY = False
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    pass
+
+HAS_BUFFER_OUTPUT = False
+try:
+    # QAudioBufferOutput 需要 Qt 6.8+
+    from PyQt6.QtMultimedia import QAudioBufferOutput, QAudioFormat
+
+    HAS_BUFFER_OUTPUT = True
+except ImportError:
+    pass
+
+HAS_METERS = HAS_NUMPY and HAS_BUFFER_OUTPUT
+
+METER_FLOOR_DB = -60.0
+PEAK_HOLD_SEC = 1.0
+PEAK_FALL_DB_PER_SEC = 20.0
+
+
+def block_levels(samples, channels):
+    # samples: 交错排列的一维数组（已归一化到 [-1, 1]）
+    frames = samples.reshape(-1, channels)
+    if frames.shape[0] == 0:
+        return 0.0, 0.0, 0
+    peak = float(np.abs(frames).max())
+    sumsq = float(np.einsum("ij,ij->", frames, frames)) / channels
+    return peak, sumsq, frames.shape[0]
+
+
+def to_db(value):
+    if value <= 0:
+        return METER_FLOOR_DB
+    return max(METER_FLOOR_DB, 20.0 * math.log10(value))
+
+
+class LevelAccumulator:
+    # 两次 take() 之间的峰值与平方和；feed 在收到缓冲时调用，take 在共享定时器里调用
+    def __init__(self):
+        self.peak = 0.0
+        self.sumsq = 0.0
+        self.frames = 0
+        self.busy_sec = 0.0
+
+    def feed(self, samples, channels):
+        t0 = time.perf_counter()
+        peak, sumsq, frames = block_levels(samples, channels)
+        if peak > self.peak:
+            self.peak = peak
+        self.sumsq += sumsq
+        self.frames += frames
+        self.busy_sec += time.perf_counter() - t0
+
+    def take(self):
+        if self.frames == 0:
+            return None
+        peak = self.peak
+        rms = math.sqrt(self.sumsq / self.frames)
+        self.peak = 0.0
+        self.sumsq = 0.0
+        self.frames = 0
+        return peak, rms
+
+
+if HAS_METERS:
+    _SAMPLE_DTYPES = {
+        QAudioFormat.SampleFormat.UInt8: (np.uint8, 128.0, 128.0),
+        QAudioFormat.SampleFormat.Int16: (np.int16, 0.0, 32768.0),
+        QAudioFormat.SampleFormat.Int32: (np.int32, 0.0, 2147483648.0),
+        QAudioFormat.SampleFormat.Float: (np.float32, 0.0, 1.0),
+    }
+
+
+class PlayerLevelTap(QObject):
+    def __init__(self, player, parent=None):
+        super().__init__(parent)
+        self.acc = LevelAccumulator()
+        self.player = None
+        fmt = QAudioFormat()
+        fmt.setSampleFormat(QAudioFormat.SampleFormat.Float)
+        self.buffer_output = QAudioBufferOutput(fmt, self)
+        self.buffer_output.audioBufferReceived.connect(self._on_buffer)
+        self.attach(player)
+
+    def attach(self, player):
+        if self.player is not None:
+            self.player.setAudioBufferOutput(None)
+        self.player = player
+        player.setAudioBufferOutput(self.buffer_output)
+
+    def _on_buffer(self, buffer):
+        if not buffer.isValid():
+            return
+        fmt = buffer.format()
+        dtype, offset, scale = _SAMPLE_DTYPES.get(fmt.sampleFormat(), (None, 0.0, 1.0))
+        if dtype is None:
+            return
+        ptr = buffer.constData()
+        ptr.setsize(buffer.byteCount())
+        samples = np.frombuffer(ptr, dtype=dtype)
+        if dtype is not np.float32:
+            samples = (samples.astype(np.float32) - offset) / scale
+        self.acc.feed(samples, max(1, fmt.channelCount()))
+
+
+class LevelMeter(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(8)
+        self.rms_db = METER_FLOOR_DB
+        self.peak_db = METER_FLOOR_DB
+        self.hold_db = METER_FLOOR_DB
+        self.hold_until = 0.0
+        self.clipped = False
+
+    def set_levels(self, peak, rms, dt):
+        rms_db = to_db(rms)
+        peak_db = to_db(peak)
+        hold_db = self.hold_db
+        # 峰值保持 + 匀速回落
+        now = time.monotonic()
+        if peak_db >= hold_db:
+            hold_db = peak_db
+            self.hold_until = now + PEAK_HOLD_SEC
+        elif now > self.hold_until:
+            hold_db = max(peak_db, hold_db - PEAK_FALL_DB_PER_SEC * dt)
+        clipped = self.clipped or peak >= 1.0
+        # 变化小于 0.25 dB 不重绘，静音轨基本零开销
+        if (
+            abs(rms_db - self.rms_db) < 0.25
+            and abs(peak_db - self.peak_db) < 0.25
+            and abs(hold_db - self.hold_db) < 0.25
+            and clipped == self.clipped
+        ):
+            return
+        self.rms_db = rms_db
+        self.peak_db = peak_db
+        self.hold_db = hold_db
+        self.clipped = clipped
+        self.update()
+
+    def reset_clip(self):
+        self.clipped = False
+        self.update()
+
+    def mousePressEvent(self, e):
+        self.reset_clip()
+
+    def _x(self, db, width):
+        return width * (db - METER_FLOOR_DB) / -METER_FLOOR_DB
+
+    def paintEvent(self, e):
+        # 底色、峰值保持线、削波灯跟随主题（theme.build_palette），电平渐变各主题一样
+        pal = self.palette()
+        p = QPainter(self)
+        w = self.width() - 10
+        h = self.height()
+        p.fillRect(0, 0, self.width(), h, pal.color(QPalette.ColorRole.Window))
+
+        grad = QLinearGradient(0, 0, w, 0)
+        grad.setColorAt(0.0, QColor("#48BB78"))
+        grad.setColorAt(self._x(-12, 1.0), QColor("#48BB78"))
+        grad.setColorAt(self._x(-6, 1.0), QColor("#ECC94B"))
+        grad.setColorAt(1.0, QColor("#F56565"))
+
+        p.setOpacity(0.45)
+        p.fillRect(QRectF(0, 0, self._x(self.peak_db, w), h), grad)
+        p.setOpacity(1.0)
+        p.fillRect(QRectF(0, h * 0.25, self._x(self.rms_db, w), h * 0.5), grad)
+
+        if self.hold_db > METER_FLOOR_DB:
+            x = self._x(self.hold_db, w)
+            p.fillRect(QRectF(x - 1, 0, 2, h), pal.color(QPalette.ColorRole.WindowText))
+
+        p.fillRect(
+            QRectF(w + 2, 0, 8, h),
+            QColor("#F56565") if self.clipped else pal.color(QPalette.ColorRole.Mid),
+        )
+        p.end()
+
+
+class MeterHub(QObject):
+    # 所有电平表共享的一个定时器：取走各轨累加值、乘上当前输出音量、刷新表头
+    def __init__(self, master_meter=None, interval=33, parent=None):
+        super().__init__(parent)
+        self.master_meter = master_meter
+        self.sources = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._tick)
+        self.tick_busy_sec = 0.0
+        self._last_tick = time.monotonic()
+        self._stats_since = time.monotonic()
+
+    def add(self, key, accumulator, meter, gain_fn):
+        self.sources[key] = (accumulator, meter, gain_fn)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def remove(self, key):
+        self.sources.pop(key, None)
+
+    def _tick(self):
+        t0 = time.perf_counter()
+        now = time.monotonic()
+        dt = now - self._last_tick
+        self._last_tick = now
+
+        master_peak = 0.0
+        master_sumsq = 0.0
+        for acc, meter, gain_fn in self.sources.values():
+            levels = acc.take()
+            if levels is None:
+                peak = rms = 0.0
+            else:
+                gain = gain_fn()
+                peak = levels[0] * gain
+                rms = levels[1] * gain
+            meter.set_levels(peak, rms, dt)
+            # 各轨缓冲并不按时间对齐，总线只能估计：峰值取上界（直接相加），RMS 按不相关信号功率相加
+            master_peak += peak
+            master_sumsq += rms * rms
+
+        if self.master_meter is not None:
+            self.master_meter.set_levels(master_peak, math.sqrt(master_sumsq), dt)
+        self.tick_busy_sec += time.perf_counter() - t0
+
+    def overhead_percent(self):
+        # 电平计算 + 抽取/绘制触发 占用的 CPU 时间比例（自上次调用起）
+        now = time.monotonic()
+        wall = max(1e-6, now - self._stats_since)
+        busy = self.tick_busy_sec
+        self.tick_busy_sec = 0.0
+        for acc, _, _ in self.sources.values():
+            busy += acc.busy_sec
+            acc.busy_sec = 0.0
+        self._stats_since = now
+        return 100.0 * busy / wall
@@ -0,0 +1,97 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+import numpy as np
+
+# --- PCM 解码 ---
+# 通过 ffmpeg 把任意音频解码成 float32 PCM，按块产出，长文件也不会整段读进内存。
+
+
+def ffmpeg_path():
+    # 优先用主程序给 pydub 配好的 ffmpeg（程序目录里自带的那份）
+    try:
+        from pydub import AudioSegment
+
+        converter = AudioSegment.converter
+        if converter and os.path.isabs(converter) and os.path.exists(converter):
+            return converter
+    except ImportError:
+        pass
+    return shutil.which("ffmpeg")
+
+
+def _parse_channels(layout):
+    layout = layout.strip()
+    named = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "7.1": 8}
+    if layout in named:
+        return named[layout]
+    m = re.match(r"(\d+) channels", layout)
+    if m:
+        return int(m.group(1))
+    return named.get(layout.split("(")[0], 0)
+
+
+def probe(path):
+    # 容器声明的时长和第一条音轨的格式；ffmpeg 不带输出时会把这些打印到 stderr
+    exe = ffmpeg_path()
+    if exe is None:
+        raise RuntimeError("找不到 ffmpeg")
+    out = subprocess.run(
+        [exe, "-hide_banner", "-nostdin", "-i", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    ).stderr.decode("utf-8", "replace")
+    info = {"duration": None, "codec": None, "sample_rate": 0, "channels": 0}
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", out)
+    if m:
+        h, mi, sec = m.groups()
+        info["duration"] = int(h) * 3600 + int(mi) * 60 + float(sec)
+    m = re.search(r"Audio: ([^,\n]+), (\d+) Hz, ([^,\n]+)", out)
+    if m:
+        info["codec"] = m.group(1).split(" ")[0]
+        info["sample_rate"] = int(m.group(2))
+        info["channels"] = _parse_channels(m.group(3))
+    elif "Invalid data found" in out or "No such file" in out:
+        raise RuntimeError(out.strip().splitlines()[-1])
+    return info
+
+
+def iter_pcm(path, rate, channels=1, block_frames=1 << 16, errors=None):
+    # errors 给一个列表时，ffmpeg 报的解码错误逐行追加进去（进程正常退出也会有）
+    exe = ffmpeg_path()
+    if exe is None:
+        raise RuntimeError("找不到 ffmpeg")
+    cmd = [exe, "-v", "error", "-nostdin", "-i", path, "-vn", "-sn"]
+    cmd += ["-ac", str(channels), "-ar", str(rate), "-f", "f32le", "-"]
+    block_bytes = block_frames * channels * 4
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr 单独一个线程读，坏文件刷出大量错误时不会把管道塞满卡死
+    err_lines = []
+    drain = threading.Thread(
+        target=lambda: err_lines.extend(proc.stderr.read().splitlines()), daemon=True
+    )
+    drain.start()
+    try:
+        pending = b""
+        while True:
+            chunk = proc.stdout.read(block_bytes)
+            if not chunk:
+                break
+            chunk = pending + chunk
+            usable = len(chunk) - len(chunk) % (channels * 4)
+            pending = chunk[usable:]
+            if usable:
+                yield np.frombuffer(chunk[:usable], dtype=np.float32)
+    finally:
+        proc.stdout.close()
+        code = proc.wait()
+        drain.join()
+        proc.stderr.close()
+    lines = [l.decode("utf-8", "replace").strip() for l in err_lines if l.strip()]
+    if errors is not None:
+        errors.extend(lines)
+    if code != 0:
+        raise RuntimeError("\n".join(lines[-3:]) or f"ffmpeg 退出码 {code}")
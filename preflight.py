@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import argparse
+import collections
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import analysis
+import dsp
+
+# --- 演出前预检 ---
+# 把整场用到的每个文件完整解码一遍（多进程并行），提前发现：
+# - 解码错误 / 文件截断 / 声明时长与实际不符
+# - 少见的采样率、声道数，以及与多数曲目不一致的格式
+# - 开 200% 增益后会削波的文件（链里有限幅器时改为报告要压限多少）
+# 解码走 analysis.py 的单次解码流水线，顺带算好首尾静音；再建好 MP3 帧索引，演出时不用再算。
+# 命令行: python preflight.py [--config bgm_config.json] [文件...]
+
+ANALYZERS = ["clip", "silence"]
+HEAVY_LIMIT_DB = 6.0  # 限幅器要压这么多以上，能听出抽吸感
+COMMON_RATES = (44100, 48000)
+MISMATCH_SEC = 0.5
+MISMATCH_RATIO = 0.005
+SILENT_DB = -80.0
+MAX_ERROR_LINES = 5
+
+SEVERITY_ORDER = {"ok": 0, "info": 1, "warning": 2, "error": 3}
+
+
+def _issue(kind, severity, message):
+    return {"kind": kind, "severity": severity, "message": message}
+
+
+def _warm_seek_index(path):
+    # 无 TOC 的 VBR 文件容器时长本来就是估算的，用帧索引的结果判断
+    if not path.lower().endswith(".mp3"):
+        return None
+    import seek_index
+
+    try:
+        return seek_index.load_or_build(path)
+    except Exception:
+        return None
+
+
+def check_file(path, force=False, chain=None):
+    t0 = time.perf_counter()
+    result = {
+        "path": path,
+        "issues": [],
+        "declared_sec": None,
+        "decoded_sec": None,
+        "sample_rate": 0,
+        "channels": 0,
+        "codec": None,
+        "peak_db": None,
+        "boost_peak_db": None,
+    }
+    issues = result["issues"]
+    try:
+        # 削波和首尾静音在同一遍解码里算，结果进分析缓存，演出时直接用
+        analyzed = analysis.analyze_file(path, ANALYZERS, force)
+    except Exception as e:
+        issues.append(_issue("decode_error", "error", f"无法识别: {e}"))
+        return _finish(result, t0)
+    info = analyzed["decode"]
+    rate, channels = info["sample_rate"], info["channels"]
+    decoded = info["decoded_sec"]
+    result.update(declared_sec=info["declared_sec"], decoded_sec=decoded)
+    result.update(sample_rate=rate, channels=channels, codec=info["codec"])
+
+    if info["error"]:
+        issues.append(_issue("decode_error", "error", f"解码失败: {info['error']}"))
+    elif info["error_count"]:
+        shown = "; ".join(info["errors"][:MAX_ERROR_LINES])
+        issues.append(
+            _issue(
+                "decode_error",
+                "error",
+                f"解码时报告 {info['error_count']} 处错误: {shown}",
+            )
+        )
+
+    declared = info["declared_sec"]
+    if declared:
+        diff = decoded - declared
+        limit = max(MISMATCH_SEC, declared * MISMATCH_RATIO)
+        index = _warm_seek_index(path)
+        estimated = index is not None and index.needs_correction
+        if abs(diff) > limit and estimated:
+            issues.append(
+                _issue(
+                    "duration_mismatch",
+                    "info",
+                    f"无 TOC 的 VBR 文件，声明时长 {declared:.1f}s 是估算值，实际 {decoded:.1f}s（播放器已用帧索引校正）",
+                )
+            )
+        elif diff < -limit:
+            issues.append(
+                _issue(
+                    "truncated",
+                    "error",
+                    f"文件可能被截断：声明 {declared:.1f}s，只解出 {decoded:.1f}s",
+                )
+            )
+        elif diff > limit:
+            issues.append(
+                _issue(
+                    "duration_mismatch",
+                    "warning",
+                    f"声明时长 {declared:.1f}s 与实际 {decoded:.1f}s 不符",
+                )
+            )
+
+    if rate not in COMMON_RATES:
+        issues.append(_issue("sample_rate", "warning", f"少见的采样率 {rate} Hz"))
+    if channels > 2:
+        issues.append(
+            _issue("channels", "warning", f"{channels} 声道，会被混缩成立体声")
+        )
+    elif channels == 1:
+        issues.append(_issue("channels", "info", "单声道"))
+
+    if decoded:
+        peak_db = analyzed["clip"]["peak_db"]
+        result["peak_db"] = peak_db
+        boosted = peak_db + dsp.chain_gain_db(chain)
+        ceiling = dsp.chain_ceiling_db(chain)
+        result["boost_peak_db"] = boosted if ceiling is None else min(boosted, ceiling)
+        if ceiling is not None and boosted > ceiling:
+            reduction = boosted - ceiling
+            issues.append(
+                _issue(
+                    "boost_limit",
+                    "warning" if reduction > HEAVY_LIMIT_DB else "info",
+                    f"开 200% 增益时限幅器约压 {reduction:.1f} dB（峰值 {peak_db:.1f} dBFS，上限 {ceiling:.1f} dBTP）",
+                )
+            )
+        elif ceiling is None and boosted > 0.0:
+            issues.append(
+                _issue(
+                    "boost_clip",
+                    "warning",
+                    f"开 200% 增益会削波（峰值 {peak_db:.1f} dBFS，增益后 {boosted:+.1f} dBFS）",
+                )
+            )
+        elif peak_db < SILENT_DB:
+            issues.append(_issue("silent", "warning", "整首几乎没有声音"))
+    return _finish(result, t0)
+
+
+def _finish(result, t0):
+    result["elapsed"] = time.perf_counter() - t0
+    worst = max(
+        (i["severity"] for i in result["issues"]), key=SEVERITY_ORDER.get, default="ok"
+    )
+    result["severity"] = worst
+    return result
+
+
+def _check(path, force=False, chain=None):
+    # 子进程入口：文件没变就直接用分析缓存里的结果
+    if not os.path.exists(path):
+        return _finish(
+            {"path": path, "issues": [_issue("missing", "error", "文件不存在")]},
+            time.perf_counter(),
+        )
+    return check_file(path, force, chain)
+
+
+def session_checks(results):
+    # 跨文件的检查：和大多数曲目格式不一致的
+    rates = collections.Counter(
+        r.get("sample_rate") for r in results if r.get("sample_rate")
+    )
+    if len(rates) < 2:
+        return
+    common, _ = rates.most_common(1)[0]
+    for r in results:
+        rate = r.get("sample_rate")
+        if rate and rate != common:
+            r["issues"].append(
+                _issue(
+                    "sample_rate",
+                    "info",
+                    f"采样率 {rate} Hz 与多数曲目（{common} Hz）不同，切换时会重采样",
+                )
+            )
+            r["severity"] = max(r["severity"], "info", key=SEVERITY_ORDER.get)
+
+
+def run(paths, workers=None, force=False, progress=None, cancelled=None, chain=None):
+    # progress(done, total, result)；cancelled() 返回 True 时尽快停下
+    paths = list(dict.fromkeys(paths))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_check, p, force, chain): p for p in paths}
+        for fut in as_completed(futures):
+            try:
+                r = fut.result()
+            except Exception as e:
+                r = _finish(
+                    {
+                        "path": futures[fut],
+                        "issues": [_issue("crash", "error", str(e))],
+                    },
+                    time.perf_counter(),
+                )
+            results.append(r)
+            if progress is not None:
+                progress(len(results), len(paths), r)
+            if cancelled is not None and cancelled():
+                pool.shutdown(wait=False, cancel_futures=True)
+                break
+    order = {p: i for i, p in enumerate(paths)}
+    results.sort(key=lambda r: order[r["path"]])
+    session_checks(results)
+    return results
+
+
+def session_paths(config_file):
+    with open(config_file, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    paths = [t["path"] for t in settings.get("tracks", [])]
+    for scene in settings.get("scenes", {}).values():
+        paths += [t["path"] for t in scene.get("tracks", [])]
+    return list(dict.fromkeys(paths))
+
+
+def summarize(results):
+    counts = collections.Counter(r["severity"] for r in results)
+    return counts
+
+
+def format_report(results, elapsed):
+    counts = summarize(results)
+    lines = [
+        "EasyPlayer 演出前预检报告",
+        time.strftime("%Y-%m-%d %H:%M:%S"),
+        f"共 {len(results)} 个文件，用时 {elapsed:.1f}s："
+        f"错误 {counts['error']}，警告 {counts['warning']}，提示 {counts['info']}，正常 {counts['ok']}",
+        "",
+    ]
+    label = {"error": "❌ 错误", "warning": "⚠ 警告", "info": "ℹ 提示"}
+    for severity in ("error", "warning", "info"):
+        group = [r for r in results if r["severity"] == severity]
+        if not group:
+            continue
+        lines.append(f"== {label[severity]} ({len(group)}) ==")
+        for r in group:
+            fmt = ""
+            if r.get("sample_rate"):
+                fmt = f"  [{r.get('codec')}, {r['sample_rate']} Hz, {r['channels']} ch, {r.get('decoded_sec') or 0:.1f}s]"
+            lines.append(r["path"] + fmt)
+            for i in r["issues"]:
+                lines.append(f"    - {i['message']}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_report(results, elapsed, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_report(results, elapsed))
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def default_report_path():
+    return time.strftime("preflight_report_%Y%m%d_%H%M%S.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="演出前预检：完整解码整场用到的所有曲目"
+    )
+    parser.add_argument("files", nargs="*", help="不指定则检查配置文件里所有场景的曲目")
+    parser.add_argument("--config", default="bgm_config.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--report", default=None)
+    parser.add_argument("--force", action="store_true", help="忽略分析缓存重新解码")
+    args = parser.parse_args()
+
+    paths = args.files or session_paths(args.config)
+    if not paths:
+        sys.exit("没有要检查的文件")
+
+    def progress(done, total, r):
+        mark = {"ok": "✓", "info": "·", "warning": "!", "error": "✗"}[r["severity"]]
+        print(f"[{done}/{total}] {mark} {r['path']}")
+
+    t0 = time.perf_counter()
+    chain = dsp.load_chain(args.config)
+    results = run(paths, args.workers, args.force, progress, chain=chain)
+    elapsed = time.perf_counter() - t0
+    report = args.report or default_report_path()
+    write_report(results, elapsed, report)
+    print()
+    print(format_report(results, elapsed))
+    print(f"报告已写入 {report}")
+    sys.exit(1 if summarize(results)["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
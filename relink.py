@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import hashlib
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# --- 重新定位丢失的曲目 ---
+# 音乐文件夹换了盘符、换了用户目录之后，配置里的路径全都对不上，轨道只剩占位。
+# 在用户选的搜索目录下建一次索引（只记音频文件的 文件名 和 大小，os.scandir 一遍，
+# 十万个文件也就几秒），然后一次把所有丢失的轨道对上：
+# - 保存配置时每轨带一个指纹：大小 + 开头和结尾各 HEAD_BYTES 的哈希
+# - 同名同大小的候选再比指纹，对上就算找到；改过名的按大小找同指纹的文件
+# - 有指纹却一个都对不上的不猜：同名文件内容不一样，报“对不上”留给手动处理
+# - 没有指纹的老配置只能按文件名：只有一个候选就用它，多个时取路径尾部重合最多的
+# 对上的轨道保留原来的音量、循环、增益等设置，场景和提示点里的旧路径一并换掉。
+
+AUDIO_EXTS = {".mp3", ".wav", ".ogg", ".flac", ".m4a", ".aac", ".wma", ".opus"}
+HEAD_BYTES = 1 << 16
+PROGRESS_EVERY = 2000
+
+HOW_HASH = "hash"
+HOW_NAME = "name"
+HOW_AMBIGUOUS = "ambiguous"
+HOW_MISMATCH = "mismatch"
+HOW_NONE = "none"
+
+
+def fingerprint(path):
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        h.update(f.read(HEAD_BYTES))
+        if size > 2 * HEAD_BYTES:
+            f.seek(-HEAD_BYTES, os.SEEK_END)
+            h.update(f.read(HEAD_BYTES))
+    return {"size": size, "hash": h.hexdigest()[:20]}
+
+
+def split_path(path):
+    # 配置可能是另一个系统写的，/ 和 \ 都当分隔符
+    return [p for p in re.split(r"[\\/]+", path) if p]
+
+
+def base_name(path):
+    parts = split_path(path)
+    return parts[-1] if parts else ""
+
+
+def common_tail(a, b):
+    # 两个路径从文件名往上有几级目录名相同
+    pa = [p.lower() for p in split_path(a)]
+    pb = [p.lower() for p in split_path(b)]
+    n = 0
+    while n < min(len(pa), len(pb)) and pa[-1 - n] == pb[-1 - n]:
+        n += 1
+    return n
+
+
+def scan(roots, progress=None, cancelled=None):
+    # 返回 {"names": 小写文件名 -> [(路径, 大小)], "sizes": 大小 -> [路径], "files", "dirs"}
+    names = {}
+    sizes = {}
+    files = dirs = 0
+    stack = [r for r in roots if os.path.isdir(r)]
+    seen = set()
+    while stack:
+        if cancelled is not None and cancelled():
+            break
+        top = stack.pop()
+        try:
+            real = os.path.realpath(top)
+            if real in seen:
+                continue
+            seen.add(real)
+            it = os.scandir(top)
+        except OSError:
+            continue
+        dirs += 1
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith((".", "$")):
+                            stack.append(entry.path)
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in AUDIO_EXTS:
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                names.setdefault(entry.name.lower(), []).append((entry.path, size))
+                sizes.setdefault(size, []).append(entry.path)
+                files += 1
+                if progress is not None and files % PROGRESS_EVERY == 0:
+                    progress(files, dirs)
+    return {"names": names, "sizes": sizes, "files": files, "dirs": dirs}
+
+
+class _Fingerprints:
+    # 同一个候选可能被好几轨比对，只读一次
+    def __init__(self):
+        self.cache = {}
+        self.reads = 0
+
+    def get(self, path):
+        if path not in self.cache:
+            try:
+                self.cache[path] = fingerprint(path)["hash"]
+                self.reads += 1
+            except OSError:
+                self.cache[path] = None
+        return self.cache[path]
+
+
+def _pick(old, paths):
+    # 路径尾部重合最多的那个；并列第一说明分不清
+    ranked = sorted(paths, key=lambda p: common_tail(old, p), reverse=True)
+    if len(ranked) > 1 and common_tail(old, ranked[0]) == common_tail(old, ranked[1]):
+        return None
+    return ranked[0]
+
+
+def resolve(tracks, index, taken=()):
+    # tracks 是轨道设置（带 path，可能带 fingerprint）；返回 [(旧路径, 新路径或 None, 方式)]
+    fps = _Fingerprints()
+    used = set(taken)
+    results = []
+    for data in tracks:
+        old = data["path"]
+        fp = data.get("fingerprint")
+        named = index["names"].get(base_name(old).lower(), [])
+        found, how = None, HOW_NONE
+        if fp:
+            same = [p for p, size in named if size == fp["size"]]
+            hits = [p for p in same if p not in used and fps.get(p) == fp["hash"]]
+            if not hits:
+                # 改过名：按大小找同指纹的文件
+                hits = [
+                    p
+                    for p in index["sizes"].get(fp["size"], [])
+                    if p not in used and fps.get(p) == fp["hash"]
+                ]
+            if hits:
+                found = hits[0] if len(hits) == 1 else _pick(old, hits) or hits[0]
+                how = HOW_HASH
+            elif named:
+                how = HOW_MISMATCH
+        elif named:
+            candidates = [p for p, _ in named if p not in used]
+            if len(candidates) == 1:
+                found, how = candidates[0], HOW_NAME
+            elif candidates:
+                found = _pick(old, candidates)
+                how = HOW_NAME if found is not None else HOW_AMBIGUOUS
+        if found is not None:
+            used.add(found)
+        results.append((old, found, how))
+    return results, fps.reads
+
+
+class RelinkThread(QThread):
+    progress = pyqtSignal(int, int)  # 已索引文件数, 目录数
+    finished = pyqtSignal(object, object)  # 结果列表, 统计
+
+    def __init__(self, tracks, roots, taken=()):
+        super().__init__()
+        self.tracks = list(tracks)
+        self.roots = list(roots)
+        self.taken = set(taken)
+        self.cancelled = False
+
+    def run(self):
+        t0 = time.perf_counter()
+        index = scan(
+            self.roots,
+            progress=lambda files, dirs: self.progress.emit(files, dirs),
+            cancelled=lambda: self.cancelled,
+        )
+        t1 = time.perf_counter()
+        results, reads = resolve(self.tracks, index, self.taken)
+        stats = {
+            "files": index["files"],
+            "dirs": index["dirs"],
+            "scan_ms": (t1 - t0) * 1000,
+            "resolve_ms": (time.perf_counter() - t1) * 1000,
+            "hash_reads": reads,
+        }
+        self.finished.emit(results, stats)
@@ -0,0 +1,394 @@
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import subprocess
+
+import numpy as np
+
+import dsp
+import pcm
+import silence
+from scenes import normalize_scene
+
+# --- 离线渲染 ---
+# 把一串提示点（几点几秒哪一轨播放 / 渐隐 / 增益 / 调音量）按采样精度混成一个文件，
+# 用来彩排、存档，也是核对现场行为的参照：音量、渐隐、增益都按 AudioTrackWidget 的逻辑复现——
+# - 音量：QAudioOutput 线性音量 = 滑块 / 100，渐隐期间调滑块不生效
+# - 渐隐（进程内播放）：每 50ms 减一档，N = 渐隐时长 / 50ms 档，减到 0 后再过一个节拍停止；
+#   独立引擎模式按单调时钟线性下降（"fade_model": "linear"）
+# - 200% 增益：换成过了增益渲染链（dsp.py，"boost_chain"，默认取配置里的）的源；
+#   播放中切换是两路对齐后的 60ms 等功率交叉淡化
+#   （crossfade.py，"switch_model": "crossfade"，"switch_offset_ms" 模拟两路对齐误差）；
+#   独立引擎模式仍是停下换源、回退 500ms 重播（"switch_model": "rewind"）
+# - 跳过首尾静音、循环：从有声起点开始，到有声结尾 / 文件尾回到有声起点
+#
+# 提示点文件（JSON）:
+# {
+#   "sample_rate": 48000, "fade_duration": 1.0, "fade_model": "stepped", "boost_chain": [...],
+#   "tracks": {"A": {"path": "a.mp3", "volume": 80, "loop": true, "boost": false}},
+#   "cues": [{"at": "0:00", "track": "A", "action": "play"},
+#            {"at": "2:30", "track": "A", "action": "fade"}]
+# }
+# action: play / pause / stop / fade（可带 "duration"）/ volume（"value": 0-100）/ boost（"value": true/false）
+# 命令行: python render.py cues.json -o show.wav [--config bgm_config.json] [--tail 秒]
+
+DEFAULT_RATE = 48000
+CHANNELS = 2
+BLOCK = 8192
+FADE_TICK_MS = 50
+SWITCH_REWIND_MS = 500
+CROSSFADE_MS = 60
+SWITCH_CROSSFADE = "crossfade"
+SWITCH_REWIND = "rewind"
+FADE_STEPPED = "stepped"
+FADE_LINEAR = "linear"
+ACTIONS = ("play", "pause", "stop", "fade", "volume", "boost")
+
+
+def parse_time(value):
+    # 秒数，或 "m:ss" / "h:mm:ss"
+    if isinstance(value, (int, float)):
+        return float(value)
+    sec = 0.0
+    for part in str(value).split(":"):
+        sec = sec * 60 + float(part)
+    return sec
+
+
+def decode(path, rate):
+    blocks = list(pcm.iter_pcm(path, rate, CHANNELS))
+    if not blocks:
+        return np.zeros((0, CHANNELS), dtype=np.float32)
+    return np.concatenate(blocks).reshape(-1, CHANNELS)
+
+
+class Voice:
+    # 一轨的播放状态；位置以帧计，pos 指向下一帧要读的源数据
+    def __init__(
+        self, settings, data, bounds_ms, rate, fade_model, switch=None, boosted=None
+    ):
+        self.data = data
+        self.boosted_data = boosted  # 过了增益渲染链的源，和 data 等长
+        self.rate = rate
+        self.fade_model = fade_model
+        # (切换方式, 对齐误差帧数)
+        self.switch_model, self.switch_offset = switch or (SWITCH_CROSSFADE, 0)
+        self.xfade = None  # 增益切换交叉淡化的开始帧
+        self.volume = settings["volume"] / 100.0
+        self.gain = self.volume
+        self.loop = settings["loop"]
+        self.boosted = settings["boost"]
+        self.start = 0
+        self.end = len(data)
+        if bounds_ms is not None:
+            if settings["trim_start"]:
+                self.start = min(len(data), bounds_ms["start_ms"] * rate // 1000)
+            if settings["trim_end"]:
+                self.end = min(len(data), bounds_ms["end_ms"] * rate // 1000)
+        self.pos = self.start
+        self.state = "stopped"
+        self.fade = None  # (开始帧, 起始音量, 参数)
+
+    def play(self):
+        if self.state == "stopped":
+            self.pos = self.start
+        self._cancel_fade()
+        self.state = "playing"
+
+    def pause(self):
+        if self.state == "playing":
+            self._cancel_fade()
+            self.state = "paused"
+
+    def _cancel_fade(self):
+        # 和 AudioTrackWidget.toggle_play 一样：渐隐中按播放/暂停先取消渐隐、恢复音量
+        self.fade = None
+        self.gain = self.volume
+
+    def stop(self):
+        self.state = "stopped"
+        self.fade = None
+        self.xfade = None
+        self.gain = self.volume
+
+    def set_volume(self, value):
+        self.volume = value / 100.0
+        if self.fade is None:
+            self.gain = self.volume
+
+    def set_boost(self, on, frame):
+        if on == self.boosted:
+            return
+        self.boosted = on
+        if self.state != "playing":
+            return
+        if self.switch_model == SWITCH_REWIND:
+            self.pos = max(0, self.pos - SWITCH_REWIND_MS * self.rate // 1000)
+        else:
+            self.xfade = frame
+
+    def start_fade(self, frame, seconds):
+        if self.state != "playing":
+            return
+        if self.fade_model == FADE_LINEAR:
+            param = max(1, int(max(0.01, seconds) * self.rate))
+        else:
+            param = max(1, int(seconds * 1000 / FADE_TICK_MS))
+        self.fade = (frame, self.gain, param)
+
+    def _envelope(self, frame, n):
+        # 返回 (每帧增益, 渐隐结束前的帧数)；没在渐隐时增益是常数
+        if self.fade is None:
+            return self.gain, n
+        start, v0, param = self.fade
+        t = np.arange(frame - start, frame - start + n, dtype=np.float64)
+        if self.fade_model == FADE_LINEAR:
+            g = v0 * (1.0 - t / param)
+            live = int(np.clip(param - (frame - start), 0, n))
+        else:
+            tick = self.rate * FADE_TICK_MS / 1000
+            steps = np.floor(t / tick)
+            g = v0 * (1.0 - np.minimum(steps, param) / param)
+            stop_at = int(np.ceil((param + 1) * tick))
+            live = int(np.clip(stop_at - (frame - start), 0, n))
+        return np.maximum(g, 0.0)[:, None].astype(np.float32), live
+
+    def _read(self, n, boosted):
+        # 按循环 / 结尾规则从源数据读 n 帧，播完了返回实际读到的部分
+        out = []
+        got = 0
+        while got < n:
+            if self.pos >= self.end:
+                if not self.loop or self.end <= self.start:
+                    self.state = "stopped"
+                    self.pos = self.start
+                    break
+                self.pos = self.start
+            take = min(n - got, self.end - self.pos)
+            out.append(self._source(boosted)[self.pos : self.pos + take])
+            self.pos += take
+            got += take
+        if not out:
+            return np.zeros((0, CHANNELS), dtype=np.float32)
+        return out[0] if len(out) == 1 else np.concatenate(out)
+
+    def _source(self, boosted):
+        return self.boosted_data if boosted else self.data
+
+    def _crossfade(self, frame, pos, block):
+        # 旧源（另一种增益状态）接着原来的位置放，新源超前 switch_offset 帧，按 cos/sin 交叉；
+        # 淡化结束后沿新源的时间线继续。窗口只有几十毫秒，跨过循环点的情况按夹到文件边界处理
+        n = len(block)
+        t = (np.arange(frame, frame + n) - self.xfade) / (
+            CROSSFADE_MS * self.rate / 1000
+        )
+        if n == 0:
+            return block
+        idx = np.clip(
+            np.arange(pos, pos + n) + self.switch_offset, 0, len(self.data) - 1
+        )
+        new = self._source(self.boosted)[idx]
+        if t[-1] >= 1.0:
+            self.xfade = None
+            self.pos = min(self.end, max(self.start, self.pos + self.switch_offset))
+        t = (np.minimum(t, 1.0) * (np.pi / 2))[:, None].astype(np.float32)
+        return block * np.cos(t) + new * np.sin(t)
+
+    def render(self, frame, n, mix):
+        if self.state != "playing":
+            return
+        gain, live = self._envelope(frame, n)
+        pos = self.pos
+        # 交叉淡化期间接着放的是旧源（另一种增益状态）
+        block = self._read(live, self.boosted != (self.xfade is not None))
+        if self.xfade is not None:
+            block = self._crossfade(frame, pos, block)
+        if not np.isscalar(gain):
+            gain = gain[: len(block)]
+        mix[: len(block)] += block * gain
+        if live < n and self.fade is not None:
+            # 渐隐走完：停止并恢复滑块音量（_on_fade_finished）
+            self.stop()
+
+
+def load_cues(path, config=None):
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    fade_duration = 1.0
+    boost_chain = None
+    if config and os.path.exists(config):
+        with open(config, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+        fade_duration = settings.get("fade_duration", fade_duration)
+        boost_chain = settings.get("boost_chain")
+    spec.setdefault("fade_duration", fade_duration)
+    spec["boost_chain"] = dsp.normalize_chain(spec.get("boost_chain", boost_chain))
+    spec.setdefault("sample_rate", DEFAULT_RATE)
+    spec.setdefault("fade_model", FADE_STEPPED)
+    spec.setdefault("switch_model", SWITCH_CROSSFADE)
+    spec.setdefault("switch_offset_ms", 0)
+    names = list(spec.get("tracks", {}))
+    normalized = normalize_scene({"tracks": [spec["tracks"][n] for n in names]})[
+        "tracks"
+    ]
+    spec["tracks"] = dict(zip(names, normalized))
+    cues = []
+    for i, cue in enumerate(spec.get("cues", [])):
+        if cue.get("track") not in spec["tracks"]:
+            raise ValueError(f"第 {i + 1} 个提示点的轨道 {cue.get('track')!r} 没有定义")
+        if cue.get("action") not in ACTIONS:
+            raise ValueError(f"第 {i + 1} 个提示点的动作 {cue.get('action')!r} 不支持")
+        cues.append(dict(cue, at=parse_time(cue.get("at", 0))))
+    # 同一时刻按文件里的顺序执行
+    spec["cues"] = sorted(cues, key=lambda c: c["at"])
+    return spec
+
+
+def render(spec, tail=5.0):
+    # 返回 (float32 PCM [帧, 2], 统计)
+    rate = spec["sample_rate"]
+    t0 = time.perf_counter()
+    sources = {}
+    boosted = {}
+    voices = {}
+    # 只有开过增益的源才过一遍处理链
+    boost_tracks = {c["track"] for c in spec["cues"] if c["action"] == "boost"}
+    for name, settings in spec["tracks"].items():
+        path = settings["path"]
+        if path not in sources:
+            sources[path] = decode(path, rate)
+        if path not in boosted and (settings["boost"] or name in boost_tracks):
+            boosted[path] = dsp.process(sources[path], rate, spec["boost_chain"])
+        try:
+            bounds = silence.load_or_analyze(path)
+        except Exception as e:
+            print(f"静音检测失败，不跳过静音: {e}")
+            bounds = None
+        switch = (
+            spec.get("switch_model", SWITCH_CROSSFADE),
+            int(spec.get("switch_offset_ms", 0) * rate / 1000),
+        )
+        voices[name] = Voice(
+            settings,
+            sources[path],
+            bounds,
+            rate,
+            spec["fade_model"],
+            switch,
+            boosted.get(path),
+        )
+    decode_sec = time.perf_counter() - t0
+
+    events = [(int(round(c["at"] * rate)), c) for c in spec["cues"]]
+    last = events[-1][0] if events else 0
+    total = last + int(tail * rate)
+    # 最后一个提示点之后还在放的轨道（比如渐隐）要能放完
+    fade_tail = max(
+        (
+            c.get("duration", spec["fade_duration"])
+            for _, c in events
+            if c["action"] == "fade"
+        ),
+        default=0,
+    )
+    total = max(total, last + int((fade_tail + 0.1) * rate))
+    out = np.zeros((total, CHANNELS), dtype=np.float32)
+
+    t1 = time.perf_counter()
+    frame = 0
+    i = 0
+    while frame < total:
+        while i < len(events) and events[i][0] <= frame:
+            _apply(voices[events[i][1]["track"]], frame, events[i][1], spec)
+            i += 1
+        stop = events[i][0] if i < len(events) else total
+        n = min(BLOCK, stop - frame, total - frame)
+        mix = out[frame : frame + n]
+        for v in voices.values():
+            v.render(frame, n, mix)
+        frame += n
+    mix_sec = time.perf_counter() - t1
+
+    clipped = int(np.count_nonzero(np.abs(out) > 1.0))
+    peak = float(np.abs(out).max()) if len(out) else 0.0
+    stats = {
+        "seconds": total / rate,
+        "decode_sec": decode_sec,
+        "mix_sec": mix_sec,
+        "realtime_x": (total / rate) / max(1e-9, decode_sec + mix_sec),
+        "peak_db": 20 * np.log10(max(peak, 1e-9)),
+        "clipped": clipped,
+    }
+    return out, stats
+
+
+def _apply(voice, frame, cue, spec):
+    action = cue["action"]
+    if action == "play":
+        voice.play()
+    elif action == "pause":
+        voice.pause()
+    elif action == "stop":
+        voice.stop()
+    elif action == "fade":
+        voice.start_fade(frame, cue.get("duration", spec["fade_duration"]))
+    elif action == "volume":
+        voice.set_volume(cue["value"])
+    elif action == "boost":
+        voice.set_boost(bool(cue.get("value", True)), frame)
+
+
+def to_int16(data):
+    return (np.clip(data, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def write_audio(path, data, rate):
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "wb") as w:
+            w.setnchannels(CHANNELS)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(to_int16(data))
+        return
+    # 其他格式交给 ffmpeg 按扩展名编码
+    exe = pcm.ffmpeg_path()
+    if exe is None:
+        raise RuntimeError("找不到 ffmpeg，只能输出 .wav")
+    cmd = [exe, "-v", "error", "-y", "-f", "s16le", "-ar", str(rate)]
+    cmd += ["-ac", str(CHANNELS), "-i", "-", path]
+    proc = subprocess.run(cmd, input=to_int16(data), stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按提示点离线渲染整场混音")
+    parser.add_argument("cues", help="提示点 JSON 文件")
+    parser.add_argument("-o", "--output", default="render.wav")
+    parser.add_argument(
+        "--config", default="bgm_config.json", help="读取其中的渐隐时长"
+    )
+    parser.add_argument(
+        "--tail", type=float, default=5.0, help="最后一个提示点后再渲染几秒"
+    )
+    args = parser.parse_args()
+
+    try:
+        spec = load_cues(args.cues, args.config)
+    except (OSError, ValueError, KeyError) as e:
+        sys.exit(f"提示点文件有误: {e}")
+    data, stats = render(spec, args.tail)
+    write_audio(args.output, data, spec["sample_rate"])
+    print(
+        f"已渲染 {stats['seconds']:.1f}s 到 {args.output}："
+        f"解码 {stats['decode_sec']:.2f}s + 混音 {stats['mix_sec']:.2f}s，"
+        f"{stats['realtime_x']:.0f}x 实时"
+    )
+    print(f"峰值 {stats['peak_db']:.1f} dBFS，削波采样 {stats['clipped']}")
+
+
+if __name__ == "__main__":
+    main()
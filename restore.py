@@ -0,0 +1,121 @@
+import os
+import time
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from tracer import TRACER
+
+# --- 渐进式会话恢复 ---
+# 窗口先显示出来，轨道按保存的顺序分批创建，每批之间让事件循环跑一轮：
+# 第一批正好填满一屏，之后每批几轨。文件是否存在在后台线程里检查，
+# U 盘、网络共享反应慢也不会卡住界面；暂时找不到的文件交给调用方做占位。
+
+FIRST_BATCH = 6
+BATCH_SIZE = 3
+
+
+class PathCheckThread(QThread):
+    checked = pyqtSignal(str, bool)
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = list(paths)
+
+    def run(self):
+        for path in self.paths:
+            self.checked.emit(path, os.path.exists(path))
+
+
+class SessionRestorer(QObject):
+    first_screen_ready = pyqtSignal(float)  # 从启动算起的毫秒数
+    # 总耗时 ms, 轨道数, 缺失数；被 cancel() 打断时也会发，cancelled 为 True
+    finished = pyqtSignal(float, int, int)
+
+    # build_track(data, exists) 负责建好控件并挂到界面上
+    def __init__(self, build_track, launch_time, parent=None):
+        super().__init__(parent)
+        self.build_track = build_track
+        self.launch_time = launch_time
+        self.pending = []
+        self.exists = {}
+        self.built = 0
+        self.missing = 0
+        self.checker = None
+        self.trace_start = None
+        self.cancelled = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._step)
+
+    def is_running(self):
+        return bool(self.pending)
+
+    def start(self, saved_tracks):
+        self.pending = list(saved_tracks)
+        self.exists = {}
+        self.built = 0
+        self.missing = 0
+        self.cancelled = False
+        self.trace_start = TRACER.now()
+        if not self.pending:
+            self._first_screen()
+            self._finish()
+            return
+        self.checker = PathCheckThread(t["path"] for t in self.pending)
+        self.checker.checked.connect(self._on_checked)
+        self.checker.start()
+
+    def _on_checked(self, path, exists):
+        self.exists[path] = exists
+        if self.pending and self.pending[0]["path"] == path:
+            self.timer.start()
+
+    def _step(self):
+        budget = FIRST_BATCH if self.built == 0 else BATCH_SIZE
+        while budget and self.pending and self.pending[0]["path"] in self.exists:
+            data = self.pending.pop(0)
+            exists = self.exists[data["path"]]
+            self.build_track(data, exists)
+            self.built += 1
+            self.missing += not exists
+            budget -= 1
+            if self.built == FIRST_BATCH:
+                self._first_screen()
+        if not self.pending:
+            self.timer.stop()
+            if self.built < FIRST_BATCH:
+                self._first_screen()
+            self._finish()
+        elif self.pending[0]["path"] not in self.exists:
+            # 等后台检查跟上
+            self.timer.stop()
+
+    def _first_screen(self):
+        ms = (time.perf_counter() - self.launch_time) * 1000
+        TRACER.instant("restore.first_screen", "settings", ms=ms)
+        self.first_screen_ready.emit(ms)
+
+    def _finish(self):
+        ms = (time.perf_counter() - self.launch_time) * 1000
+        TRACER.complete(
+            "restore",
+            self.trace_start,
+            "settings",
+            tracks=self.built,
+            missing=self.missing,
+            cancelled=self.cancelled,
+        )
+        self.finished.emit(ms, self.built, self.missing)
+
+    def pending_settings(self):
+        return list(self.pending)
+
+    def cancel(self):
+        # 恢复到一半切了场景：剩下的不建了，但照样发 finished，
+        # 主窗口靠它做恢复之后的事（预载场景、崩溃恢复询问、启动日志）
+        self.timer.stop()
+        if not self.pending:
+            return
+        self.pending = []
+        self.cancelled = True
+        self._finish()
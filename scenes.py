@@ -0,0 +1,90 @@
+import os
+
+from PyQt6.QtCore import QObject, QTimer
+
+# --- 场景 ---
+# 一个场景 = 一组曲目（含音量/循环/增益）+ 输出设备。
+# 选中“下一场景”后，ScenePreloader 在后台逐个创建当前场景里没有的轨道：
+# 媒体提前打开、增益提前渲染，切换时只需要把它们挂到界面上。
+
+DEFAULT_SCENE = "默认"
+
+
+def normalize_scene(data):
+    tracks = []
+    for t in data.get("tracks", []):
+        tracks.append(
+            {
+                "path": t["path"],
+                "volume": t.get("volume", 100),
+                "loop": t.get("loop", True),
+                "boost": t.get("boost", False),
+                "trim_start": t.get("trim_start", True),
+                "trim_end": t.get("trim_end", False),
+                "cue": t.get("cue"),
+                "duck": t.get("duck"),
+                "fingerprint": t.get("fingerprint"),
+            }
+        )
+    return {"device_name": data.get("device_name", ""), "tracks": tracks}
+
+
+class ScenePreloader(QObject):
+    # create_track(path, device_name) -> 轨道控件；每次事件循环只建一个，避免卡住界面
+    def __init__(self, create_track, parent=None):
+        super().__init__(parent)
+        self.create_track = create_track
+        self.scene_name = None
+        self.widgets = {}
+        self.pending = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._preload_next)
+
+    def preload(self, name, scene, existing_paths):
+        wanted = [
+            t
+            for t in scene["tracks"]
+            if t["path"] not in existing_paths and os.path.exists(t["path"])
+        ]
+        wanted_paths = {t["path"] for t in wanted}
+        for path in list(self.widgets):
+            if path not in wanted_paths:
+                self._dispose(self.widgets.pop(path))
+        self.scene_name = name
+        self.pending = [
+            (t, scene["device_name"]) for t in wanted if t["path"] not in self.widgets
+        ]
+        if self.pending:
+            self.timer.start()
+
+    def _preload_next(self):
+        if not self.pending:
+            self.timer.stop()
+            return
+        t, device_name = self.pending.pop(0)
+        w = self.create_track(t["path"], device_name)
+        w.apply_settings(t)
+        self.widgets[t["path"]] = w
+
+    def take(self, path):
+        # 还没轮到预载的也立即创建，保证切换时不缺轨
+        for i, (t, device_name) in enumerate(self.pending):
+            if t["path"] == path:
+                del self.pending[i]
+                w = self.create_track(path, device_name)
+                w.apply_settings(t)
+                return w
+        return self.widgets.pop(path, None)
+
+    def discard(self):
+        self.timer.stop()
+        self.pending = []
+        for w in self.widgets.values():
+            self._dispose(w)
+        self.widgets = {}
+        self.scene_name = None
+
+    def _dispose(self, w):
+        w.cleanup()
+        w.deleteLater()
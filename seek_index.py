@@ -0,0 +1,245 @@
+import os
+import mmap
+import struct
+import bisect
+from array import array
+
+from PyQt6.QtCore import QIODevice
+
+import cache
+
+# --- MP3 帧索引 ---
+# 没有 Xing TOC 的 VBR MP3，解码器要么从头逐包读到目标位置（慢），
+# 要么按开头的码率线性换算字节位置（快但长文件里能差出十几秒）。
+# 这里一次性扫描所有帧头得到每帧的字节偏移并持久缓存，
+# 寻址时直接从目标帧所在字节开始喂给播放器：按时间取帧 O(1)，按字节反查帧 O(log n)。
+
+INDEX_VERSION = 1
+
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+
+def parse_header(b0, b1, b2, b3):
+    # 只处理 Layer III；返回 (帧长字节, 每帧采样数, 采样率, 码率kbps)，非法帧头返回 None
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    if version == 1 or layer != 1:
+        return None
+    br_index = b2 >> 4
+    sr_index = (b2 >> 2) & 0x03
+    if br_index in (0, 15) or sr_index == 3:
+        return None
+    padding = (b2 >> 1) & 0x01
+    sample_rate = _SAMPLE_RATES[version][sr_index]
+    if version == 3:
+        bitrate = _BITRATES_V1[br_index]
+        return 144000 * bitrate // sample_rate + padding, 1152, sample_rate, bitrate
+    bitrate = _BITRATES_V2[br_index]
+    return 72000 * bitrate // sample_rate + padding, 576, sample_rate, bitrate
+
+
+def _skip_id3v2(mm):
+    if mm[:3] != b"ID3" or len(mm) < 10:
+        return 0
+    size = 0
+    for b in mm[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if mm[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _xing_flags(mm, pos, version_bits, channel_mode):
+    # Xing/Info 帧：返回 flags，没有则返回 None
+    if version_bits == 3:
+        side = 17 if channel_mode == 3 else 32
+    else:
+        side = 9 if channel_mode == 3 else 17
+    tag_at = pos + 4 + side
+    tag = mm[tag_at : tag_at + 4]
+    if tag not in (b"Xing", b"Info"):
+        return None
+    return struct.unpack(">I", mm[tag_at + 4 : tag_at + 8])[0]
+
+
+class SeekIndex:
+    def __init__(self, offsets, samples_per_frame, sample_rate, data_end, has_toc, vbr):
+        self.offsets = offsets
+        self.samples_per_frame = samples_per_frame
+        self.sample_rate = sample_rate
+        self.data_start = offsets[0] if offsets else 0
+        self.data_end = data_end
+        self.has_toc = has_toc
+        self.vbr = vbr
+        self.frame_ms = 1000.0 * samples_per_frame / sample_rate
+
+    @property
+    def duration_ms(self):
+        return int(len(self.offsets) * self.frame_ms)
+
+    @property
+    def needs_correction(self):
+        # CBR 或带 TOC 的文件，解码器自己就能找准
+        return self.vbr and not self.has_toc and len(self.offsets) > 1
+
+    def frame_at(self, ms):
+        i = int(ms / self.frame_ms)
+        return min(max(i, 0), len(self.offsets) - 1)
+
+    def snap(self, ms):
+        # 对齐到帧边界
+        return int(self.frame_at(ms) * self.frame_ms)
+
+    def byte_at(self, ms):
+        return self.offsets[self.frame_at(ms)]
+
+    def time_at_byte(self, pos):
+        i = bisect.bisect_right(self.offsets, pos) - 1
+        return int(max(i, 0) * self.frame_ms)
+
+    def frame_time(self, i):
+        return int(i * self.frame_ms)
+
+
+class FrameSliceDevice(QIODevice):
+    # 只暴露 [start, end) 这一段字节的只读设备：解码器从指定帧开始解码，
+    # 播放器的 0 点就是该帧的时间，不需要解码器自己去找位置
+    def __init__(self, path, start, end, parent=None):
+        super().__init__(parent)
+        self._file = open(path, "rb")
+        self.start = start
+        self.end = end
+        self.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    def isSequential(self):
+        return False
+
+    def size(self):
+        return self.end - self.start
+
+    def bytesAvailable(self):
+        return self.size() - self.pos()
+
+    def readData(self, maxlen):
+        remaining = self.size() - self.pos()
+        if remaining <= 0:
+            return b""
+        self._file.seek(self.start + self.pos())
+        return self._file.read(min(maxlen, remaining))
+
+    def writeData(self, data):
+        return -1
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+def scan(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 4:
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _scan(mm, size)
+        finally:
+            mm.close()
+
+
+def _scan(mm, size):
+    offsets = array("q")
+    pos = _skip_id3v2(mm)
+    spf = sample_rate = None
+    has_toc = False
+    first_bitrate = None
+    vbr = False
+    first = True
+    data_end = pos
+    while pos + 4 <= size:
+        hdr = parse_header(mm[pos], mm[pos + 1], mm[pos + 2], mm[pos + 3])
+        if (
+            hdr is not None
+            and spf is not None
+            and (hdr[1] != spf or hdr[2] != sample_rate)
+        ):
+            hdr = None
+        if hdr is None:
+            # 失步（垃圾数据 / 尾部标签）：找下一个同步字节
+            pos = mm.find(b"\xff", pos + 1)
+            if pos < 0:
+                break
+            continue
+        length, frame_spf, frame_sr, bitrate = hdr
+        if pos + length > size:
+            break
+        if first:
+            first = False
+            # 第一帧必须能接上第二帧才算真正同步，避免把封面图片里的 0xFF 当成帧头
+            nxt = pos + length
+            if (
+                nxt + 4 <= size
+                and parse_header(mm[nxt], mm[nxt + 1], mm[nxt + 2], mm[nxt + 3]) is None
+            ):
+                first = True
+                pos += 1
+                continue
+            spf, sample_rate = frame_spf, frame_sr
+            flags = _xing_flags(mm, pos, (mm[pos + 1] >> 3) & 0x03, mm[pos + 3] >> 6)
+            if flags is not None:
+                has_toc = bool(flags & 0x04)
+                pos += length  # Xing/Info 帧不含音频
+                continue
+        if first_bitrate is None:
+            first_bitrate = bitrate
+        elif bitrate != first_bitrate:
+            vbr = True
+        offsets.append(pos)
+        pos += length
+        data_end = pos
+    if not offsets:
+        return None
+    return SeekIndex(offsets, spf, sample_rate, data_end, has_toc, vbr)
+
+
+def load_or_build(path):
+    key = cache.file_key(path)
+    meta = cache.load_json("seek_index", key)
+    bin_path = cache.cache_path("seek_index", key, ".bin")
+    if meta and meta.get("version") == INDEX_VERSION and os.path.exists(bin_path):
+        offsets = array("q")
+        with open(bin_path, "rb") as f:
+            offsets.frombytes(f.read())
+        return SeekIndex(
+            offsets,
+            meta["samples_per_frame"],
+            meta["sample_rate"],
+            meta["data_end"],
+            meta["has_toc"],
+            meta["vbr"],
+        )
+
+    index = scan(path)
+    if index is None:
+        return None
+    cache.atomic_write(bin_path, index.offsets.tobytes())
+    cache.save_json(
+        "seek_index",
+        key,
+        {
+            "version": INDEX_VERSION,
+            "samples_per_frame": index.samples_per_frame,
+            "sample_rate": index.sample_rate,
+            "data_end": index.data_end,
+            "has_toc": index.has_toc,
+            "vbr": index.vbr,
+        },
+    )
+    return index
@@ -0,0 +1,249 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+# --- 操作记录与回放 ---
+# 演出时把操作员的每个操作（播放/暂停、渐隐、增益、音量、切换设备、全部渐隐、急停）
+# 连同时间记到 sessions/ 下的日志里，每行一个紧凑的 JSON 数组：
+#   第一行是表头 {"v":1, "start":..., "fade_duration":..., "device":...}
+#   [毫秒, "track", 编号, 设置]     轨道上界面时记下它的路径和设置
+#   [毫秒, 动作, 编号, 值]          play / fade / boost(true|false) / volume(0-100)
+#   [毫秒, 动作, null, 值]          device(名称) / fade_all / kill_all
+# 回放: python session_log.py replay 日志 [--speed 4]，在 offscreen 的主窗口上按原节奏（或加速）
+# 重新点一遍，报告每类操作的处理耗时、界面恢复空闲的时间和触发时刻偏差，用作贴近现场的压力回归。
+
+VERSION = 1
+SESSION_DIR = "sessions"
+MAX_LOGS = 30
+FLUSH_SEC = 2.0
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class SessionRecorder:
+    def __init__(self, header, directory=SESSION_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self._prune(directory)
+        name = time.strftime("session_%Y%m%d_%H%M%S.log")
+        self.path = os.path.join(directory, name)
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.t0 = time.perf_counter()
+        self.last_flush = self.t0
+        self.ids = {}
+        self.file.write(
+            _dumps(dict(header, v=VERSION, start=time.strftime("%Y-%m-%d %H:%M:%S")))
+            + "\n"
+        )
+
+    def _prune(self, directory):
+        logs = sorted(glob.glob(os.path.join(directory, "session_*.log")))
+        for old in logs[: max(0, len(logs) - MAX_LOGS + 1)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _write(self, row):
+        if self.file is None:
+            return
+        self.file.write(_dumps(row) + "\n")
+        now = time.perf_counter()
+        if now - self.last_flush >= FLUSH_SEC:
+            self.file.flush()
+            self.last_flush = now
+
+    def _ms(self):
+        return int((time.perf_counter() - self.t0) * 1000)
+
+    def track(self, w):
+        # 轨道上界面时就登记，回放时连没被操作过的轨道也一起建出来
+        return self._track_id(w)
+
+    def _track_id(self, w):
+        idx = self.ids.get(w)
+        if idx is None:
+            idx = self.ids[w] = len(self.ids)
+            self._write([self._ms(), "track", idx, w.settings()])
+        return idx
+
+    def record(self, action, w=None, value=None):
+        idx = self._track_id(w) if w is not None else None
+        row = [self._ms(), action, idx]
+        if value is not None:
+            row.append(value)
+        self._write(row)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        rows = [json.loads(line) for line in f if line.strip()]
+    return header, rows
+
+
+def _percentile(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * q))]
+
+
+def format_report(stats, deviations, speed):
+    lines = [f"回放速度 {speed:g}x，共 {sum(len(v) for v in stats.values())} 个操作"]
+    lines.append(
+        f"{'操作':<10}{'次数':>6}{'处理 平均/P95/最大 ms':>26}{'到空闲 平均/P95/最大 ms':>28}"
+    )
+    for action, rows in sorted(stats.items()):
+        handle = [r[0] for r in rows]
+        settle = [r[1] for r in rows]
+        lines.append(
+            f"{action:<10}{len(rows):>6}"
+            f"{sum(handle) / len(handle):>12.1f}/{_percentile(handle, 0.95):.1f}/{max(handle):.1f}"
+            f"{sum(settle) / len(settle):>14.1f}/{_percentile(settle, 0.95):.1f}/{max(settle):.1f}"
+        )
+    if deviations:
+        lines.append(
+            f"触发时刻偏差: 平均 {sum(deviations) / len(deviations):.1f} ms，"
+            f"P95 {_percentile(deviations, 0.95):.1f} ms，最大 {max(deviations):.1f} ms"
+        )
+    return "\n".join(lines)
+
+
+def replay(path, speed=1.0, settle_sec=1.0):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    header, rows = load(path)
+
+    # 在临时目录里跑，主窗口读写的配置、日志不会碰到真实的
+    workdir = tempfile.mkdtemp(prefix="easyplayer_replay_")
+    with open(os.path.join(workdir, "bgm_config.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "fade_duration": header.get("fade_duration", 1.0),
+                "device_name": header.get("device", ""),
+                "record_sessions": False,
+            },
+            f,
+        )
+    os.chdir(workdir)
+
+    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtWidgets import QApplication
+    import main
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = main.MainWindow()
+    window.show()
+
+    tracks = {}
+    stats = {}
+    deviations = []
+    state = {"i": 0, "t0": None}
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.setTimerType(Qt.TimerType.PreciseTimer)
+
+    def apply(row):
+        action, idx = row[1], row[2]
+        value = row[3] if len(row) > 3 else None
+        w = tracks.get(idx)
+        if action == "track":
+            w = window._create_track(value["path"], window.combo_devices.currentText())
+            window._register_track(w)
+            w.apply_settings(value)
+            tracks[idx] = w
+        elif action == "play":
+            w.btn_play.click()
+        elif action == "fade":
+            w.btn_fade_stop.click()
+        elif action == "boost":
+            if w.btn_boost.isChecked() != bool(value):
+                w.btn_boost.click()
+        elif action == "volume":
+            w.vol_slider.setValue(int(value))
+        elif action == "device":
+            i = window.combo_devices.findText(value)
+            if i >= 0:
+                window.combo_devices.setCurrentIndex(i)
+        elif action == "fade_all":
+            window.fade_stop_all()
+        elif action == "kill_all":
+            window.kill_all()
+
+    def step():
+        while state["i"] < len(rows):
+            row = rows[state["i"]]
+            due = state["t0"] + row[0] / 1000.0 / speed
+            now = time.perf_counter()
+            if due > now:
+                timer.start(max(0, int((due - now) * 1000)))
+                return
+            state["i"] += 1
+            if row[1] != "track":
+                deviations.append((now - due) * 1000)
+            t = time.perf_counter()
+            apply(row)
+            handled = time.perf_counter()
+            # 操作引出的排队信号、重绘都处理完才算界面恢复空闲
+            QTimer.singleShot(
+                0,
+                lambda action=row[1], t=t, handled=handled: stats.setdefault(
+                    action, []
+                ).append(((handled - t) * 1000, (time.perf_counter() - t) * 1000)),
+            )
+        QTimer.singleShot(int(settle_sec * 1000), app.quit)
+
+    timer.timeout.connect(step)
+
+    def begin():
+        state["t0"] = time.perf_counter()
+        step()
+
+    # 先让窗口把空配置恢复完
+    QTimer.singleShot(500, begin)
+    app.exec()
+    window.close()
+    stats.pop("track", None)
+    return stats, deviations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作记录回放")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("replay", help="在 offscreen 主窗口上回放操作日志")
+    p.add_argument("log")
+    p.add_argument("--speed", type=float, default=1.0, help="加速倍数")
+    p.add_argument("--json", help="把统计写成 JSON")
+    p = sub.add_parser("show", help="打印日志内容")
+    p.add_argument("log")
+    args = parser.parse_args()
+
+    if args.cmd == "show":
+        header, rows = load(args.log)
+        print(header)
+        for r in rows:
+            print(
+                f"{r[0] / 1000:9.3f}s  {r[1]:<9} {'' if r[2] is None else r[2]:<4} "
+                f"{r[3] if len(r) > 3 else ''}"
+            )
+        return
+
+    log = os.path.abspath(args.log)
+    out = os.path.abspath(args.json) if args.json else None
+    stats, deviations = replay(log, args.speed)
+    print(format_report(stats, deviations, args.speed))
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"stats": stats, "deviations": deviations}, f)
+
+
+if __name__ == "__main__":
+    main()
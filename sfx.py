@@ -0,0 +1,471 @@
+import os
+import time
+import threading
+
+import numpy as np
+from PyQt6.QtCore import QIODevice, QThread, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QFont, QKeySequence, QShortcut
+from PyQt6.QtMultimedia import QAudioFormat, QAudioSink
+from PyQt6.QtWidgets import (
+    QFileDialog,
+    QFrame,
+    QHBoxLayout,
+    QInputDialog,
+    QLabel,
+    QMenu,
+    QPushButton,
+)
+
+import pcm
+from theme import action_button, set_prop
+from tracer import TRACER
+
+# --- 音效垫 ---
+# 过场音、掌声、鼓点要按下就响。普通轨道每次播放都要经过 QMediaPlayer 打开解码器，
+# 这里改成：音效提前整段解码成 16 位 PCM 放在内存里，一个常开的 QAudioSink（拉模式，
+# 缓冲只有 BUFFER_MS）从混音设备取数据，按下时只是往混音列表里加一个声部。
+# - 重复触发：从头重播（同一个垫的上一次直接切掉）或叠加（多个声部同时响）
+# - 扼流组：同组的垫互相打断（比如长掌声和短掌声），被打断的 CHOKE_MS 内淡出，不咔哒
+# - 内存预算：所有垫的 PCM 加起来不超过预算，超了就不加载
+# - 键盘：每个垫绑一个键（默认 F1-F8），按住不连发
+# 每次触发估算“按下到出声”（等混音取走的时间 + 声卡缓冲里排在前面的时长），退出时打印统计；
+# 和普通轨道的对比见 bench.py sfx。
+
+PAD_COUNT = 8
+DEFAULT_KEYS = [f"F{i + 1}" for i in range(PAD_COUNT)]
+DEFAULT_BUDGET_MB = 64
+RATE = 48000
+CHANNELS = 2
+FRAME_BYTES = CHANNELS * 2
+BUFFER_MS = 20
+CHOKE_MS = 5
+MAX_VOICES = 16
+
+MODE_RETRIGGER = "retrigger"
+MODE_OVERLAP = "overlap"
+MODE_TEXT = {MODE_RETRIGGER: "从头重播", MODE_OVERLAP: "叠加"}
+
+
+def normalize_pad(p, i):
+    p = p if isinstance(p, dict) else {}
+    return {
+        "path": p.get("path"),
+        "key": p.get("key") or DEFAULT_KEYS[i],
+        "group": p.get("group") or None,
+        "mode": p.get("mode") if p.get("mode") in MODE_TEXT else MODE_RETRIGGER,
+        "volume": int(p.get("volume", 100)),
+    }
+
+
+def decode(path, rate, limit=None):
+    # 整段解码成 int16 [帧, 2]；超过 limit 字节就不再往下解，长文件不会先吃掉一大块内存
+    blocks = []
+    size = 0
+    for block in pcm.iter_pcm(path, rate, CHANNELS):
+        blocks.append(block)
+        size += block.size * 2
+        if limit is not None and size > limit:
+            raise MemoryError(f"超出内存预算（剩余 {limit / 1048576:.1f} MB）")
+    if not blocks:
+        return np.zeros((0, CHANNELS), dtype=np.int16)
+    data = np.concatenate(blocks).reshape(-1, CHANNELS)
+    return (np.clip(data, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+
+
+class SfxLoadThread(QThread):
+    finished = pyqtSignal(int, str, object, str)  # 垫编号, 路径, PCM, 错误
+
+    def __init__(self, index, path, rate, limit):
+        super().__init__()
+        self.index = index
+        self.path = path
+        self.rate = rate
+        self.limit = limit
+
+    def run(self):
+        try:
+            data = decode(self.path, self.rate, self.limit)
+        except Exception as e:
+            self.finished.emit(self.index, self.path, None, str(e))
+            return
+        self.finished.emit(self.index, self.path, data, "")
+
+
+class SfxMixer(QIODevice):
+    # 拉模式的混音设备：声卡要多少给多少，没有声部时给静音，QAudioSink 一直开着
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.voices = []  # [垫编号, PCM, 位置, 增益, 淡出剩余帧数或 None, 触发时刻]
+        self.rate = RATE
+        self.sink = None
+        self.latencies = []
+        self.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        return (1 << 20) + super().bytesAvailable()
+
+    def writeData(self, data):
+        return -1
+
+    def start(self, index, data, gain, mode, group_members):
+        choke = int(self.rate * CHOKE_MS / 1000)
+        with self.lock:
+            for v in self.voices:
+                if v[4] is not None:
+                    continue
+                if v[0] in group_members or (mode == MODE_RETRIGGER and v[0] == index):
+                    v[4] = choke
+            if len(self.voices) >= MAX_VOICES:
+                self.voices.pop(0)
+            self.voices.append([index, data, 0, gain, None, time.perf_counter()])
+
+    def stop(self, indices=None):
+        choke = int(self.rate * CHOKE_MS / 1000)
+        with self.lock:
+            for v in self.voices:
+                if v[4] is None and (indices is None or v[0] in indices):
+                    v[4] = choke
+
+    def active(self):
+        with self.lock:
+            return {v[0] for v in self.voices if v[4] is None}
+
+    def readData(self, maxlen):
+        frames = maxlen // FRAME_BYTES
+        if frames <= 0:
+            return b""
+        now = time.perf_counter()
+        mix = np.zeros((frames, CHANNELS), dtype=np.float32)
+        with self.lock:
+            keep = []
+            for v in self.voices:
+                index, data, pos, gain, fade, t = v
+                n = min(frames, len(data) - pos)
+                if fade is not None:
+                    n = min(n, fade)
+                if n > 0:
+                    block = data[pos : pos + n].astype(np.float32) * (gain / 32768)
+                    if fade is not None:
+                        ramp = np.arange(fade, fade - n, -1, dtype=np.float32)
+                        block *= (ramp / (self.rate * CHOKE_MS / 1000))[:, None]
+                        v[4] = fade - n
+                    mix[:n] += block
+                    v[2] = pos + n
+                if t is not None:
+                    self._record_latency(index, now - t)
+                    v[5] = None
+                if v[2] < len(data) and (v[4] is None or v[4] > 0):
+                    keep.append(v)
+            self.voices = keep
+        return (np.clip(mix, -1.0, 32767 / 32768) * 32768).astype("<i2").tobytes()
+
+    def _record_latency(self, index, waited):
+        # 这一块写进声卡缓冲时，前面还排着多少没放完
+        queued_ms = 0.0
+        if self.sink is not None:
+            queued = self.sink.bufferSize() - self.sink.bytesFree()
+            queued_ms = max(0, queued) / FRAME_BYTES * 1000 / self.rate
+        ms = waited * 1000 + queued_ms
+        self.latencies.append(ms)
+        TRACER.instant("sfx.trigger", "sfx", pad=index, latency_ms=ms)
+
+
+class SfxPlayer:
+    # 混音设备 + 输出；换设备时重建 QAudioSink
+    def __init__(self, parent=None):
+        self.mixer = SfxMixer(parent)
+        self.sink = None
+        self.volume = 1.0
+
+    def set_device(self, device):
+        if self.sink is not None:
+            self.sink.stop()
+            self.sink.deleteLater()
+        fmt = QAudioFormat()
+        fmt.setSampleFormat(QAudioFormat.SampleFormat.Int16)
+        fmt.setChannelCount(CHANNELS)
+        fmt.setSampleRate(RATE)
+        if not device.isFormatSupported(fmt):
+            fmt.setSampleRate(device.preferredFormat().sampleRate())
+        rate = fmt.sampleRate()
+        self.sink = QAudioSink(device, fmt)
+        self.sink.setBufferSize(int(rate * BUFFER_MS / 1000) * FRAME_BYTES)
+        self.mixer.rate = rate
+        self.mixer.sink = self.sink
+        self.sink.start(self.mixer)
+        return rate
+
+
+class SfxPanel(QFrame):
+    # 一排音效垫；host 是挂快捷键的窗口
+    changed = pyqtSignal()
+
+    def __init__(self, host, parent=None):
+        super().__init__(parent)
+        self.setObjectName("SfxBar")
+        self.host = host
+        self.player = SfxPlayer(self)
+        self.rate = RATE
+        self.budget_mb = DEFAULT_BUDGET_MB
+        self.pads = [normalize_pad(None, i) for i in range(PAD_COUNT)]
+        self.pcm = [None] * PAD_COUNT
+        self.loaders = set()
+        self.shortcuts = []
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(30, 8, 30, 8)
+        layout.setSpacing(10)
+        title = QLabel("🎺 音效:")
+        title.setFont(QFont("Segoe UI", 13))
+        layout.addWidget(title)
+        self.buttons = []
+        for i in range(PAD_COUNT):
+            btn = QPushButton()
+            btn.setObjectName("SfxPad")
+            btn.setMinimumSize(110, 48)
+            btn.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+            btn.pressed.connect(lambda i=i: self.on_pad(i))
+            btn.customContextMenuRequested.connect(lambda _, i=i: self.pad_menu(i))
+            layout.addWidget(btn)
+            self.buttons.append(btn)
+        layout.addStretch()
+        self.lbl_memory = QLabel()
+        self.lbl_memory.setFont(QFont("Segoe UI", 12))
+        layout.addWidget(self.lbl_memory)
+        btn_stop = QPushButton("■ 停止音效")
+        action_button(btn_stop, "gray")
+        btn_stop.clicked.connect(self.stop_all)
+        layout.addWidget(btn_stop)
+
+        # 播放中的垫高亮
+        self.timer = QTimer(self)
+        self.timer.setInterval(100)
+        self.timer.timeout.connect(self.refresh_states)
+        self.timer.start()
+        self.bind_keys()
+        self.refresh()
+
+    # --- 配置 ---
+    def configure(self, pads, budget_mb):
+        self.budget_mb = max(1, int(budget_mb))
+        pads = pads if isinstance(pads, list) else []
+        self.pads = [
+            normalize_pad(pads[i] if i < len(pads) else None, i)
+            for i in range(PAD_COUNT)
+        ]
+        self.pcm = [None] * PAD_COUNT
+        for i, p in enumerate(self.pads):
+            if p["path"]:
+                self.load(i)
+        self.bind_keys()
+        self.refresh()
+
+    def settings(self):
+        return {"sfx_pads": self.pads, "sfx_budget_mb": self.budget_mb}
+
+    def set_device(self, device):
+        rate = self.player.set_device(device)
+        if rate != self.rate:
+            # 采样率变了，内存里的 PCM 要按新采样率重新解码
+            self.rate = rate
+            self.player.mixer.stop()
+            for i, p in enumerate(self.pads):
+                if p["path"]:
+                    self.load(i)
+
+    def bind_keys(self):
+        for s in self.shortcuts:
+            s.setEnabled(False)
+            s.deleteLater()
+        self.shortcuts = []
+        for i, p in enumerate(self.pads):
+            s = QShortcut(QKeySequence(p["key"]), self.host)
+            s.setAutoRepeat(False)
+            s.activated.connect(lambda i=i: self.trigger(i))
+            self.shortcuts.append(s)
+
+    # --- 加载与内存预算 ---
+    def used_bytes(self, skip=None):
+        return sum(
+            d.nbytes for i, d in enumerate(self.pcm) if d is not None and i != skip
+        )
+
+    def load(self, i):
+        path = self.pads[i]["path"]
+        self.pcm[i] = None
+        if not os.path.exists(path):
+            self.set_state(i, "error", "文件不存在")
+            return
+        limit = self.budget_mb * 1024 * 1024 - self.used_bytes(skip=i)
+        thread = SfxLoadThread(i, path, self.rate, limit)
+        thread.finished.connect(self.on_loaded)
+        self.loaders.add(thread)
+        self.set_state(i, "loading")
+        thread.start()
+
+    def on_loaded(self, i, path, data, error):
+        thread = self.sender()
+        self.loaders.discard(thread)
+        thread.wait()
+        if path != self.pads[i]["path"]:
+            return
+        if data is None:
+            print(f"音效加载失败: {error}")
+            self.set_state(i, "error", error)
+            return
+        budget = self.budget_mb * 1024 * 1024
+        if self.used_bytes(skip=i) + data.nbytes > budget:
+            self.set_state(
+                i,
+                "error",
+                f"超出内存预算（需要 {data.nbytes / 1048576:.1f} MB，预算 {self.budget_mb} MB）",
+            )
+            return
+        self.pcm[i] = data
+        self.set_state(i, "ready")
+        self.refresh()
+
+    # --- 触发 ---
+    def on_pad(self, i):
+        if self.pads[i]["path"] is None:
+            self.choose_file(i)
+        else:
+            self.trigger(i)
+
+    def trigger(self, i):
+        data = self.pcm[i]
+        if data is None:
+            return
+        p = self.pads[i]
+        group = p["group"]
+        members = (
+            {j for j, q in enumerate(self.pads) if q["group"] == group and j != i}
+            if group
+            else set()
+        )
+        self.player.mixer.start(i, data, p["volume"] / 100.0, p["mode"], members)
+        set_prop(self.buttons[i], "state", "playing")
+
+    def stop_all(self):
+        self.player.mixer.stop()
+
+    # --- 编辑 ---
+    def choose_file(self, i):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择音效", "", "Audio (*.mp3 *.wav *.ogg *.flac *.m4a)"
+        )
+        if not path:
+            return
+        self.pads[i]["path"] = path
+        self.load(i)
+        self.refresh()
+        self.changed.emit()
+
+    def pad_menu(self, i):
+        p = self.pads[i]
+        menu = QMenu(self)
+        menu.addAction("选择文件…", lambda: self.choose_file(i))
+        menu.addAction(f"快捷键: {p['key']}…", lambda: self.edit_key(i))
+        menu.addAction(f"扼流组: {p['group'] or '无'}…", lambda: self.edit_group(i))
+        other = MODE_OVERLAP if p["mode"] == MODE_RETRIGGER else MODE_RETRIGGER
+        menu.addAction(
+            f"重复触发: {MODE_TEXT[p['mode']]} → 改为{MODE_TEXT[other]}",
+            lambda: self.set_mode(i, other),
+        )
+        menu.addAction(f"音量: {p['volume']}%…", lambda: self.edit_volume(i))
+        if p["path"]:
+            menu.addAction("清除", lambda: self.clear(i))
+        menu.exec(self.buttons[i].mapToGlobal(self.buttons[i].rect().bottomLeft()))
+
+    def edit_key(self, i):
+        key, ok = QInputDialog.getText(
+            self, "快捷键", "按键（例如 F1、Ctrl+1）:", text=self.pads[i]["key"]
+        )
+        if ok and key.strip() and not QKeySequence(key.strip()).isEmpty():
+            self.pads[i]["key"] = key.strip()
+            self.bind_keys()
+            self.refresh()
+            self.changed.emit()
+
+    def edit_group(self, i):
+        group, ok = QInputDialog.getText(
+            self,
+            "扼流组",
+            "同组的音效互相打断（留空为不分组）:",
+            text=self.pads[i]["group"] or "",
+        )
+        if ok:
+            self.pads[i]["group"] = group.strip() or None
+            self.refresh()
+            self.changed.emit()
+
+    def set_mode(self, i, mode):
+        self.pads[i]["mode"] = mode
+        self.refresh()
+        self.changed.emit()
+
+    def edit_volume(self, i):
+        value, ok = QInputDialog.getInt(
+            self, "音效音量", "音量 (%):", self.pads[i]["volume"], 0, 200
+        )
+        if ok:
+            self.pads[i]["volume"] = value
+            self.changed.emit()
+
+    def clear(self, i):
+        self.player.mixer.stop({i})
+        self.pads[i] = normalize_pad({"key": self.pads[i]["key"]}, i)
+        self.pcm[i] = None
+        self.set_state(i, "")
+        self.refresh()
+        self.changed.emit()
+
+    # --- 显示 ---
+    def set_state(self, i, state, tip=None):
+        set_prop(self.buttons[i], "state", state)
+        if tip is not None:
+            self.buttons[i].setToolTip(tip)
+
+    def refresh(self):
+        for i, (p, btn) in enumerate(zip(self.pads, self.buttons)):
+            name = (
+                os.path.splitext(os.path.basename(p["path"]))[0] if p["path"] else "＋"
+            )
+            btn.setText(f"{p['key']}\n{name[:12]}")
+            if btn.property("state") != "error":
+                tip = p["path"] or "点击选择音效文件，右键设置"
+                if p["group"]:
+                    tip += f"\n扼流组: {p['group']}"
+                btn.setToolTip(f"{tip}\n重复触发: {MODE_TEXT[p['mode']]}")
+        used = self.used_bytes() / 1048576
+        self.lbl_memory.setText(f"内存 {used:.1f}/{self.budget_mb} MB")
+
+    def refresh_states(self):
+        active = self.player.mixer.active()
+        for i, btn in enumerate(self.buttons):
+            state = btn.property("state")
+            if i in active:
+                set_prop(btn, "state", "playing")
+            elif state == "playing":
+                set_prop(btn, "state", "ready")
+
+    def summary(self):
+        lat = sorted(self.player.mixer.latencies)
+        if not lat:
+            return ""
+        return (
+            f"音效: 触发 {len(lat)} 次，估算按下到出声 平均 {sum(lat) / len(lat):.1f} ms，"
+            f"P95 {lat[min(len(lat) - 1, int(len(lat) * 0.95))]:.1f} ms，最大 {lat[-1]:.1f} ms"
+        )
+
+    def shutdown(self):
+        self.timer.stop()
+        self.player.mixer.stop()
+        if self.player.sink is not None:
+            self.player.sink.stop()
+        for thread in list(self.loaders):
+            thread.wait(3000)
@@ -0,0 +1,65 @@
+HAS_NUMPY = False
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    pass
+
+# --- 首尾静音检测 ---
+# 解码成低采样率单声道，按 10ms 一帧算 RMS；超过阈值并持续 hold 时长才算“有声”，
+# 避免被开头的爆音、底噪尖峰骗过。解码和缓存走 analysis.py 的单次解码流水线，
+# 每个文件只算一次。
+
+ANALYSIS_RATE = 16000
+FRAME_MS = 10
+THRESHOLD_DB = -50.0
+HOLD_MS = 60
+PREROLL_MS = 20
+VERSION = 1
+
+
+def frame_rms_db(samples, frame_len):
+    n = len(samples) // frame_len
+    frames = samples[: n * frame_len].reshape(n, frame_len)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_len
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def _first_sustained(mask, hold):
+    # mask 中第一个连续 hold 帧为 True 的起点；没有则返回 None
+    if hold <= 1:
+        hits = np.flatnonzero(mask)
+        return int(hits[0]) if len(hits) else None
+    runs = np.convolve(mask.astype(np.int32), np.ones(hold, dtype=np.int32), "valid")
+    hits = np.flatnonzero(runs == hold)
+    return int(hits[0]) if len(hits) else None
+
+
+def find_bounds(levels_db, threshold_db=THRESHOLD_DB, hold=HOLD_MS // FRAME_MS):
+    # 返回 (起始帧, 结束帧)，结束帧不含；整段都是静音返回 None
+    mask = levels_db > threshold_db
+    if not mask.any():
+        return None
+    hold = min(hold, len(mask))
+    start = _first_sustained(mask, hold)
+    end = _first_sustained(mask[::-1], hold)
+    if start is None or end is None:
+        # 只有零星的短促声音，按最宽松的方式处理
+        hits = np.flatnonzero(mask)
+        return int(hits[0]), int(hits[-1]) + 1
+    return start, len(mask) - end
+
+
+def analyze(path):
+    # 不读写缓存，单独跑一遍（基准测试用）
+    import analysis
+
+    return analysis.analyze_file(path, ["silence"], use_cache=False)["silence"]
+
+
+def load_or_analyze(path):
+    # 和其他分析共用按文件的缓存；别处已经完整解码过（比如演出前预检）就不用再算
+    import analysis
+
+    return analysis.analyze_file(path, ["silence"])["silence"]
@@ -0,0 +1,298 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+import cache
+
+# --- 本地暂存 ---
+# U 盘、NAS 上的曲目在演出前先复制到本机缓存目录，边复制边算 SHA-256，
+# 写完再从本地读一遍核对，一致才算可用；播放器在轨道停着的时候换到本地副本。
+# 缓存有总容量上限，超出时按最近使用时间淘汰本次会话用不到的副本。
+# 清单以原始路径为键，所以演出时 U 盘被拔掉，仍然能找到本地副本。
+
+MODE_AUTO = "auto"  # 只暂存网络/可移动存储上的文件
+MODE_ALL = "all"
+MODE_OFF = "off"
+DEFAULT_BUDGET_MB = 4096
+
+CHUNK = 1 << 20
+PROGRESS_INTERVAL = 0.2
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "fuse.sshfs", "afpfs", "9p"}
+REMOVABLE_PREFIXES = ("/media/", "/mnt/", "/run/media/", "/Volumes/")
+
+
+def _mount_fstype(path):
+    best, fstype = "", None
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount = parts[1].replace("\\040", " ")
+                if (path == mount or path.startswith(mount.rstrip("/") + "/")) and len(
+                    mount
+                ) > len(best):
+                    best, fstype = mount, parts[2]
+    except OSError:
+        pass
+    return fstype
+
+
+def is_remote_or_removable(path):
+    path = os.path.abspath(path)
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True
+        import ctypes
+
+        DRIVE_REMOVABLE, DRIVE_REMOTE = 2, 4
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) in (
+            DRIVE_REMOVABLE,
+            DRIVE_REMOTE,
+        )
+    if path.startswith(REMOVABLE_PREFIXES):
+        return True
+    return _mount_fstype(path) in NETWORK_FS
+
+
+def sha256_of(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def format_eta(sec):
+    sec = int(sec)
+    return f"{sec // 60}:{sec % 60:02d}" if sec >= 60 else f"{sec}s"
+
+
+class StagingWorker(QThread):
+    # 状态: queued / copying / verifying / ready / failed / skipped
+    status = pyqtSignal(str, str, str)  # 原始路径, 状态, 说明
+    progress = pyqtSignal(str, float, float, float)  # 原始路径, 比例, 字节/秒, 剩余秒
+    overall = pyqtSignal(int, int, float, float)  # 已完成, 总数, 字节/秒, 剩余秒
+    ready = pyqtSignal(str, str)  # 原始路径, 本地副本
+
+    def __init__(self, manifest, budget_bytes):
+        super().__init__()
+        self.manifest = manifest
+        self.budget_bytes = budget_bytes
+        self.jobs = queue.Queue()
+        self.wanted = set()
+        self.lock = threading.Lock()
+        self.sizes = {}
+        self.done_files = 0
+        self.total_files = 0
+        self.done_bytes = 0
+        self.rate = 0.0
+        self.cancelled = False
+
+    def request(self, path):
+        with self.lock:
+            if path in self.wanted:
+                return
+            self.wanted.add(path)
+            self.total_files += 1
+        self.jobs.put(path)
+
+    def stop(self):
+        self.cancelled = True
+        self.jobs.put(None)
+
+    def run(self):
+        while True:
+            path = self.jobs.get()
+            if path is None or self.cancelled:
+                return
+            try:
+                self._stage(path)
+            except Exception as e:
+                self.status.emit(path, "failed", str(e))
+            self.done_files += 1
+            self._emit_overall()
+
+    def _remaining_bytes(self):
+        with self.jobs.mutex:
+            pending = list(self.jobs.queue)
+        total = 0
+        for p in pending:
+            if p is None:
+                continue
+            if p not in self.sizes:
+                try:
+                    self.sizes[p] = os.path.getsize(p)
+                except OSError:
+                    self.sizes[p] = 0
+            total += self.sizes[p]
+        return total
+
+    def _emit_overall(self, current_left=0):
+        remaining = self._remaining_bytes() + current_left
+        eta = remaining / self.rate if self.rate > 0 else 0.0
+        self.overall.emit(self.done_files, self.total_files, self.rate, eta)
+
+    def _stage(self, path):
+        st = os.stat(path)
+        entry = self.manifest.get(path)
+        if (
+            entry is not None
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and os.path.exists(entry["staged"])
+        ):
+            self.status.emit(path, "verifying", "")
+            if sha256_of(entry["staged"]) == entry["sha256"]:
+                entry["last_used"] = time.time()
+                self._save_manifest()
+                self.status.emit(path, "ready", "")
+                self.ready.emit(path, entry["staged"])
+                return
+            self._drop(path)
+
+        if st.st_size > self.budget_bytes:
+            self.status.emit(path, "skipped", "超出缓存容量")
+            return
+        self._make_room(st.st_size)
+
+        ext = os.path.splitext(path)[1]
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        staged = cache.cache_path("staging", key, ext)
+        part = staged + ".part"
+        h = hashlib.sha256()
+        copied = 0
+        t0 = last = time.monotonic()
+        self.status.emit(path, "copying", "")
+        try:
+            with open(path, "rb") as src, open(part, "wb") as dst:
+                while True:
+                    if self.cancelled:
+                        raise OSError("已取消")
+                    chunk = src.read(CHUNK)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    dst.write(chunk)
+                    copied += len(chunk)
+                    now = time.monotonic()
+                    if now - last >= PROGRESS_INTERVAL:
+                        last = now
+                        self.rate = copied / max(1e-6, now - t0)
+                        left = st.st_size - copied
+                        self.progress.emit(
+                            path,
+                            copied / max(1, st.st_size),
+                            self.rate,
+                            left / self.rate,
+                        )
+                        self._emit_overall(left)
+                dst.flush()
+                os.fsync(dst.fileno())
+            self.rate = copied / max(1e-6, time.monotonic() - t0)
+            if copied != st.st_size:
+                raise OSError(f"复制不完整 {copied}/{st.st_size}")
+            digest = h.hexdigest()
+            self.status.emit(path, "verifying", "")
+            if sha256_of(part) != digest:
+                raise OSError("本地副本校验失败")
+            os.replace(part, staged)
+        except BaseException:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            raise
+        self.done_bytes += copied
+        self.manifest[path] = {
+            "staged": staged,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+            "last_used": time.time(),
+        }
+        self._save_manifest()
+        self.status.emit(path, "ready", "")
+        self.ready.emit(path, staged)
+
+    def _make_room(self, needed):
+        used = sum(e["size"] for e in self.manifest.values())
+        with self.lock:
+            wanted = set(self.wanted)
+        victims = sorted(
+            (e["last_used"], p) for p, e in self.manifest.items() if p not in wanted
+        )
+        for _, p in victims:
+            if used + needed <= self.budget_bytes:
+                break
+            used -= self.manifest[p]["size"]
+            self._drop(p)
+        self._save_manifest()
+
+    def _drop(self, path):
+        entry = self.manifest.pop(path, None)
+        if entry is not None:
+            try:
+                os.remove(entry["staged"])
+            except OSError:
+                pass
+
+    def _save_manifest(self):
+        cache.save_json("staging", "manifest", dict(self.manifest))
+
+
+class StagingManager(QObject):
+    status = pyqtSignal(str, str, str)
+    progress = pyqtSignal(str, float, float, float)
+    overall = pyqtSignal(int, int, float, float)
+    ready = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mode = MODE_AUTO
+        self.manifest = cache.load_json("staging", "manifest") or {}
+        self.worker = None
+        self.budget_mb = DEFAULT_BUDGET_MB
+
+    def configure(self, mode, budget_mb):
+        self.mode = mode if mode in (MODE_AUTO, MODE_ALL, MODE_OFF) else MODE_AUTO
+        self.budget_mb = budget_mb
+
+    def _ensure_worker(self):
+        if self.worker is None:
+            self.worker = StagingWorker(self.manifest, self.budget_mb * 1024 * 1024)
+            self.worker.status.connect(self.status)
+            self.worker.progress.connect(self.progress)
+            self.worker.overall.connect(self.overall)
+            self.worker.ready.connect(self.ready)
+            self.worker.start()
+        return self.worker
+
+    def wants(self, path):
+        if self.mode == MODE_OFF:
+            return False
+        return self.mode == MODE_ALL or is_remote_or_removable(path)
+
+    def request(self, path):
+        # 调用方负责先判断 wants()，避免在界面线程里访问慢速存储
+        worker = self._ensure_worker()
+        worker.request(path)
+        self.status.emit(path, "queued", "")
+
+    def lookup(self, path):
+        # 原文件不可用时找本地副本（只看文件是否还在，不再校验）
+        entry = self.manifest.get(path)
+        if entry is not None and os.path.exists(entry["staged"]):
+            return entry["staged"]
+        return None
+
+    def shutdown(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait(2000)
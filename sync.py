@@ -0,0 +1,484 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from cues import ClockThread
+from tracer import TRACER
+
+# --- 多机同步 ---
+# 大场地主厅和分会场各有一台电脑，要放同一段背景音乐并且对齐。
+# 一台设为主机（leader），其余为从机（follower），走 UDP：
+# - 从机定时 ping 主机，按 NTP 的四个时间戳算往返时间和时钟偏移，取最近 SAMPLES 次里
+#   往返最短的一次（排队少，偏移最准）
+# - 主机上的播放/暂停/渐隐/拖动进度不马上执行，而是带上“主机时钟 LEAD_MS 之后”的时刻
+#   广播出去，自己也排到同一时刻；从机换算成本机时刻，用提示点的高精度定时线程执行。
+#   要播放的轨道先定位并暂停（预卷），到点只需 play()
+# - 急停不等：主机立刻执行，从机收到就执行
+# - 主机每 ANCHOR_MS 广播在播轨道的位置，从机据此纠正声卡时钟漂移：
+#   差得不多时微调播放速度追上，差太多（或从机这轨没在播）就直接跳过去
+# 轨道按列表顺序对应，文件名不一致时按文件名找。测量见 bench.py sync（本机多进程走回环）。
+
+ROLE_OFF = "off"
+ROLE_LEADER = "leader"
+ROLE_FOLLOWER = "follower"
+ROLES = (ROLE_OFF, ROLE_LEADER, ROLE_FOLLOWER)
+
+PORT = 47800
+LEAD_MS = 150
+PING_MS = 500
+BURST = 8  # 刚连上时先快速 ping 几次，尽快给出偏移
+BURST_MS = 30
+SAMPLES = 16
+FOLLOWER_TIMEOUT = 5.0
+REPEAT = 2  # UDP 命令发两遍，按序号去重
+ANCHOR_MS = 1000
+DRIFT_MS = 8.0  # 超过就微调播放速度
+RESYNC_MS = 250.0  # 超过就直接跳到该在的位置
+NUDGE = 0.005
+ERROR_HISTORY = 5
+
+
+def best_sample(samples):
+    # (往返, 偏移) 里取往返最短的
+    return min(samples) if samples else None
+
+
+def ntp_sample(t0, t1, t2, t3):
+    # t0 从机发出, t1 主机收到, t2 主机回复, t3 从机收到
+    rtt = (t3 - t0) - (t2 - t1)
+    offset = ((t1 - t0) + (t2 - t3)) / 2
+    return rtt, offset
+
+
+class _Link:
+    # UDP 收发；收包在后台线程里，收到就打时间戳再交给 handler
+    def __init__(self, port, handler, clock):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("", port))
+        self.sock.settimeout(0.2)
+        self.handler = handler
+        self.clock = clock
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def send(self, msg, addr):
+        try:
+            self.sock.sendto(json.dumps(msg).encode("utf-8"), addr)
+        except OSError as e:
+            print(f"同步消息发送失败: {e}")
+
+    def _run(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            stamp = self.clock()
+            try:
+                msg = json.loads(data.decode("utf-8"))
+            except ValueError:
+                continue
+            if isinstance(msg, dict):
+                self.handler(msg, addr, stamp)
+
+    def close(self):
+        self.running = False
+        self.thread.join(1.0)
+        self.sock.close()
+
+
+class SyncLeader(QObject):
+    followers_changed = pyqtSignal(int)
+
+    def __init__(self, port=PORT, parent=None):
+        super().__init__(parent)
+        self.session = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.followers = {}  # 地址 -> 最后一次 ping 的时刻
+        self.link = _Link(port, self._on_packet, self.now)
+
+    def now(self):
+        return time.perf_counter()
+
+    def _on_packet(self, msg, addr, t1):
+        if msg.get("t") != "ping":
+            return
+        reply = {"t": "pong", "id": msg.get("id"), "t0": msg.get("t0"), "t1": t1}
+        reply["t2"] = self.now()
+        self.link.send(reply, addr)
+        with self.lock:
+            new = addr not in self.followers
+            self.followers[addr] = time.monotonic()
+            count = len(self.followers)
+        if new:
+            print(f"多机同步: 从机 {addr[0]}:{addr[1]} 已连接")
+            self.followers_changed.emit(count)
+
+    def live_followers(self):
+        limit = time.monotonic() - FOLLOWER_TIMEOUT
+        with self.lock:
+            gone = [a for a, seen in self.followers.items() if seen < limit]
+            for a in gone:
+                del self.followers[a]
+                print(f"多机同步: 从机 {a[0]}:{a[1]} 已断开")
+            live = list(self.followers)
+        if gone:
+            self.followers_changed.emit(len(live))
+        return live
+
+    def send(self, msg, repeat=REPEAT):
+        self.seq += 1
+        msg = dict(msg, s=self.session, seq=self.seq)
+        for addr in self.live_followers():
+            for _ in range(repeat):
+                self.link.send(msg, addr)
+        return msg
+
+    def close(self):
+        self.link.close()
+
+
+class SyncFollower(QObject):
+    # 消息, msg["at"] 换算成的本机 perf_counter 时刻
+    message = pyqtSignal(object, float)
+    synced = pyqtSignal(float, float)  # 偏移 ms, 往返 ms
+
+    def __init__(self, host, port=PORT, skew=0.0, parent=None):
+        super().__init__(parent)
+        # 收包按来源地址比对，主机名先解析成 IP；解析失败抛 OSError
+        self.leader = (socket.gethostbyname(host), port)
+        # skew 只给 bench 用：假装本机时钟差了这么多秒，偏移估计要能把它消掉
+        self.skew = skew
+        self.samples = deque(maxlen=SAMPLES)
+        self.offset = None
+        self.rtt = None
+        self.session = None
+        self.seen = deque(maxlen=256)
+        self.next_id = 0
+        self.link = _Link(0, self._on_packet, self.now)
+        self.stopped = threading.Event()
+        self.pinger = threading.Thread(target=self._ping_loop, daemon=True)
+        self.pinger.start()
+
+    def now(self):
+        return time.perf_counter() + self.skew
+
+    def to_local(self, leader_time):
+        return leader_time - self.offset - self.skew
+
+    def _ping_loop(self):
+        sent = 0
+        while not self.stopped.is_set():
+            self.next_id += 1
+            self.link.send(
+                {"t": "ping", "id": self.next_id, "t0": self.now()}, self.leader
+            )
+            sent += 1
+            self.stopped.wait((BURST_MS if sent < BURST else PING_MS) / 1000)
+
+    def _on_packet(self, msg, addr, t3):
+        if addr != self.leader:
+            # 只听配置的主机：同网段别的机器（或另一台也设成主机的）发来的一律丢掉
+            return
+        kind = msg.get("t")
+        if kind == "pong":
+            try:
+                rtt, offset = ntp_sample(msg["t0"], msg["t1"], msg["t2"], t3)
+            except (KeyError, TypeError):
+                return
+            self.samples.append((rtt, offset))
+            self.rtt, self.offset = best_sample(self.samples)
+            self.synced.emit(self.offset * 1000, self.rtt * 1000)
+            return
+        if self.offset is None or "at" not in msg:
+            return
+        if msg.get("s") != self.session:
+            # 主机重启过，序号从头来
+            self.session = msg.get("s")
+            self.seen.clear()
+        if msg.get("seq") in self.seen:
+            return
+        self.seen.append(msg.get("seq"))
+        self.message.emit(msg, self.to_local(msg["at"]))
+
+    def close(self):
+        self.stopped.set()
+        self.pinger.join(1.0)
+        self.link.close()
+
+
+class SyncController(QObject):
+    # 把主机/从机和轨道接起来；window 是主窗口（急停、渐隐时长），tracks() 返回轨道列表
+    status = pyqtSignal(str)
+
+    def __init__(self, window, tracks, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.tracks = tracks
+        self.role = ROLE_OFF
+        self.host = ""
+        self.port = PORT
+        self.lead_ms = LEAD_MS
+        self.leader = None
+        self.follower = None
+        self.clock = None
+        self.pending = {}  # 令牌 -> 消息
+        self.next_token = 0
+        self.applying = False
+        self.timer_errors = []
+        self.drift_errors = []
+        self.track_errors = {}  # 轨道 -> 最近几次位置误差
+        self.last_cmd = {}  # 轨道 -> 最后一条命令的本机执行时刻
+        self.anchor_timer = QTimer(self)
+        self.anchor_timer.setInterval(ANCHOR_MS)
+        self.anchor_timer.timeout.connect(self._send_anchors)
+
+    def configure(self, role, host, port, lead_ms):
+        self.role = role if role in ROLES else ROLE_OFF
+        self.host = host or ""
+        self.port = int(port or PORT)
+        self.lead_ms = max(0, int(lead_ms))
+
+    def settings(self):
+        return {
+            "sync_role": self.role,
+            "sync_leader": self.host,
+            "sync_port": self.port,
+            "sync_lead_ms": self.lead_ms,
+        }
+
+    def start(self):
+        if self.role == ROLE_OFF:
+            return
+        self.clock = ClockThread()
+        self.clock.due.connect(self._on_due)
+        self.clock.start()
+        try:
+            if self.role == ROLE_LEADER:
+                self.leader = SyncLeader(self.port, self)
+                self.leader.followers_changed.connect(
+                    lambda n: self.status.emit(f"🔗 同步主机 · {n} 台从机")
+                )
+                self.anchor_timer.start()
+                self.status.emit("🔗 同步主机 · 0 台从机")
+            elif self.host:
+                self.follower = SyncFollower(self.host, self.port, parent=self)
+                self.follower.message.connect(self._on_message)
+                self.follower.synced.connect(self._on_synced)
+                self.status.emit(f"🔗 同步从机 · 连接 {self.host} 中")
+            else:
+                print("多机同步: 从机没有设置主机地址（sync_leader）")
+        except OSError as e:
+            print(f"多机同步启动失败: {e}")
+            self.status.emit(f"⚠ 同步启动失败: {e}")
+
+    def _on_synced(self, offset_ms, rtt_ms):
+        self.status.emit(
+            f"🔗 同步从机 · 往返 {rtt_ms:.1f} ms · 误差 ±{rtt_ms / 2:.1f} ms"
+        )
+
+    # --- 主机：拦截操作 ---
+    def intercept(self, w, action, pos=None):
+        # 轨道上的操作先经过这里；返回 True 表示已经接管，到约定时刻再执行
+        if self.leader is None or self.applying:
+            return False
+        tracks = self.tracks()
+        if w not in tracks:
+            return False
+        msg = {
+            "t": "cmd",
+            "action": action,
+            "track": tracks.index(w),
+            "name": os.path.basename(w.original_path),
+            "at": self.leader.now() + self.lead_ms / 1000,
+        }
+        if pos is not None:
+            msg["pos"] = pos
+        if action == "fade":
+            msg["sec"] = self.window.fade_spin.value()
+        msg = self.leader.send(msg)
+        self._schedule(msg, msg["at"])
+        return True
+
+    def broadcast_now(self, action):
+        # 急停之类：主机已经执行了，从机收到立刻执行
+        if self.leader is None or self.applying:
+            return
+        self.leader.send({"t": "cmd", "action": action, "at": self.leader.now()})
+
+    def _send_anchors(self):
+        playing = QMediaPlayer.PlaybackState.PlayingState
+        for i, w in enumerate(self.tracks()):
+            if w.player.playbackState() != playing:
+                continue
+            at = self.leader.now()
+            pos = w.current_position()
+            self.leader.send(
+                {
+                    "t": "anchor",
+                    "track": i,
+                    "name": os.path.basename(w.original_path),
+                    "pos": pos,
+                    "at": at,
+                },
+                repeat=1,
+            )
+
+    # --- 从机：收到消息 ---
+    def _on_message(self, msg, local_at):
+        if msg.get("t") == "anchor":
+            self._on_anchor(msg, local_at)
+        elif msg.get("t") == "cmd":
+            self._schedule(msg, local_at)
+
+    def _find(self, msg):
+        tracks = self.tracks()
+        i = msg.get("track", -1)
+        name = msg.get("name")
+        if 0 <= i < len(tracks) and os.path.basename(tracks[i].original_path) == name:
+            return tracks[i]
+        for w in tracks:
+            if os.path.basename(w.original_path) == name:
+                return w
+        return None
+
+    def _schedule(self, msg, deadline):
+        w = self._find(msg) if "name" in msg else None
+        if msg["action"] == "play" and w is not None:
+            self._prime(w, msg["pos"])
+        self.next_token += 1
+        self.pending[self.next_token] = msg
+        self.clock.schedule(self.next_token, deadline)
+
+    def _prime(self, w, pos):
+        # 提前定位并暂停，到点只剩 play()
+        if w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            return
+        self.applying = True
+        try:
+            w.seek_to(pos)
+            w.player.pause()
+        finally:
+            self.applying = False
+
+    def _on_due(self, token, deadline, emitted):
+        msg = self.pending.pop(token, None)
+        if msg is None:
+            return
+        self.applying = True
+        try:
+            self._apply(msg, deadline)
+        finally:
+            self.applying = False
+        error_ms = (time.perf_counter() - deadline) * 1000
+        self.timer_errors.append(error_ms)
+        TRACER.instant("sync.cmd", "sync", action=msg["action"], error_ms=error_ms)
+
+    def _apply(self, msg, deadline):
+        action = msg["action"]
+        if action == "kill":
+            self.window.kill_all()
+            return
+        w = self._find(msg)
+        if w is None:
+            print(f"多机同步: 找不到轨道 {msg.get('name')}，忽略 {action}")
+            return
+        self.last_cmd[w] = deadline
+        playing = w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        if action == "play":
+            if playing:
+                late = (time.perf_counter() - deadline) * 1000
+                self._seek_playing(w, int(msg["pos"] + late))
+            else:
+                w.toggle_play()
+            self.track_errors.pop(w, None)
+        elif action == "pause":
+            if playing:
+                w.toggle_play()
+        elif action == "fade":
+            # 渐隐时长跟主机一致
+            if abs(self.window.fade_spin.value() - msg["sec"]) > 1e-6:
+                self.window.fade_spin.setValue(msg["sec"])
+            w.fade_out_stop()
+
+    def _seek_playing(self, w, ms):
+        # 带帧索引的 VBR MP3 寻址会换切片源，播放器随之停下；
+        # 和 main.py 里 seek_to 的调用方一样，跳完接着播
+        w.seek_to(ms)
+        if w.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            w.player.play()
+
+    def _on_anchor(self, msg, local_at):
+        w = self._find(msg)
+        if w is None or w.is_fading():
+            return
+        # 命令还没执行，或者这个位置是命令执行前报的（比如暂停前最后一次），不能拿来纠正
+        if local_at <= self.last_cmd.get(w, 0.0) or any(
+            m.get("name") == msg["name"] for m in self.pending.values()
+        ):
+            return
+        expected = msg["pos"] + (time.perf_counter() - local_at) * 1000
+        if w.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            # 主机在播、从机没播（从机后加入或漏了命令）：直接跳到该在的位置播
+            self.applying = True
+            try:
+                w.seek_to(int(expected))
+                w.player.play()
+                w.btn_play.setText("⏸ 暂停")
+            finally:
+                self.applying = False
+            return
+        history = self.track_errors.setdefault(w, deque(maxlen=ERROR_HISTORY))
+        history.append(w.current_position() - expected)
+        error = sorted(history)[len(history) // 2]
+        self.drift_errors.append(error)
+        if abs(error) > RESYNC_MS:
+            TRACER.instant("sync.resync", "sync", track=w.trace_name, error_ms=error)
+            self._seek_playing(w, int(expected))
+            history.clear()
+            rate = 1.0
+        elif abs(error) > DRIFT_MS:
+            rate = 1.0 - NUDGE if error > 0 else 1.0 + NUDGE
+        elif abs(error) < DRIFT_MS / 2:
+            rate = 1.0
+        else:
+            return
+        if hasattr(w.player, "setPlaybackRate") and w.player.playbackRate() != rate:
+            w.player.setPlaybackRate(rate)
+
+    def summary(self):
+        parts = []
+        if self.timer_errors:
+            xs = sorted(abs(x) for x in self.timer_errors)
+            parts.append(
+                f"执行 {len(xs)} 条命令，定时误差 平均 {sum(xs) / len(xs):.2f} ms，"
+                f"最大 {xs[-1]:.2f} ms"
+            )
+        if self.follower is not None and self.follower.rtt is not None:
+            parts.append(f"时钟偏移误差不超过 ±{self.follower.rtt * 500:.2f} ms")
+        if self.drift_errors:
+            xs = sorted(abs(x) for x in self.drift_errors)
+            parts.append(
+                f"播放位置和主机差 中位 {xs[len(xs) // 2]:.0f} ms，最大 {xs[-1]:.0f} ms"
+            )
+        return "多机同步: " + "；".join(parts) if parts else ""
+
+    def shutdown(self):
+        self.anchor_timer.stop()
+        if self.clock is not None:
+            self.clock.stop()
+        if self.leader is not None:
+            self.leader.close()
+        if self.follower is not None:
+            self.follower.close()
@@ -0,0 +1,334 @@
+from string import Template
+
+from PyQt6.QtGui import QColor, QPalette
+
+# --- 主题 ---
+# 整个程序只装一份样式表（QApplication.setStyleSheet），控件用 objectName 和动态属性选样式，
+# 不再每个轨道各自 setStyleSheet：几百个轨道时样式表只解析一次。
+# 深色沿用 main.py 原来的配色，浅色沿用 code.py（旧版）的配色。
+# 改了动态属性之后要调用 set_prop 让 Qt 重新套样式。
+
+DARK = "dark"
+LIGHT = "light"
+
+_CHECK_SVG = "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTgiIGhlaWdodD0iMTQiIHZpZXdCb3g9IjAgMCAxOCAxNCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHBhdGggZD0iTTEgN0w2IDEyTDE3IDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMyIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo="
+
+THEMES = {
+    DARK: {
+        "window": "#1A202C",
+        "card": "#2D3748",
+        "card_hover": "#374151",
+        "card_border": "none",
+        "card_radius": "16px",
+        "text": "#E2E8F0",
+        "text_dim": "#A0AEC0",
+        "text_time": "#CBD5E0",
+        "weight": "600",
+        "button": "#4299E1",
+        "button_text": "#FFFFFF",
+        "button_hover": "#3182CE",
+        "button_pressed": "#2C5282",
+        "button_border": "none",
+        "check_border": "#EF4444",
+        "check_on": "#22C55E",
+        "check_on_border": "#16A34A",
+        "groove": "rgba(74, 85, 104, 0.3)",
+        "seek_fill": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #48BB78, stop:0.5 #38A169, stop:1 #2F855A)",
+        "vol_fill": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #4299E1, stop:0.5 #3182CE, stop:1 #2C5282)",
+        "handle": "qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #63B3ED, stop:1 #4299E1)",
+        "handle_border": "#2B6CB0",
+        "input": "#2D3748",
+        "input_border": "#4A5568",
+        "accent": "#4299E1",
+        "bar": "#1A202C",
+        "bar_border": "#2D3748",
+        "bar_text": "#E2E8F0",
+        "scroll_handle": "#4A5568",
+        "scroll_handle_hover": "#718096",
+        "boosted": "#F56565",
+        "warning": "#F6AD55",
+        "error": "#FC8181",
+        "ok": "#48BB78",
+        "info": "#63B3ED",
+        "green": "#48BB78",
+        "orange": "#ED8936",
+        "red": "#F56565",
+        "blue": "#4299E1",
+        "gray": "#718096",
+    },
+    LIGHT: {
+        "window": "#F0F0F0",
+        "card": "#FFFFFF",
+        "card_hover": "#F7F7F7",
+        "card_border": "2px solid #555555",
+        "card_radius": "8px",
+        "text": "#000000",
+        "text_dim": "#555555",
+        "text_time": "#333333",
+        "weight": "bold",
+        "button": "#EEEEEE",
+        "button_text": "#000000",
+        "button_hover": "#DDDDDD",
+        "button_pressed": "#CCCCCC",
+        "button_border": "2px solid #444444",
+        "check_border": "#444444",
+        "check_on": "#0078D7",
+        "check_on_border": "#005A9E",
+        "groove": "#E0E0E0",
+        "seek_fill": "#0078D7",
+        "vol_fill": "#555555",
+        "handle": "#0078D7",
+        "handle_border": "#000000",
+        "input": "#FFFFFF",
+        "input_border": "#999999",
+        "accent": "#0078D7",
+        "bar": "#222222",
+        "bar_border": "#000000",
+        "bar_text": "#FFFFFF",
+        "scroll_handle": "#BBBBBB",
+        "scroll_handle_hover": "#999999",
+        "boosted": "#D93025",
+        "warning": "#B7791F",
+        "error": "#D93025",
+        "ok": "#188038",
+        "info": "#0078D7",
+        "green": "#0078D7",
+        "orange": "#D6A000",
+        "red": "#D93025",
+        "blue": "#0078D7",
+        "gray": "#5F6368",
+    },
+}
+
+_QSS = Template("""
+QMainWindow, QWidget#TrackList, QScrollArea#TrackScroll {
+    background-color: $window;
+    border: none;
+}
+
+/* --- 轨道卡片 --- */
+QFrame#TrackCard {
+    background-color: $card;
+    border: $card_border;
+    border-radius: $card_radius;
+    margin-bottom: 20px;
+}
+QFrame#TrackCard:hover { background-color: $card_hover; }
+QFrame#MissingCard {
+    background-color: $card;
+    border: 2px dashed $input_border;
+    border-radius: $card_radius;
+    margin-bottom: 20px;
+}
+#TrackCard QLabel, #MissingCard QLabel {
+    color: $text;
+    font-weight: $weight;
+    border: none;
+    background-color: transparent;
+}
+#MissingCard QLabel { color: $text_dim; }
+#TrackCard QPushButton, #MissingCard QPushButton {
+    background-color: $button;
+    color: $button_text;
+    border: $button_border;
+    border-radius: 10px;
+    padding: 10px 18px;
+    font-weight: $weight;
+}
+#TrackCard QPushButton:hover, #MissingCard QPushButton:hover { background-color: $button_hover; }
+#TrackCard QPushButton:pressed { background-color: $button_pressed; }
+#TrackCard QCheckBox {
+    color: $text;
+    font-weight: $weight;
+    spacing: 10px;
+    font-size: 15px;
+    background-color: transparent;
+    border: none;
+}
+#TrackCard QCheckBox::indicator {
+    width: 22px;
+    height: 22px;
+    border-radius: 6px;
+    border: 2px solid $check_border;
+    background-color: transparent;
+}
+#TrackCard QCheckBox::indicator:checked {
+    background-color: $check_on;
+    border-color: $check_on_border;
+    image: url($check_svg);
+}
+#TrackCard QProgressBar {
+    border: none;
+    border-radius: 12px;
+    background-color: $window;
+    height: 12px;
+    text-align: center;
+    color: transparent;
+}
+#TrackCard QProgressBar::chunk {
+    border-radius: 12px;
+    background: $ok;
+}
+QLabel#TrackName[state="boosted"] { color: $boosted; }
+QLabel#TrackTime { color: $text_time; }
+QLabel#HealthLabel { color: $warning; }
+QLabel#StageLabel { color: $text_dim; }
+QLabel#CueLabel { color: $info; }
+QLabel#StageLabel[tone="info"] { color: $info; }
+QLabel#StageLabel[tone="ok"] { color: $ok; }
+QLabel#StageLabel[tone="error"] { color: $error; }
+
+/* --- 滑块 --- */
+QSlider#SeekSlider::groove:horizontal, QSlider#VolumeSlider::groove:horizontal {
+    background: transparent;
+    height: 6px;
+    border-radius: 3px;
+    margin: 8px 0;
+}
+QSlider#SeekSlider::sub-page:horizontal { background: $seek_fill; border-radius: 3px; }
+QSlider#VolumeSlider::sub-page:horizontal { background: $vol_fill; border-radius: 3px; }
+QSlider#SeekSlider::add-page:horizontal, QSlider#VolumeSlider::add-page:horizontal {
+    background: $groove;
+    border-radius: 3px;
+}
+QSlider#SeekSlider::handle:horizontal {
+    background: $handle;
+    border: 2px solid $handle_border;
+    width: 18px;
+    height: 18px;
+    margin: -6px 0;
+    border-radius: 9px;
+}
+QSlider#VolumeSlider::handle:horizontal {
+    background: $handle;
+    border: 2px solid $handle_border;
+    width: 14px;
+    height: 14px;
+    margin: -5px 0;
+    border-radius: 7px;
+}
+
+/* --- 顶栏 / 场景栏 --- */
+QFrame#TopBar { background-color: $bar; border-bottom: 2px solid $bar_border; }
+QFrame#SceneBar, QFrame#SfxBar { background-color: $bar; }
+#TopBar QLabel, #SceneBar QLabel, #SfxBar QLabel { color: $bar_text; font-weight: $weight; }
+#TopBar QComboBox, #SceneBar QComboBox, QDoubleSpinBox#FadeSpin {
+    background-color: $input;
+    color: $text;
+    border: 1px solid $input_border;
+    border-radius: 8px;
+    padding: 8px 12px;
+}
+QDoubleSpinBox#DuckSpin {
+    background-color: $input;
+    color: $info;
+    border: 1px solid $input_border;
+    border-radius: 8px;
+    padding: 8px 12px;
+}
+#TopBar QComboBox QAbstractItemView, #SceneBar QComboBox QAbstractItemView {
+    background-color: $input;
+    color: $text;
+    selection-background-color: $accent;
+}
+QPushButton[role="action"] {
+    font-size: 14px;
+    font-weight: $weight;
+    color: white;
+    border-radius: 10px;
+    padding: 12px 24px;
+    border: 2px solid transparent;
+    min-height: 16px;
+}
+QPushButton[role="action"]:hover { border: 2px solid rgba(255, 255, 255, 0.3); }
+QPushButton[role="action"][tone="green"] { background-color: $green; }
+QPushButton[role="action"][tone="orange"] { background-color: $orange; }
+QPushButton[role="action"][tone="red"] { background-color: $red; }
+QPushButton[role="action"][tone="blue"] { background-color: $blue; }
+QPushButton[role="action"][tone="gray"] { background-color: $gray; }
+QPushButton#SfxPad {
+    background-color: $input;
+    color: $text;
+    border: 2px solid $input_border;
+    border-radius: 10px;
+    font-weight: $weight;
+    padding: 4px 8px;
+}
+QPushButton#SfxPad:hover { border-color: $accent; }
+QPushButton#SfxPad[state="loading"] { color: $text_dim; }
+QPushButton#SfxPad[state="ready"] { border-color: $green; }
+QPushButton#SfxPad[state="playing"] { background-color: $green; color: white; }
+QPushButton#SfxPad[state="error"] { border-color: $error; color: $error; }
+QLabel#WarningBanner {
+    color: $error;
+    font-size: 16px;
+    font-weight: $weight;
+    padding: 10px;
+    background-color: $card;
+    border-radius: 8px;
+}
+QLabel#PerfHud {
+    background-color: $card;
+    color: $text;
+    border: 1px solid $input_border;
+    border-radius: 8px;
+    padding: 8px 12px;
+    font-family: Consolas, monospace;
+    font-size: 12px;
+}
+
+/* --- 滚动条 --- */
+QScrollBar:vertical {
+    background: $card;
+    width: 14px;
+    border-radius: 7px;
+    margin: 16px 2px 16px 2px;
+}
+QScrollBar::handle:vertical {
+    background: $scroll_handle;
+    border-radius: 7px;
+    min-height: 30px;
+}
+QScrollBar::handle:vertical:hover { background: $scroll_handle_hover; }
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical { height: 0px; }
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical { background: none; }
+""")
+
+
+def build_qss(name):
+    colors = THEMES.get(name, THEMES[DARK])
+    return _QSS.substitute(colors, check_svg=_CHECK_SVG)
+
+
+def build_palette(name):
+    c = THEMES.get(name, THEMES[DARK])
+    palette = QPalette()
+    palette.setColor(QPalette.ColorRole.Window, QColor(c["window"]))
+    palette.setColor(QPalette.ColorRole.WindowText, QColor(c["text"]))
+    palette.setColor(QPalette.ColorRole.Base, QColor(c["input"]))
+    palette.setColor(QPalette.ColorRole.Text, QColor(c["text"]))
+    palette.setColor(QPalette.ColorRole.Button, QColor(c["input"]))
+    palette.setColor(QPalette.ColorRole.ButtonText, QColor(c["text"]))
+    # 电平表（meters.LevelMeter）的削波灯熄灭时的颜色
+    palette.setColor(QPalette.ColorRole.Mid, QColor(c["input_border"]))
+    return palette
+
+
+def apply_theme(app, name):
+    app.setPalette(build_palette(name))
+    app.setStyleSheet(build_qss(name))
+
+
+def set_prop(widget, name, value):
+    # 动态属性变化后 Qt 不会自动重新匹配样式
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+
+def action_button(button, tone):
+    button.setProperty("role", "action")
+    button.setProperty("tone", tone)
+    return button
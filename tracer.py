@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import threading
+import collections
+from contextlib import contextmanager
+
+# --- 播放事件追踪 ---
+# 内存环形缓冲，记录带时间戳的事件；随时导出为 Chrome trace JSON，
+# 用 chrome://tracing 或 https://ui.perfetto.dev 打开即可看到各事件的时间重叠关系。
+# 每条事件只是往 deque 里追加一个元组，开销在微秒以下，可以常开。
+
+DEFAULT_CAPACITY = 50000
+
+
+class Tracer:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.events = collections.deque(maxlen=capacity)
+        self.enabled = True
+        self.thread_names = {}
+        self._t0 = time.perf_counter_ns()
+
+    def now(self):
+        # 微秒，相对于追踪器创建时刻
+        return (time.perf_counter_ns() - self._t0) / 1000.0
+
+    def _add(self, ph, name, cat, ts, dur=None, id=None, args=None):
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.events.append((ph, name, cat, ts, dur, tid, id, args))
+
+    def instant(self, name, cat="app", **args):
+        if self.enabled:
+            self._add("i", name, cat, self.now(), args=args)
+
+    def complete(self, name, start, cat="app", **args):
+        # start 为 now() 的返回值
+        if self.enabled:
+            self._add("X", name, cat, start, self.now() - start, args=args)
+
+    @contextmanager
+    def span(self, name, cat="app", **args):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, start, cat, **args)
+
+    def begin(self, name, id, cat="app", **args):
+        # 跨多次回调的异步区间（渐隐、增益任务等）
+        if self.enabled:
+            self._add("b", name, cat, self.now(), id=id, args=args)
+
+    def end(self, name, id, cat="app", **args):
+        if self.enabled:
+            self._add("e", name, cat, self.now(), id=id, args=args)
+
+    def counter(self, name, cat="app", **values):
+        if self.enabled:
+            self._add("C", name, cat, self.now(), args=values)
+
+    def to_chrome(self):
+        pid = os.getpid()
+        out = [
+            {
+                "ph": "M",
+                "name": "process_name",
+                "pid": pid,
+                "args": {"name": "EasyPlayer"},
+            }
+        ]
+        # 后台线程第一次打点时会往 thread_names 里加，先拷一份再遍历（和 events 一样）
+        for tid, name in list(self.thread_names.items()):
+            out.append(
+                {
+                    "ph": "M",
+                    "name": "thread_name",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+        for ph, name, cat, ts, dur, tid, id, args in list(self.events):
+            e = {"ph": ph, "name": name, "cat": cat, "ts": ts, "pid": pid, "tid": tid}
+            if dur is not None:
+                e["dur"] = dur
+            if id is not None:
+                e["id"] = str(id)
+            if ph == "i":
+                e["s"] = "t"
+            if args:
+                e["args"] = args
+            out.append(e)
+        return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+    def dump_chrome(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False)
+        return len(self.events)
+
+
+TRACER = Tracer()
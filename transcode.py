@@ -0,0 +1,276 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+import subprocess
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtMultimedia import QAudioFormat
+
+import cache
+import pcm
+
+# --- PCM 转码缓存 ---
+# m4a、VBR MP3、96kHz FLAC 每次播放和寻址都要解码再重采样，十轨一起循环时老笔记本吃不消。
+# 打开后在后台把曲目转成输出设备首选采样率/格式的 WAV，存在本机缓存目录；
+# 播放器在轨道停着的时候换到 WAV，之后播放只是读文件，寻址也只是算字节位置。
+# 已经是设备采样率的 PCM 文件不转。缓存有总容量上限，超出时按最近使用时间淘汰
+# 本次会话用不到的文件。清单以 原始路径 + 目标格式 为键，换声卡后按新格式重新转。
+# 有无缓存时的播放 CPU 对比见 bench.py transcode。
+
+DEFAULT_BUDGET_MB = 8192
+PROGRESS_INTERVAL = 0.5
+
+# QAudioFormat.SampleFormat -> (ffmpeg 编码, 每个采样的字节数)；UInt8 也按 16 位存
+CODECS = {
+    QAudioFormat.SampleFormat.Int16: ("pcm_s16le", 2),
+    QAudioFormat.SampleFormat.Int32: ("pcm_s32le", 4),
+    QAudioFormat.SampleFormat.Float: ("pcm_f32le", 4),
+}
+
+
+def target_of(device):
+    # 设备首选格式 -> (采样率, 编码, 声道数上限)
+    fmt = device.preferredFormat()
+    codec = CODECS.get(fmt.sampleFormat(), CODECS[QAudioFormat.SampleFormat.Int16])[0]
+    return (fmt.sampleRate() or 48000, codec, max(1, min(2, fmt.channelCount() or 2)))
+
+
+def entry_key(path, target):
+    raw = f"{os.path.abspath(path)}|{target[0]}|{target[1]}|{target[2]}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def bytes_per_second(target, channels):
+    rate, codec, _ = target
+    size = next(s for c, s in CODECS.values() if c == codec)
+    return rate * channels * size
+
+
+def transcode_file(
+    source, out, target, channels, duration=0.0, progress=None, cancelled=None
+):
+    # ffmpeg 转成 WAV，先写 .part 再改名；progress(比例, 倍速)
+    rate, codec, _ = target
+    part = out + ".part"
+    exe = pcm.ffmpeg_path()
+    if exe is None:
+        raise RuntimeError("找不到 ffmpeg")
+    cmd = [exe, "-v", "error", "-nostdin", "-y", "-i", source, "-vn", "-sn"]
+    cmd += ["-map_metadata", "-1", "-ac", str(channels), "-ar", str(rate)]
+    cmd += ["-c:a", codec, "-rf64", "auto", "-f", "wav"]
+    cmd += ["-progress", "pipe:1", "-nostats", part]
+    t0 = last = time.monotonic()
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    err_lines = []
+    drain = threading.Thread(
+        target=lambda: err_lines.extend(proc.stderr.read().splitlines()),
+        daemon=True,
+    )
+    drain.start()
+    try:
+        for line in proc.stdout:
+            if cancelled is not None and cancelled():
+                proc.kill()
+                break
+            if progress is None or duration <= 0 or not line.startswith("out_time_us="):
+                continue
+            now = time.monotonic()
+            if now - last < PROGRESS_INTERVAL:
+                continue
+            last = now
+            try:
+                done = int(line.split("=", 1)[1]) / 1e6
+            except ValueError:
+                continue
+            progress(min(1.0, done / duration), done / max(1e-6, now - t0))
+        code = proc.wait()
+        drain.join()
+        if cancelled is not None and cancelled():
+            raise OSError("已取消")
+        if code != 0:
+            raise RuntimeError("\n".join(err_lines[-3:]) or f"ffmpeg 退出码 {code}")
+        os.replace(part, out)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    finally:
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+class TranscodeWorker(QThread):
+    # 状态: queued / transcoding / ready / failed / skipped
+    status = pyqtSignal(str, str, str)  # 原始路径, 状态, 说明
+    progress = pyqtSignal(str, float, float)  # 原始路径, 比例, 转码速度（倍速）
+    ready = pyqtSignal(str, str)  # 原始路径, WAV
+
+    def __init__(self, manifest, budget_bytes):
+        super().__init__()
+        self.manifest = manifest
+        self.budget_bytes = budget_bytes
+        self.jobs = queue.Queue()
+        self.wanted = set()
+        self.lock = threading.Lock()
+        self.cancelled = False
+
+    def request(self, path, source, target):
+        key = entry_key(path, target)
+        with self.lock:
+            if key in self.wanted:
+                return False
+            self.wanted.add(key)
+        self.jobs.put((path, source, target))
+        return True
+
+    def stop(self):
+        self.cancelled = True
+        self.jobs.put(None)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None or self.cancelled:
+                return
+            path = job[0]
+            try:
+                self._transcode(*job)
+            except Exception as e:
+                self.status.emit(path, "failed", str(e))
+
+    def _transcode(self, path, source, target):
+        key = entry_key(path, target)
+        entry = self.manifest.get(key)
+        try:
+            st = os.stat(path)
+        except OSError:
+            # 原文件不在了（U 盘拔了），有转好的就直接用
+            st = None
+        if (
+            entry is not None
+            and os.path.exists(entry["pcm"])
+            and (
+                st is None
+                or (entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns)
+            )
+        ):
+            entry["last_used"] = time.time()
+            self._save_manifest()
+            self.status.emit(path, "ready", "")
+            self.ready.emit(path, entry["pcm"])
+            return
+        if entry is not None:
+            self._drop(key)
+        if st is None:
+            st = os.stat(source)
+
+        info = pcm.probe(source)
+        rate, codec, max_channels = target
+        channels = min(info["channels"] or 2, max_channels)
+        if (info["codec"] or "").startswith("pcm_") and info["sample_rate"] == rate:
+            self.status.emit(path, "skipped", "已是设备采样率的 PCM")
+            return
+        duration = info["duration"] or 0.0
+        estimate = int(duration * bytes_per_second(target, channels))
+        if estimate > self.budget_bytes:
+            self.status.emit(path, "skipped", "超出缓存容量")
+            return
+        self._make_room(estimate)
+
+        out = cache.cache_path("transcode", key, ".wav")
+        self.status.emit(path, "transcoding", "")
+        transcode_file(
+            source,
+            out,
+            target,
+            channels,
+            duration,
+            progress=lambda f, speed: self.progress.emit(path, f, speed),
+            cancelled=lambda: self.cancelled,
+        )
+        self.manifest[key] = {
+            "path": path,
+            "pcm": out,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "bytes": os.path.getsize(out),
+            "last_used": time.time(),
+        }
+        self._save_manifest()
+        self.status.emit(path, "ready", "")
+        self.ready.emit(path, out)
+
+    def _make_room(self, needed):
+        used = sum(e["bytes"] for e in self.manifest.values())
+        with self.lock:
+            wanted = set(self.wanted)
+        victims = sorted(
+            (e["last_used"], k) for k, e in self.manifest.items() if k not in wanted
+        )
+        for _, k in victims:
+            if used + needed <= self.budget_bytes:
+                break
+            used -= self.manifest[k]["bytes"]
+            self._drop(k)
+        self._save_manifest()
+
+    def _drop(self, key):
+        entry = self.manifest.pop(key, None)
+        if entry is not None:
+            try:
+                os.remove(entry["pcm"])
+            except OSError:
+                pass
+
+    def _save_manifest(self):
+        cache.save_json("transcode", "manifest", dict(self.manifest))
+
+
+class TranscodeManager(QObject):
+    status = pyqtSignal(str, str, str)
+    progress = pyqtSignal(str, float, float)
+    ready = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.enabled = False
+        self.manifest = cache.load_json("transcode", "manifest") or {}
+        self.worker = None
+        self.budget_mb = DEFAULT_BUDGET_MB
+
+    def configure(self, enabled, budget_mb):
+        self.enabled = bool(enabled)
+        self.budget_mb = budget_mb
+
+    def _ensure_worker(self):
+        if self.worker is None:
+            self.worker = TranscodeWorker(self.manifest, self.budget_mb * 1024 * 1024)
+            self.worker.status.connect(self.status)
+            self.worker.progress.connect(self.progress)
+            self.worker.ready.connect(self.ready)
+            self.worker.start()
+        return self.worker
+
+    def request(self, path, source, device):
+        # source 是实际去读的文件（本地暂存副本或原文件）；path 用来认轨道
+        if not self.enabled:
+            return
+        target = target_of(device)
+        if self._ensure_worker().request(path, source, target):
+            self.status.emit(path, "queued", "")
+            return
+        # 这次会话已经转过（比如同一首又加了一轨），直接给结果
+        entry = self.manifest.get(entry_key(path, target))
+        if entry is not None and os.path.exists(entry["pcm"]):
+            self.ready.emit(path, entry["pcm"])
+
+    def shutdown(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait(2000)
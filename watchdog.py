@@ -0,0 +1,179 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from tracer import TRACER
+
+# --- 播放看门狗 ---
+# 一个共享定时器检查所有正在播放的轨道：播放位置应当跟着墙钟时间走。
+# - 卡死 (stall)：在检测窗口内位置完全不动
+# - 欠载 (underrun)：位置在走，但一个窗口内走得明显比墙钟慢（输出断断续续）
+# 两种情况都自动恢复：重建音频输出，回到最后一次正常的位置继续播放。
+
+DEFAULT_WINDOW_SEC = 1.5
+UNDERRUN_RATIO = 0.7
+MAX_ATTEMPTS = 3
+
+
+class TrackHealth:
+    def __init__(self):
+        self.stalls = 0
+        self.underruns = 0
+        self.last_detect_ms = 0.0
+        self.last_recover_ms = 0.0
+        self.reset()
+
+    def reset(self):
+        now = time.monotonic()
+        self.failed = False
+        self.last_pos = None
+        self.last_tick = now
+        self.last_advance = now
+        self.last_good_pos = 0
+        self.seen_advance = False
+        self.window_start = now
+        self.window_advance = 0
+        self.recovering_since = None
+        self.attempts = 0
+
+    def summary(self):
+        text = f"⚠ 卡顿 {self.stalls} · 欠载 {self.underruns}"
+        if self.last_detect_ms:
+            text += f" · 检测 {self.last_detect_ms / 1000:.1f}s"
+        if self.failed:
+            text += " · 无法恢复"
+        elif self.last_recover_ms:
+            text += f" · 恢复 {self.last_recover_ms:.0f}ms"
+        return text
+
+
+class PlaybackWatchdog(QObject):
+    stall_detected = pyqtSignal(object, str, float)  # track, kind, 检测延迟 ms
+    recovered = pyqtSignal(object, float)  # track, 恢复耗时 ms
+
+    def __init__(
+        self, tracks_fn, window_sec=DEFAULT_WINDOW_SEC, interval=250, parent=None
+    ):
+        super().__init__(parent)
+        self.tracks_fn = tracks_fn
+        self.window_sec = window_sec
+        self.health = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._tick)
+        self.timer.start()
+
+    def set_window(self, window_sec):
+        self.window_sec = max(0.5, window_sec)
+
+    def _tick(self):
+        now = time.monotonic()
+        live = set()
+        for w in self.tracks_fn():
+            live.add(w)
+            h = self.health.get(w)
+            if h is None:
+                h = self.health[w] = TrackHealth()
+            self._check(w, h, now)
+        for w in list(self.health):
+            if w not in live:
+                del self.health[w]
+
+    def _check(self, w, h, now):
+        playing = w.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+        loading = w.player.mediaStatus() in (
+            QMediaPlayer.MediaStatus.LoadingMedia,
+            QMediaPlayer.MediaStatus.EndOfMedia,
+        )
+        if not playing or w.is_dragging or loading:
+            # 恢复过程中短暂的停止/加载状态不算，操作员真正停下来才清零
+            if (
+                h.recovering_since is None
+                or now - h.recovering_since > self.window_sec * 2
+            ):
+                h.reset()
+            return
+
+        if h.failed:
+            return
+        pos = w.current_position()
+        if h.last_pos is None:
+            h.last_pos = pos
+            h.last_tick = now
+            h.last_advance = now
+            h.window_start = now
+            return
+
+        elapsed_ms = (now - h.last_tick) * 1000
+        advance = pos - h.last_pos
+        h.last_tick = now
+        h.last_pos = pos
+
+        # 跳转（拖动、循环回到开头）不算异常，重新计时
+        if advance < 0 or advance > elapsed_ms + 1000:
+            h.last_advance = now
+            h.last_good_pos = pos
+            h.window_start = now
+            h.window_advance = 0
+            return
+
+        if advance > 0:
+            if h.recovering_since is not None:
+                h.last_recover_ms = (now - h.recovering_since) * 1000
+                h.recovering_since = None
+                h.attempts = 0
+                print(
+                    f"[看门狗] {w.trace_name} 已恢复，用时 {h.last_recover_ms:.0f} ms"
+                )
+                TRACER.instant(
+                    "watchdog.recovered",
+                    "watchdog",
+                    track=w.trace_name,
+                    ms=h.last_recover_ms,
+                )
+                self.recovered.emit(w, h.last_recover_ms)
+            h.seen_advance = True
+            h.last_advance = now
+            h.last_good_pos = pos
+            h.window_advance += advance
+            window = now - h.window_start
+            if window >= self.window_sec:
+                ratio = h.window_advance / (window * 1000)
+                h.window_start = now
+                h.window_advance = 0
+                if ratio < UNDERRUN_RATIO:
+                    h.underruns += 1
+                    self._recover(w, h, "underrun", window * 1000, now)
+            return
+
+        # 刚开始播放时输出设备可能要预热，给更长的宽限期
+        limit = self.window_sec if h.seen_advance else self.window_sec * 3
+        if now - h.last_advance >= limit:
+            h.stalls += 1
+            self._recover(w, h, "stall", (now - h.last_advance) * 1000, now)
+
+    def _recover(self, w, h, kind, detect_ms, now):
+        h.last_detect_ms = detect_ms
+        if h.recovering_since is None:
+            h.recovering_since = now
+        h.attempts += 1
+        h.last_advance = now
+        h.window_start = now
+        h.window_advance = 0
+        print(
+            f"[看门狗] {w.trace_name} {kind}，检测用时 {detect_ms:.0f} ms，第 {h.attempts} 次恢复"
+        )
+        TRACER.instant(
+            "watchdog." + kind,
+            "watchdog",
+            track=w.trace_name,
+            detect_ms=detect_ms,
+            attempt=h.attempts,
+        )
+        self.stall_detected.emit(w, kind, detect_ms)
+        if h.attempts > MAX_ATTEMPTS:
+            h.failed = True
+            return
+        # 前几次只重建输出；仍不行就连媒体一起重新打开
+        w.recover_output(h.last_good_pos, reopen_media=h.attempts > 1)